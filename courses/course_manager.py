@@ -0,0 +1,220 @@
+"""
+MULTI-COURSE INDEX MANAGER
+==========================
+
+Serves many courses from one process without holding them all in RAM.
+Courses are declared in courses/courses.json; each names its syllabus
+artifact and its retrieval index (a FAISS index + metadata file, or a
+shard directory). Paths are relative to the repository root.
+
+LAZY LOADING:
+A course's relevance checker and retriever are loaded separately, on the
+first request that needs them (a relevance-only service never loads
+textbook indexes). Concurrent first requests for a course load it once.
+
+MEMORY BUDGET:
+Loaded courses live in an LRU. Each is charged the on-disk size of the
+artifacts it has loaded (syllabus matrix, FAISS index, metadata), a close
+proxy for its resident memory. When the total exceeds the budget, least
+recently used courses are evicted (the course being served is never
+evicted). Encoders are shared across courses by the encoder registry and
+are not charged.
+
+QUESTION CACHES:
+Each loaded checker and retriever gets its own semantic question cache
+(relevance/semantic_cache.py, off unless QUESTION_CACHE_SIZE is set), dropped
+with the course when it is evicted.
+
+CONFIG:
+- COURSE_CONFIG: course list (default: courses/courses.json)
+- COURSE_MEMORY_BUDGET_MB: LRU budget (default: 1024)
+
+USAGE:
+    manager = CourseManager()
+    checker = manager.checker("computer-networks")
+    retriever = manager.retriever("computer-networks")
+"""
+
+import json
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for module_dir in ("encoders", "monitoring", "relevance", "embeddings"):
+    sys.path.append(os.path.join(ROOT, module_dir))
+
+import metrics
+from semantic_cache import SemanticCache
+
+DEFAULT_CONFIG = os.path.join(ROOT, "courses", "courses.json")
+
+
+def resolve(path):
+    return path if os.path.isabs(path) else os.path.join(ROOT, path)
+
+
+def artifact_bytes(paths):
+    """Total size of files (and directories of files) on disk"""
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        elif os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+class Course:
+    """One course's lazily loaded components"""
+
+    def __init__(self, course_id, config):
+        self.course_id = course_id
+        self.config = config
+        self.checker = None
+        self.retriever = None
+        self.memory_bytes = 0
+        self.lock = threading.Lock()
+
+    def load_checker(self):
+        from relevance_checker import QuestionRelevanceChecker
+
+        syllabus = resolve(self.config["syllabus"])
+        checker = QuestionRelevanceChecker(syllabus, model_name=self.config.get("syllabus_model", "all-MiniLM-L6-v2"),
+                                           question_cache=SemanticCache.from_env(f"{self.course_id}/relevance"))
+        paths = [syllabus]
+        if syllabus.endswith(".meta.json"):
+            paths.append(syllabus[:-len(".meta.json")] + ".npy")
+        return checker, artifact_bytes(paths)
+
+    def load_retriever(self):
+        model_name = self.config.get("retrieval_model", "all-mpnet-base-v2")
+        question_cache = SemanticCache.from_env(f"{self.course_id}/retrieval")
+        if "shard_dir" in self.config:
+            from shards import ShardedRetriever
+            shard_dir = resolve(self.config["shard_dir"])
+            retriever = ShardedRetriever(shard_dir, model_name=model_name, question_cache=question_cache)
+            return retriever, artifact_bytes([shard_dir])
+
+        from retriever import TextbookRetriever
+        index_path, metadata_path = resolve(self.config["index_path"]), resolve(self.config["metadata_path"])
+        retriever = TextbookRetriever(index_path, metadata_path, model_name=model_name, question_cache=question_cache)
+        return retriever, artifact_bytes([index_path, metadata_path])
+
+    def close(self):
+        """Release the retriever's index threads; called when the course is evicted"""
+        if self.retriever is not None:
+            self.retriever.close()
+
+    def question_caches(self):
+        """Semantic question caches of the loaded components"""
+        components = (self.checker, self.retriever)
+        return [c.question_cache for c in components if c is not None and c.question_cache is not None]
+
+
+class CourseManager:
+    def __init__(self, config_path=None, memory_budget_bytes=None):
+        config_path = config_path or os.environ.get("COURSE_CONFIG", DEFAULT_CONFIG)
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+
+        self.course_configs = config["courses"]
+        self.default_course = config.get("default") or next(iter(self.course_configs))
+        if self.default_course not in self.course_configs:
+            raise ValueError(f"Default course '{self.default_course}' is not in {config_path}")
+        if memory_budget_bytes is None:
+            memory_budget_bytes = int(float(os.environ.get("COURSE_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024)
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self.loaded = OrderedDict()  # course_id -> Course, least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def course(self, course_id=None):
+        """Course entry (components not necessarily loaded), marked most recently used"""
+        course_id = course_id or self.default_course
+        if course_id not in self.course_configs:
+            raise KeyError(f"Unknown course '{course_id}'")
+
+        with self.lock:
+            course = self.loaded.get(course_id)
+            if course is None:
+                course = self.loaded[course_id] = Course(course_id, self.course_configs[course_id])
+            self.loaded.move_to_end(course_id)
+            return course
+
+    def _component(self, course_id, name):
+        course = self.course(course_id)
+        component = getattr(course, name)
+        if component is not None:
+            with self.lock:
+                self.hits += 1
+            metrics.inc("course_lookups_total", component=name, result="hit")
+            return component
+
+        with course.lock:
+            component = getattr(course, name)
+            if component is None:
+                with self.lock:
+                    self.misses += 1
+                metrics.inc("course_lookups_total", component=name, result="miss")
+                component, size = getattr(course, f"load_{name}")()
+                setattr(course, name, component)
+                course.memory_bytes += size
+                print(f"Loaded {name} for course '{course.course_id}' ({size / 1e6:.1f} MB)")
+
+        self._enforce_budget(keep=course.course_id)
+        return component
+
+    def checker(self, course_id=None):
+        """Relevance checker for a course, loaded on first use"""
+        return self._component(course_id, "checker")
+
+    def retriever(self, course_id=None):
+        """Textbook retriever for a course, loaded on first use"""
+        return self._component(course_id, "retriever")
+
+    def memory_bytes(self):
+        return sum(course.memory_bytes for course in self.loaded.values())
+
+    def _enforce_budget(self, keep):
+        with self.lock:
+            while self.memory_bytes() > self.memory_budget_bytes:
+                victim = next((cid for cid in self.loaded if cid != keep and self.loaded[cid].memory_bytes), None)
+                if victim is None:
+                    break
+                evicted = self.loaded.pop(victim)
+                evicted.close()
+                self.evictions += 1
+                print(f"Evicted course '{victim}' ({evicted.memory_bytes / 1e6:.1f} MB)")
+
+    def evict(self, course_id):
+        with self.lock:
+            evicted = self.loaded.pop(course_id, None)
+        if evicted is None:
+            return False
+        evicted.close()
+        return True
+
+    def stats(self):
+        with self.lock:
+            return {
+                "courses": [
+                    {
+                        "course_id": course.course_id,
+                        "checker_loaded": course.checker is not None,
+                        "retriever_loaded": course.retriever is not None,
+                        "memory_bytes": course.memory_bytes,
+                        "question_caches": {cache.name: cache.stats() for cache in course.question_caches()}
+                    }
+                    for course in self.loaded.values()
+                ],
+                "memory_bytes": self.memory_bytes(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,172 @@
+"""
+CHUNKING PARAMETER SWEEP
+========================
+
+Re-chunks the corpus over a grid of chunk sizes (MAX_TOKENS) and overlaps
+and, for each setting, builds a throwaway index and reports:
+
+- chunk count and total indexed words
+- index bytes (serialized FAISS index) and embedding build time
+- unit-level recall@k / MRR on the synthetic QA set (benchmark_retrieval.py)
+
+The current production setting (chunk_text.MAX_TOKENS with OVERLAP counted
+in sentences) is always included as the first row. Overlaps in the grid
+count words (--overlap-unit tokens) unless --overlap-unit sentences.
+
+CORPUS:
+--pdf: pages of the given PDFs (extract_pdf_text + clean_text). Otherwise
+pages are rebuilt from the existing chunk files by merging each page's
+chunks and dropping sentences repeated by the old overlap.
+
+The recommendation is the smallest index whose recall@k stays within
+--max-recall-drop of the best setting.
+
+Usage (from the repository root):
+    python embeddings/benchmark_chunking.py
+    python embeddings/benchmark_chunking.py --max-tokens 100 200 300 --overlaps 0 30 --k 5
+"""
+
+import os
+
+# Never reach out to the network for models; use the local cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import faiss
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "ingestion"))
+from encoder_registry import get_encoder
+from quantization import index_bytes
+from benchmark_retrieval import DEFAULT_DATASET, K_VALUES, compute_quality, load_labeled_questions
+from chunk_text import MAX_TOKENS, OVERLAP, chunk_sentences
+from sentence_segmenter import get_segmenter
+
+DEFAULT_CHUNK_FILES = ["data/processed/chunks/notes.json", "data/processed/chunks/ppts.json"]
+
+
+def pages_from_chunks(chunk_files, segmenter):
+    """[(unit, sentences)] per (source, unit, page), without overlap repeats"""
+    pages = {}
+    for path in chunk_files:
+        with open(path, "r", encoding="utf-8") as f:
+            for chunk in json.load(f):
+                key = (chunk["source"], chunk["unit"], chunk["page"])
+                seen, sentences = pages.setdefault(key, (set(), []))
+                for sentence in segmenter.split(chunk["text"]):
+                    if sentence not in seen:
+                        seen.add(sentence)
+                        sentences.append(sentence)
+    return [(unit, sentences) for (_, unit, _), (_, sentences) in pages.items()]
+
+
+def pages_from_pdfs(pdf_paths, unit, segmenter):
+    from extract_pdf import extract_pdf_text
+    from clean_text import clean_text
+
+    texts = [clean_text(p["text"]) for path in pdf_paths for p in extract_pdf_text(path)]
+    texts = [text for text in texts if text]
+    return [(unit, sentences) for sentences in segmenter.split_many(texts)]
+
+
+def evaluate_setting(pages, model, query_embeddings, expected_units, max_tokens, overlap, overlap_unit, top_k):
+    chunks, units = [], []
+    for unit, sentences in pages:
+        for chunk in chunk_sentences(sentences, max_tokens, overlap, overlap_unit):
+            chunks.append(chunk)
+            units.append(unit)
+
+    start = time.perf_counter()
+    embeddings = np.asarray(model.encode(chunks, batch_size=64), dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(embeddings)
+    build_seconds = time.perf_counter() - start
+
+    _, ids = index.search(query_embeddings, top_k)
+    ranked_units = [[units[i] for i in row if i >= 0] for row in ids]
+
+    return {
+        "max_tokens": max_tokens,
+        "overlap": overlap,
+        "overlap_unit": overlap_unit,
+        "chunks": len(chunks),
+        "words": sum(len(c.split()) for c in chunks),
+        "index_bytes": index_bytes(index),
+        "build_seconds": build_seconds,
+        "quality": compute_quality(ranked_units, expected_units)
+    }
+
+
+def recommend(results, k, max_recall_drop):
+    best = max(r["quality"]["recall_at_k"][k] for r in results)
+    eligible = [r for r in results if r["quality"]["recall_at_k"][k] >= best - max_recall_drop]
+    return min(eligible, key=lambda r: r["index_bytes"])
+
+
+def label(result):
+    suffix = "s" if result["overlap_unit"] == "sentences" else "w"
+    return f"{result['max_tokens']}/{result['overlap']}{suffix}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk size / overlap sweep")
+    parser.add_argument("--max-tokens", nargs="+", type=int, default=[100, 150, 250, 400])
+    parser.add_argument("--overlaps", nargs="+", type=int, default=[0, 25, 50])
+    parser.add_argument("--overlap-unit", choices=["tokens", "sentences"], default="tokens")
+    parser.add_argument("--k", default="5", choices=[str(k) for k in K_VALUES], help="recall@k used to recommend")
+    parser.add_argument("--max-recall-drop", type=float, default=0.01)
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--chunks", nargs="+", default=DEFAULT_CHUNK_FILES)
+    parser.add_argument("--pdf", nargs="*", default=None, help="Sweep over PDF pages instead of existing chunks")
+    parser.add_argument("--pdf-unit", default="Unit 1", help="Unit label for --pdf pages")
+    parser.add_argument("--segmenter", default=None, help="Sentence segmenter (default: SENTENCE_SEGMENTER)")
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--output", default="chunking_sweep.json")
+    args = parser.parse_args()
+
+    segmenter = get_segmenter(args.segmenter)
+    if args.pdf:
+        pages = pages_from_pdfs(args.pdf, args.pdf_unit, segmenter)
+    else:
+        pages = pages_from_chunks(args.chunks, segmenter)
+    questions = load_labeled_questions(args.dataset)
+
+    print("CHUNKING PARAMETER SWEEP")
+    print("=" * 60)
+    print(f"Pages: {len(pages)} | Questions: {len(questions)} | Segmenter: {segmenter.name}")
+
+    model = get_encoder(args.model)
+    query_embeddings = np.asarray(model.encode([q["question"] for q in questions]), dtype=np.float32)
+    faiss.normalize_L2(query_embeddings)
+    expected_units = [q["unit"] for q in questions]
+
+    settings = [(MAX_TOKENS, OVERLAP, "sentences")]
+    settings += [(m, o, args.overlap_unit) for m in args.max_tokens for o in args.overlaps if o < m]
+
+    results = []
+    print(f"\n{'setting':<12}{'chunks':>8}{'words':>9}{'index MB':>10}{'build s':>9}{'R@' + args.k:>8}{'MRR':>8}")
+    for max_tokens, overlap, overlap_unit in settings:
+        result = evaluate_setting(pages, model, query_embeddings, expected_units,
+                                  max_tokens, overlap, overlap_unit, max(K_VALUES))
+        results.append(result)
+        print(f"{label(result):<12}{result['chunks']:>8}{result['words']:>9}{result['index_bytes'] / 1e6:>10.2f}"
+              f"{result['build_seconds']:>9.2f}{result['quality']['recall_at_k'][args.k]:>8.3f}{result['quality']['mrr']:>8.3f}")
+
+    choice = recommend(results, args.k, args.max_recall_drop)
+    print(f"\nCheapest setting within {args.max_recall_drop:.3f} of the best recall@{args.k}: {label(choice)} "
+          f"({choice['chunks']} chunks, {choice['index_bytes'] / 1e6:.2f} MB)")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"pages": len(pages), "questions": len(questions), "results": results,
+                   "recommended": label(choice)}, f, indent=2)
+    print(f"Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+PCA DIMENSIONALITY BENCHMARK
+============================
+
+Measures what reducing the index with PCA (pca.py) costs in retrieval
+quality against the full-width float32 index, at 128 / 256 / 384
+dimensions by default, with and without whitening.
+
+For each setting it reports:
+- index bytes (serialized FAISS index, PCA matrix included)
+- search time per query (one batched search over all queries)
+- neighbor recall@k: share of the full-width top-k chunks also returned in
+  the top k, over the questions plus a sample of chunks used as queries
+- mean absolute score error: reduced-space score vs full-width cosine of
+  the same returned chunks (how far min_score thresholds shift)
+- unit-level recall@k / MRR on the questions (as in benchmark_retrieval.py)
+
+The PCA is trained on all chunk embeddings, as build_index.py does.
+
+Usage (from the repository root):
+    python embeddings/benchmark_pca.py
+    python embeddings/benchmark_pca.py --dims 64 128 256 --no-whiten --output pca.json
+"""
+
+import os
+
+# Never reach out to the network for models; use the local cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import json
+import sys
+import time
+import numpy as np
+import faiss
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+from encoder_registry import get_encoder
+from pca import PCA_DIMS
+from quantization import build_index, index_bytes
+from benchmark_quantization import DEFAULT_CHUNKS, neighbor_recall
+from benchmark_retrieval import DEFAULT_DATASET, K_VALUES, compute_quality, load_labeled_questions
+
+
+def evaluate(index, chunk_embeddings, queries, n_questions, chunk_units, expected_units, reference_ids, top_k):
+    start = time.perf_counter()
+    scores, ids = index.search(queries, top_k)
+    search_us = (time.perf_counter() - start) * 1e6 / len(queries)
+
+    exact = np.take_along_axis(queries @ chunk_embeddings.T, np.maximum(ids, 0), axis=1)
+    reference_ids = ids if reference_ids is None else reference_ids
+    question_ids = ids[:n_questions]
+
+    return {
+        "index_bytes": index_bytes(index),
+        "search_us_per_query": search_us,
+        "neighbor_recall_at_k": {str(k): neighbor_recall(reference_ids, ids, k) for k in K_VALUES},
+        "mean_abs_score_error": float(np.abs(scores - exact).mean()),
+        "quality": compute_quality([[chunk_units[i] for i in row if i >= 0] for row in question_ids], expected_units)
+    }, ids
+
+
+def benchmark_pca(chunk_embeddings, queries, n_questions, chunk_units, expected_units,
+                  dims=PCA_DIMS, whiten_options=(False, True), top_k=max(K_VALUES)):
+    full = build_index(chunk_embeddings)
+    results = []
+    result, reference_ids = evaluate(full, chunk_embeddings, queries, n_questions, chunk_units,
+                                     expected_units, None, top_k)
+    results.append(dict(result, dimension=chunk_embeddings.shape[1], whiten=False))
+
+    for dim in dims:
+        for whiten in whiten_options:
+            index = build_index(chunk_embeddings, pca_dim=dim, whiten=whiten)
+            result, _ = evaluate(index, chunk_embeddings, queries, n_questions, chunk_units,
+                                 expected_units, reference_ids, top_k)
+            results.append(dict(result, dimension=dim, whiten=whiten))
+    return results
+
+
+def print_results(results, k):
+    base = results[0]
+    print(f"\n{'dims':<10}{'index MB':>10}{'us/query':>10}{'nbr R@10':>10}{'score err':>11}"
+          f"{'R@' + k:>7}{'dR@' + k:>8}{'MRR':>8}{'dMRR':>8}")
+    for r in results:
+        label = f"{r['dimension']}{'w' if r['whiten'] else ''}"
+        recall = r['quality']['recall_at_k'][k]
+        print(f"{label:<10}{r['index_bytes'] / 1e6:>10.2f}{r['search_us_per_query']:>10.1f}"
+              f"{r['neighbor_recall_at_k']['10']:>10.3f}{r['mean_abs_score_error']:>11.4f}"
+              f"{recall:>7.3f}{recall - base['quality']['recall_at_k'][k]:>+8.3f}"
+              f"{r['quality']['mrr']:>8.3f}{r['quality']['mrr'] - base['quality']['mrr']:>+8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall loss and size of PCA-reduced indexes")
+    parser.add_argument("--dims", nargs="+", type=int, default=list(PCA_DIMS))
+    parser.add_argument("--no-whiten", action="store_true", help="Skip the whitened variants")
+    parser.add_argument("--chunk-queries", type=int, default=500,
+                        help="Sampled chunks added as queries for neighbor recall")
+    parser.add_argument("--k", default="5", choices=[str(k) for k in K_VALUES], help="Unit recall@k shown in the table")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--chunks", nargs="+", default=DEFAULT_CHUNKS)
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--output", default="pca_benchmark.json")
+    args = parser.parse_args()
+
+    chunks = []
+    for path in args.chunks:
+        with open(path, "r", encoding="utf-8") as f:
+            chunks.extend(json.load(f))
+    questions = load_labeled_questions(args.dataset)
+
+    print("PCA DIMENSIONALITY BENCHMARK")
+    print("=" * 60)
+    print(f"Chunks: {len(chunks)} | Questions: {len(questions)} | Model: {args.model}")
+
+    model = get_encoder(args.model)
+    chunk_embeddings = np.asarray(model.encode([c["text"] for c in chunks], batch_size=64), dtype=np.float32)
+    question_embeddings = np.asarray(model.encode([q["question"] for q in questions]), dtype=np.float32)
+    faiss.normalize_L2(chunk_embeddings)
+    faiss.normalize_L2(question_embeddings)
+
+    sample = np.random.default_rng(0).choice(len(chunks), min(args.chunk_queries, len(chunks)), replace=False)
+    queries = np.ascontiguousarray(np.vstack([question_embeddings, chunk_embeddings[sample]]))
+
+    results = benchmark_pca(
+        chunk_embeddings, queries, len(questions),
+        [c["unit"] for c in chunks], [q["unit"] for q in questions],
+        dims=args.dims, whiten_options=(False,) if args.no_whiten else (False, True)
+    )
+    print_results(results, args.k)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"model": args.model, "chunks": len(chunks), "questions": len(questions),
+                   "chunk_queries": len(sample), "results": results}, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+EMBEDDING PRECISION BENCHMARK
+=============================
+
+Measures what float16 and int8 storage cost in retrieval quality against
+float32, on the benchmark questions (dataset/synthetic_qa_seed.json by
+default).
+
+For each precision it reports:
+- index bytes (serialized FAISS index) and embeddings matrix bytes
+- neighbor recall@k: share of the float32 top-k chunks also returned in
+  the top k (1.0 = identical result sets)
+- mean absolute similarity error of the returned scores
+- unit-level recall@k / MRR (as in benchmark_retrieval.py) and its delta
+
+The saved-matrix round trip (save_embeddings / load_embeddings) is checked
+too, since that is what analysis scripts read back.
+
+Usage (from the repository root):
+    python embeddings/benchmark_quantization.py
+    python embeddings/benchmark_quantization.py --chunks data/processed/chunks/notes.json --output q.json
+"""
+
+import os
+
+# Never reach out to the network for models; use the local cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import json
+import sys
+import tempfile
+import numpy as np
+import faiss
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+from encoder_registry import get_encoder
+from quantization import PRECISIONS, build_index, index_bytes, load_embeddings, save_embeddings
+from benchmark_retrieval import DEFAULT_DATASET, K_VALUES, compute_quality, load_labeled_questions
+
+DEFAULT_CHUNKS = ["data/processed/chunks/notes.json", "data/processed/chunks/ppts.json"]
+
+
+def neighbor_recall(reference_ids, ids, k):
+    """Mean overlap of the top-k id sets per query"""
+    overlaps = [len(set(r[:k]) & set(c[:k])) / k for r, c in zip(reference_ids, ids)]
+    return float(np.mean(overlaps))
+
+
+def benchmark_precisions(chunk_embeddings, query_embeddings, chunk_units, expected_units, top_k=max(K_VALUES)):
+    results = {}
+    reference = None
+
+    for precision in PRECISIONS:
+        index = build_index(chunk_embeddings, precision)
+        scores, ids = index.search(query_embeddings, top_k)
+        exact = np.take_along_axis(query_embeddings @ chunk_embeddings.T, np.maximum(ids, 0), axis=1)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            matrix_path = save_embeddings(os.path.join(tmp, "embeddings.npy"), chunk_embeddings, precision)
+            matrix_bytes = os.path.getsize(matrix_path)
+            matrix_error = float(np.abs(load_embeddings(matrix_path) - chunk_embeddings).max())
+
+        if reference is None:
+            reference = ids
+
+        results[precision] = {
+            "index_bytes": index_bytes(index),
+            "matrix_bytes": matrix_bytes,
+            "matrix_max_abs_error": matrix_error,
+            "neighbor_recall_at_k": {str(k): neighbor_recall(reference, ids, k) for k in K_VALUES},
+            "mean_abs_score_error": float(np.abs(scores - exact).mean()),
+            "quality": compute_quality([[chunk_units[i] for i in row if i >= 0] for row in ids], expected_units)
+        }
+
+    return results
+
+
+def print_results(results):
+    base = results["float32"]
+    print(f"\n{'precision':<10}{'index MB':>10}{'matrix MB':>11}{'nbr R@10':>10}{'score err':>11}{'MRR':>8}{'dMRR':>8}")
+    for precision, r in results.items():
+        print(f"{precision:<10}{r['index_bytes'] / 1e6:>10.2f}{r['matrix_bytes'] / 1e6:>11.2f}"
+              f"{r['neighbor_recall_at_k']['10']:>10.3f}{r['mean_abs_score_error']:>11.4f}"
+              f"{r['quality']['mrr']:>8.3f}{r['quality']['mrr'] - base['quality']['mrr']:>+8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall and size of float16 / int8 embedding storage")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--chunks", nargs="+", default=DEFAULT_CHUNKS)
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--output", default="quantization_benchmark.json")
+    args = parser.parse_args()
+
+    chunks = []
+    for path in args.chunks:
+        with open(path, "r", encoding="utf-8") as f:
+            chunks.extend(json.load(f))
+    questions = load_labeled_questions(args.dataset)
+
+    print("EMBEDDING PRECISION BENCHMARK")
+    print("=" * 60)
+    print(f"Chunks: {len(chunks)} | Questions: {len(questions)} | Model: {args.model}")
+
+    model = get_encoder(args.model)
+    chunk_embeddings = np.asarray(model.encode([c["text"] for c in chunks], batch_size=64), dtype=np.float32)
+    query_embeddings = np.asarray(model.encode([q["question"] for q in questions]), dtype=np.float32)
+    faiss.normalize_L2(chunk_embeddings)
+    faiss.normalize_L2(query_embeddings)
+
+    results = benchmark_precisions(
+        chunk_embeddings, query_embeddings,
+        [c["unit"] for c in chunks], [q["unit"] for q in questions]
+    )
+    print_results(results)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"model": args.model, "chunks": len(chunks), "questions": len(questions), "results": results}, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
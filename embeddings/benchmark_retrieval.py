@@ -0,0 +1,250 @@
+"""
+RETRIEVAL QUALITY AND LATENCY BENCHMARK
+=======================================
+
+Benchmarks one or more TextbookRetriever configurations against labeled
+questions (dataset/synthetic_qa_seed.json by default, plus any extra
+labeled JSON/JSONL files with "question" and "unit" fields).
+
+QUALITY (unit-level labels):
+- recall@k: share of questions with a chunk from the expected unit in the top k
+- MRR: mean reciprocal rank of the first chunk from the expected unit
+- unit accuracy: top-1 chunk unit matches the expected unit
+
+COST:
+- query latency p50 / p95 / p99 (ms) and sequential throughput (queries/s)
+- index size on disk (FAISS + metadata) and retriever load time (index
+  and metadata only: encoders are loaded and warmed before timing)
+
+RERANKING:
+Config keys "rerank", "rerank_top_n" and "rerank_budget_ms" enable the
+cross-encoder stage. --rerank adds a reranked copy of every configuration
+("<name>+rerank") so quality gain and latency cost print side by side.
+
+A config with "shard_dir" (and optional "sources") benchmarks a sharded
+index (see shards.py) instead of index_path / metadata_path. The default
+config is the shard manifest build_index.py writes.
+
+Runs fully offline (Hugging Face hub access is disabled). Results are
+written as JSON; pass --compare with an earlier results file to print deltas.
+
+Usage (from the repository root):
+    python embeddings/benchmark_retrieval.py --output retrieval_benchmark.json
+    python embeddings/benchmark_retrieval.py --configs configs.json --labels extra.jsonl
+    python embeddings/benchmark_retrieval.py --rerank --rerank-budget-ms 150
+"""
+
+import os
+
+# Never reach out to the network for models; use the local cache only
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from retriever import DEFAULT_RERANKER, TextbookRetriever
+from shards import DEFAULT_SHARD_DIR, ShardedRetriever
+from encoder_registry import get_cross_encoder, get_encoder
+
+DEFAULT_DATASET = "dataset/synthetic_qa_seed.json"
+DEFAULT_CONFIGS = [
+    {
+        "name": "default",
+        "shard_dir": DEFAULT_SHARD_DIR,
+        "model_name": "all-mpnet-base-v2"
+    }
+]
+K_VALUES = (1, 3, 5, 10)
+
+
+def load_labeled_questions(path):
+    """Load [{"question", "unit"}] from a JSON list or JSONL file"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            items = json.load(f)
+
+    questions = []
+    for item in items:
+        unit = item.get("unit") or item.get("expected_unit")
+        if item.get("question") and unit:
+            questions.append({"question": item["question"], "unit": unit})
+    return questions
+
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def compute_quality(ranked_units, expected_units, k_values=K_VALUES):
+    """recall@k, MRR and unit accuracy from ranked result units per question"""
+    max_k = max(k_values)
+    hits = np.zeros((len(expected_units), max_k), dtype=bool)
+    for i, (units, expected) in enumerate(zip(ranked_units, expected_units)):
+        for rank, unit in enumerate(units[:max_k]):
+            hits[i, rank] = unit == expected
+
+    has_hit = hits.any(axis=1)
+    first_hit = hits.argmax(axis=1)
+    reciprocal_ranks = np.where(has_hit, 1.0 / (first_hit + 1), 0.0)
+
+    return {
+        "recall_at_k": {str(k): float(hits[:, :k].any(axis=1).mean()) for k in k_values},
+        "mrr": float(reciprocal_ranks.mean()),
+        "unit_accuracy": float(hits[:, 0].mean())
+    }
+
+
+def summarize_latency(latencies_ms):
+    latencies = np.asarray(latencies_ms)
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+        "throughput_qps": float(len(latencies) / (latencies.sum() / 1000))
+    }
+
+
+def benchmark_config(config, questions, top_k=max(K_VALUES), warmup=3):
+    """Run every question through one retriever configuration"""
+    options = {
+        "model_name": config.get("model_name", "all-mpnet-base-v2"),
+        "backend": config.get("backend"),
+        "rerank": config.get("rerank", False),
+        "rerank_top_n": config.get("rerank_top_n", 20),
+        "rerank_budget_ms": config.get("rerank_budget_ms")
+    }
+
+    # Shared encoders load once per process; load them here so the first
+    # config's load_seconds measures the index like every other config's
+    get_encoder(options["model_name"], options["backend"]).encode(["warm up"])
+    if options["rerank"]:
+        get_cross_encoder(DEFAULT_RERANKER, options["backend"]).predict([("warm up", "warm up")])
+
+    start = time.perf_counter()
+    if "shard_dir" in config:
+        retriever = ShardedRetriever(config["shard_dir"], sources=config.get("sources"), **options)
+    else:
+        retriever = TextbookRetriever(config["index_path"], config["metadata_path"], **options)
+    load_seconds = time.perf_counter() - start
+
+    if retriever.index is None:
+        raise FileNotFoundError(f"Index for config '{config['name']}' not found")
+
+    for item in questions[:warmup]:
+        retriever.search(item["question"], top_k=top_k, min_score=0.0)
+
+    ranked_units = []
+    latencies_ms = []
+    for item in questions:
+        start = time.perf_counter()
+        results = retriever.search(item["question"], top_k=top_k, min_score=0.0)
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        ranked_units.append([r["unit"] for r in results])
+
+    if "shard_dir" in config:
+        index_bytes, metadata_bytes = retriever.shard_bytes(), 0
+    else:
+        index_bytes, metadata_bytes = file_size(config["index_path"]), file_size(config["metadata_path"])
+
+    return {
+        "name": config["name"],
+        "config": config,
+        "questions": len(questions),
+        "quality": compute_quality(ranked_units, [item["unit"] for item in questions]),
+        "latency": summarize_latency(latencies_ms),
+        "index": {
+            "vectors": int(retriever.index.ntotal),
+            "index_bytes": index_bytes,
+            "metadata_bytes": metadata_bytes,
+            "load_seconds": load_seconds
+        }
+    }
+
+
+def print_result(result):
+    quality, latency, index = result["quality"], result["latency"], result["index"]
+    recall = ", ".join(f"@{k}: {v:.3f}" for k, v in quality["recall_at_k"].items())
+    print(f"\n[{result['name']}] {result['questions']} questions, {index['vectors']} vectors")
+    print(f"  Recall {recall}")
+    print(f"  MRR: {quality['mrr']:.3f} | Unit accuracy: {quality['unit_accuracy']*100:.1f}%")
+    print(f"  Latency p50 {latency['p50_ms']:.1f} ms, p95 {latency['p95_ms']:.1f} ms, "
+          f"p99 {latency['p99_ms']:.1f} ms | {latency['throughput_qps']:.1f} q/s")
+    print(f"  Index {(index['index_bytes'] + index['metadata_bytes']) / 1e6:.1f} MB, "
+          f"load {index['load_seconds']:.2f} s")
+
+
+def print_comparison(current, previous):
+    """Print metric deltas for configurations present in both runs"""
+    previous_by_name = {r["name"]: r for r in previous["results"]}
+
+    print("\n=== COMPARISON WITH PREVIOUS RUN ===")
+    for result in current["results"]:
+        old = previous_by_name.get(result["name"])
+        if old is None:
+            continue
+        print(f"[{result['name']}]")
+        print(f"  MRR: {old['quality']['mrr']:.3f} -> {result['quality']['mrr']:.3f}")
+        print(f"  Unit accuracy: {old['quality']['unit_accuracy']:.3f} -> {result['quality']['unit_accuracy']:.3f}")
+        print(f"  p95: {old['latency']['p95_ms']:.1f} ms -> {result['latency']['p95_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval quality and latency benchmark")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--labels", nargs="*", default=[], help="Extra labeled question files (JSON/JSONL)")
+    parser.add_argument("--configs", default=None, help="JSON list of retriever configurations")
+    parser.add_argument("--output", default="retrieval_benchmark.json")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--rerank", action="store_true", help="Also benchmark each config with cross-encoder reranking")
+    parser.add_argument("--rerank-top-n", type=int, default=20)
+    parser.add_argument("--rerank-budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    questions = load_labeled_questions(args.dataset)
+    for path in args.labels:
+        questions.extend(load_labeled_questions(path))
+
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+    if args.rerank:
+        configs = configs + [
+            dict(config, name=f"{config['name']}+rerank", rerank=True,
+                 rerank_top_n=args.rerank_top_n, rerank_budget_ms=args.rerank_budget_ms)
+            for config in configs if not config.get("rerank")
+        ]
+
+    print("RETRIEVAL BENCHMARK")
+    print("=" * 60)
+    print(f"Labeled questions: {len(questions)} | Configurations: {len(configs)}")
+
+    run = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "label_files": [args.dataset] + args.labels,
+        "results": []
+    }
+    for config in configs:
+        result = benchmark_config(config, questions)
+        run["results"].append(result)
+        print_result(result)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            print_comparison(run, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
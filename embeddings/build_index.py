@@ -1,15 +1,41 @@
+import argparse
 import json
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
 import os
+import sys
 from tqdm import tqdm
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+from encoder_registry import get_encoder
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from shards import DEFAULT_SHARD_DIR, PCA_FILE, load_manifest, load_shared_pca, save_shard, save_shared_pca
+from pca import train_pca
+from quantization import PRECISIONS, build_index, check_precision, save_embeddings
+
+# Chunk file per source; each becomes its own shard
+SOURCE_FILES = {
+    "stallings": "data/processed/chunks/textbooks/stallings.json",
+    "kurose": "data/processed/chunks/textbooks/kurose.json",
+    "notes": "data/processed/chunks/notes.json",
+    "ppt": "data/processed/chunks/ppts.json"
+}
 
 class TextbookEmbedder:
-    def __init__(self, model_name="all-mpnet-base-v2"):
-        """Initialize with better Sentence-BERT model"""
-        self.model = SentenceTransformer(model_name)
-        self.dimension = 768  # all-mpnet-base-v2 embedding dimension
+    def __init__(self, model_name="all-mpnet-base-v2", precision="float32", pca_dim=None, pca_whiten=False):
+        """Initialize with better Sentence-BERT model
+        
+        precision ("float32", "float16" or "int8") applies to both the FAISS
+        index and the saved embeddings matrix; see quantization.py.
+        pca_dim reduces the index (not the saved matrix) to that many
+        dimensions with a PCA transform stored in the index; see pca.py.
+        """
+        check_precision(precision)
+        self.model_name = model_name
+        self.precision = precision
+        self.pca_dim = pca_dim
+        self.pca_whiten = pca_whiten
+        self.model = get_encoder(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()  # 768 for all-mpnet-base-v2
         
     def load_textbook_chunks(self):
         """Load only textbook chunks (highest priority)"""
@@ -39,13 +65,17 @@ class TextbookEmbedder:
     
     def build_faiss_index(self, embeddings):
         """Build FAISS index for similarity search"""
-        index = faiss.IndexFlatIP(self.dimension)  # Inner product (cosine similarity)
-        
-        # Normalize embeddings for cosine similarity
+        # Normalize embeddings for cosine similarity (inner product)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
         faiss.normalize_L2(embeddings)
-        index.add(embeddings.astype('float32'))
+        index = build_index(embeddings, self.precision, self.pca_dim, self.pca_whiten)
         
-        print(f"Built FAISS index with {index.ntotal} vectors")
+        if self.pca_dim:
+            whitened = " whitened" if self.pca_whiten else ""
+            print(f"Built {self.precision} FAISS index with {index.ntotal} vectors "
+                  f"(PCA{whitened} {embeddings.shape[1]} -> {self.pca_dim})")
+        else:
+            print(f"Built {self.precision} FAISS index with {index.ntotal} vectors")
         return index
     
     def save_index_and_metadata(self, index, chunks, embeddings):
@@ -71,12 +101,105 @@ class TextbookEmbedder:
             json.dump(metadata, f, indent=2, ensure_ascii=False)
             
         # Save embeddings separately for analysis
-        np.save("data/textbook_embeddings.npy", embeddings)
+        save_embeddings("data/textbook_embeddings.npy", embeddings, self.precision)
         
         print("Saved index and metadata to data/")
+    
+    def load_source(self, source):
+        """(chunks, float32 embeddings) of one source"""
+        with open(SOURCE_FILES[source], "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        print(f"Loaded {len(chunks)} {source} chunks")
+        return chunks, np.asarray(self.generate_embeddings(chunks), dtype=np.float32)
+    
+    def build_shard(self, source, shard_dir=DEFAULT_SHARD_DIR, chunks=None, embeddings=None, pca=None):
+        """Embed one source's chunks into its own shard; other shards are untouched
+        
+        With pca_dim, pca is the trained shared PCAMatrix (see build_shards).
+        """
+        if self.pca_dim and pca is None:
+            raise ValueError("PCA shards must share one PCA; build them with build_shards()")
+        if chunks is None:
+            chunks, embeddings = self.load_source(source)
+        
+        if pca is not None:
+            embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+            faiss.normalize_L2(embeddings)
+            index = build_index(embeddings, self.precision, pca=pca)
+            print(f"Built {self.precision} FAISS index with {index.ntotal} vectors (shared PCA -> {pca.d_out})")
+        else:
+            index = self.build_faiss_index(embeddings)
+        
+        metadata = [
+            {"unit": c["unit"], "topic": c["topic"], "source": c["source"], "page": c["page"], "text": c["text"]}
+            for c in chunks
+        ]
+        pca_settings = {"output_dim": self.pca_dim, "whiten": self.pca_whiten} if self.pca_dim else None
+        save_shard(shard_dir, source, index, metadata, self.model_name, encoder=self.model.encoder_id, pca=pca_settings)
+        print(f"Saved {source} shard to {shard_dir}")
+
+def build_shards(sources, shard_dir=DEFAULT_SHARD_DIR, model_name="all-mpnet-base-v2", precision="float32",
+                 pca_dim=None, pca_whiten=False):
+    """Rebuild the shards for the given sources, skipping sources with no chunk file
+    
+    With pca_dim, every shard projects with one shared PCA so scores stay
+    comparable across shards. It is trained on the pooled embeddings of the
+    sources being built, or reused when other shards already project with it.
+    """
+    missing = [source for source in sources if not os.path.exists(SOURCE_FILES[source])]
+    for source in missing:
+        print(f"Skipping {source}: {SOURCE_FILES[source]} not found")
+    sources = [source for source in sources if source not in missing]
+    
+    # Shards not rebuilt here keep their PCA, so the new ones must match it
+    manifest = load_manifest(shard_dir)
+    kept = [s["source"] for s in manifest["shards"] if s["source"] not in sources]
+    pca_settings = {"output_dim": pca_dim, "whiten": pca_whiten} if pca_dim else None
+    if kept and manifest.get("pca") != pca_settings:
+        raise ValueError(
+            f"Shards {', '.join(kept)} in {shard_dir} use PCA {manifest.get('pca')}, not {pca_settings}. "
+            "Rebuild every shard to change the PCA."
+        )
+    
+    embedder = TextbookEmbedder(model_name, precision, pca_dim, pca_whiten)
+    if not pca_dim or not sources:
+        for source in sources:
+            embedder.build_shard(source, shard_dir)
+        if not pca_dim and not kept and os.path.exists(os.path.join(shard_dir, PCA_FILE)):
+            os.remove(os.path.join(shard_dir, PCA_FILE))
+        return
+    
+    # All sources are embedded before any shard is written, to train the shared PCA on their pool
+    loaded = {source: embedder.load_source(source) for source in sources}
+    if not kept:
+        pooled = np.vstack([embeddings for _, embeddings in loaded.values()])
+        faiss.normalize_L2(pooled)
+        save_shared_pca(shard_dir, train_pca(pooled, pca_dim, pca_whiten))
+        print(f"Trained shared PCA {pooled.shape[1]} -> {pca_dim} on {len(pooled)} chunks")
+    for source, (chunks, embeddings) in loaded.items():
+        embedder.build_shard(source, shard_dir, chunks, embeddings, pca=load_shared_pca(shard_dir))
 
 def main():
-    embedder = TextbookEmbedder()
+    parser = argparse.ArgumentParser(description="Build the textbook FAISS index")
+    parser.add_argument("--sources", nargs="*", choices=list(SOURCE_FILES),
+                        help="Rebuild only these sources' shards (default: every source)")
+    parser.add_argument("--flat", action="store_true",
+                        help="Build the legacy single textbook-only index in data/ instead of shards")
+    parser.add_argument("--shard-dir", default=DEFAULT_SHARD_DIR)
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    parser.add_argument("--precision", choices=PRECISIONS, default="float32",
+                        help="Storage precision for the index and embeddings matrix")
+    parser.add_argument("--pca-dim", type=int, default=None,
+                        help="Reduce the index to this many dimensions with PCA (e.g. 128, 256, 384)")
+    parser.add_argument("--pca-whiten", action="store_true", help="Whiten the PCA components")
+    args = parser.parse_args()
+    
+    if not args.flat:
+        build_shards(args.sources or list(SOURCE_FILES), args.shard_dir, args.model, args.precision,
+                     args.pca_dim, args.pca_whiten)
+        return
+    
+    embedder = TextbookEmbedder(args.model, args.precision, args.pca_dim, args.pca_whiten)
     
     # Load textbook chunks only
     chunks = embedder.load_textbook_chunks()
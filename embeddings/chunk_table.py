@@ -0,0 +1,154 @@
+"""
+COLUMNAR CHUNK METADATA
+=======================
+
+Chunk metadata held as columns instead of one dict per chunk:
+
+- unit / topic / source: categorical codes (int16) + category lists
+- page: int32 (-1 when missing)
+- text: one concatenated string + int64 character offsets
+- id: int64 chunk id from the metadata file
+
+Row i is FAISS id i. Rows may be empty (removed chunks in an incremental
+store); they have code -1 and are excluded from counts and masks.
+
+Filters (mask) and group-by counts (counts) are numpy operations over the
+code columns. table[i] returns a ChunkRecord: a lazy mapping that reads
+columns on access and holds per-result fields such as similarity_score,
+so search results are built without copying metadata dicts.
+"""
+
+from collections.abc import MutableMapping
+import numpy as np
+
+CATEGORICAL_FIELDS = ("unit", "topic", "source")
+FIELDS = ("id",) + CATEGORICAL_FIELDS + ("page", "text")
+
+
+class ChunkRecord(MutableMapping):
+    """One chunk's metadata, read from the table on access, plus result fields"""
+
+    __slots__ = ("table", "row", "extra")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+        self.extra = {}
+
+    def __getitem__(self, key):
+        if key in self.extra:
+            return self.extra[key]
+        if key in FIELDS:
+            return self.table.value(key, self.row)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        self.extra[key] = value
+
+    def __delitem__(self, key):
+        del self.extra[key]
+
+    def __iter__(self):
+        yield from FIELDS
+        yield from (key for key in self.extra if key not in FIELDS)
+
+    def __len__(self):
+        return len(FIELDS) + sum(1 for key in self.extra if key not in FIELDS)
+
+    def copy(self):
+        record = ChunkRecord(self.table, self.row)
+        record.extra = dict(self.extra)
+        return record
+
+    def to_dict(self):
+        """Plain dict, e.g. for JSON responses"""
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"ChunkRecord({self.to_dict()!r})"
+
+
+class ChunkTable:
+    """Column-oriented chunk metadata aligned with FAISS ids"""
+
+    def __init__(self, ids, codes, categories, pages, text, text_offsets):
+        self.ids = ids
+        self.codes = codes              # field -> int16 array, -1 for empty rows
+        self.categories = categories    # field -> list of category values
+        self.pages = pages
+        self.text = text
+        self.text_offsets = text_offsets
+        self.live = codes["source"] >= 0
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from metadata dicts (None for empty rows)"""
+        n = len(records)
+        live = [r is not None for r in records]
+
+        codes, categories = {}, {}
+        for field in CATEGORICAL_FIELDS:
+            values = [r[field] if r is not None else "" for r in records]
+            uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+            column = np.asarray(inverse, dtype=np.int16)
+            column[~np.asarray(live, dtype=bool)] = -1
+            codes[field] = column
+            categories[field] = [str(u) for u in uniques]
+
+        ids = np.array([r.get("id", i) if r is not None else -1 for i, r in enumerate(records)], dtype=np.int64)
+        pages = np.array([r["page"] if r is not None and r.get("page") is not None else -1 for r in records], dtype=np.int32)
+
+        texts = [r["text"] if r is not None else "" for r in records]
+        text_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=text_offsets[1:])
+
+        return cls(ids, codes, categories, pages, "".join(texts), text_offsets)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, row):
+        return ChunkRecord(self, int(row))
+
+    def __iter__(self):
+        """Records for the non-empty rows"""
+        for row in np.flatnonzero(self.live):
+            yield ChunkRecord(self, int(row))
+
+    def value(self, field, row):
+        if not self.live[row]:
+            raise KeyError(f"Row {row} is empty")
+        if field == "text":
+            return self.text[self.text_offsets[row]:self.text_offsets[row + 1]]
+        if field == "page":
+            page = int(self.pages[row])
+            return page if page >= 0 else None
+        if field == "id":
+            return int(self.ids[row])
+        return self.categories[field][self.codes[field][row]]
+
+    def code(self, field, value):
+        """Category code of a value, or -2 (matches no row) if absent"""
+        try:
+            return self.categories[field].index(value)
+        except ValueError:
+            return -2
+
+    def mask(self, **filters):
+        """Boolean row mask, e.g. mask(unit="Unit 2", source=["notes", "ppt"])"""
+        mask = self.live.copy()
+        for field, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= np.isin(self.codes[field], [self.code(field, v) for v in values])
+        return mask
+
+    def counts(self, field, mask=None):
+        """Group-by count of a categorical field over the (masked) non-empty rows"""
+        codes = self.codes[field][self.live if mask is None else mask & self.live]
+        totals = np.bincount(codes, minlength=len(self.categories[field]))
+        return {category: int(count) for category, count in zip(self.categories[field], totals) if count}
+
+    def lookup(self, field, mapping, default):
+        """Per-row array of mapping[category] (default for unknown and empty rows)"""
+        table = np.array([mapping.get(c, default) for c in self.categories[field]] + [default])
+        return table[self.codes[field]]
@@ -1,7 +1,6 @@
 import json
 import numpy as np
 from retriever import TextbookRetriever
-from collections import defaultdict
 
 class IndexingEvaluator:
     def __init__(self):
@@ -11,13 +10,9 @@ class IndexingEvaluator:
         """Evaluate unit and source coverage in the index"""
         metadata = self.retriever.metadata
         
-        # Unit distribution
-        unit_counts = defaultdict(int)
-        source_counts = defaultdict(int)
-        
-        for chunk in metadata:
-            unit_counts[chunk["unit"]] += 1
-            source_counts[chunk["source"]] += 1
+        # Unit and source distribution (group-by over the columnar metadata)
+        unit_counts = metadata.counts("unit")
+        source_counts = metadata.counts("source")
             
         print("=== COVERAGE ANALYSIS ===")
         print(f"Total indexed chunks: {len(metadata)}")
@@ -0,0 +1,370 @@
+"""
+INCREMENTAL INDEX STORE
+=======================
+
+Add, remove and upsert chunks without re-encoding the whole corpus.
+
+LAYOUT (one directory per store):
+    version.json        committed version: encoder id, index file, log file, log length
+    index-<v>.faiss     IndexIDMap2 over IndexFlatIP, one file per version
+    log-<g>.jsonl       append-only metadata log, one operation per line:
+                        {"op": "add", "id": 7, "key": "...", "chunk": {...}}
+                        {"op": "remove", "key": "..."}
+
+Chunks are identified by a key: chunk["key"] if present, otherwise
+"<source>:<page>:<hash of text>". Upserting an existing key replaces it.
+
+COMMITS:
+Operations are buffered until commit(), which writes the new index file,
+appends the buffered operations to the log and then atomically replaces
+version.json. version.json records how many log lines belong to the
+version, so readers never see uncommitted lines. Lines past that count
+are left by a commit that died before publishing; the writer truncates
+them on open (and before each append), so new operations never follow
+them and ids stay paired with the right chunks.
+
+COMPACTION:
+Removed and replaced chunks leave dead ids and log lines behind. When dead
+ids exceed COMPACT_RATIO of live ones, commit() compacts: live chunks are
+renumbered 0..n-1 into a fresh index and a new log generation holding only
+their "add" lines. Keys are stable across compaction; ids are not.
+
+HOT SWAP:
+IncrementalRetriever is a TextbookRetriever over a store. refresh() (or
+watch() on a background thread) loads a newer committed version and swaps
+it in atomically; queries in flight finish on the old version.
+
+USAGE:
+    python embeddings/index_store.py embeddings/data/live add data/processed/chunks/notes.json
+    python embeddings/index_store.py embeddings/data/live remove "notes:3:1a2b..."
+    python embeddings/index_store.py embeddings/data/live compact
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import numpy as np
+import faiss
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "monitoring"))
+from encoder_registry import get_encoder
+from retriever import TextbookRetriever
+from chunk_table import ChunkTable
+import metrics
+
+FORMAT_VERSION = 1
+VERSION_FILE = "version.json"
+COMPACT_RATIO = 0.25
+METADATA_FIELDS = ("unit", "topic", "source", "page", "text")
+
+
+def chunk_key(chunk):
+    """Stable identity of a chunk for upserts and removals"""
+    if chunk.get("key"):
+        return chunk["key"]
+    digest = hashlib.sha1(chunk["text"].encode("utf-8")).hexdigest()[:16]
+    return f"{chunk['source']}:{chunk['page']}:{digest}"
+
+
+def read_version(store_dir):
+    path = os.path.join(store_dir, VERSION_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def replay_log(path, records):
+    """Metadata list indexed by id (None for removed ids) and the key -> id map"""
+    metadata, keys = [], {}
+    with open(path, "r", encoding="utf-8") as f:
+        for _, line in zip(range(records), f):
+            entry = json.loads(line)
+            if entry["op"] == "add":
+                if entry["key"] in keys:
+                    metadata[keys[entry["key"]]] = None
+                metadata.extend([None] * (entry["id"] + 1 - len(metadata)))
+                metadata[entry["id"]] = entry["chunk"]
+                keys[entry["key"]] = entry["id"]
+            elif entry["key"] in keys:
+                metadata[keys.pop(entry["key"])] = None
+    return metadata, keys
+
+
+def truncate_log(path, records):
+    """Cut the log after its first `records` lines; returns the new size in bytes"""
+    with open(path, "r+b") as f:
+        for _ in range(records):
+            if not f.readline():
+                raise ValueError(f"{path} has fewer than the {records} committed records")
+        offset = f.tell()
+        f.truncate(offset)
+    return offset
+
+
+def load_version(store_dir, version):
+    """(index, ChunkTable) for a committed version"""
+    index = faiss.read_index(os.path.join(store_dir, version["index_file"]))
+    metadata, _ = replay_log(os.path.join(store_dir, version["log_file"]), version["log_records"])
+    return index, ChunkTable.from_records(metadata)
+
+
+def check_encoder(version, encoder_id):
+    """Raise ValueError unless the store was built by this encoder (model and backend)"""
+    built_with = version.get("encoder", version["model_name"])
+    if built_with != encoder_id:
+        raise ValueError(f"Store was built with '{built_with}', not '{encoder_id}'")
+
+
+class IndexStore:
+    """Writer side: buffered add / remove / upsert with atomic commits"""
+
+    def __init__(self, store_dir, model_name="all-mpnet-base-v2", backend=None):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.model = get_encoder(model_name, backend)
+        self.pending = []
+        os.makedirs(store_dir, exist_ok=True)
+
+        self.version = read_version(store_dir)
+        if self.version is None:
+            dimension = self.model.get_sentence_embedding_dimension()
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+            self.metadata, self.keys = [], {}
+            self.version = {
+                "format_version": FORMAT_VERSION,
+                "model_name": model_name,
+                "encoder": self.model.encoder_id,
+                "dimension": dimension,
+                "version": 0,
+                "generation": 0,
+                "index_file": None,
+                "log_file": "log-0.jsonl",
+                "log_records": 0
+            }
+            open(os.path.join(store_dir, self.version["log_file"]), "w").close()
+            self.log_bytes = 0
+        else:
+            check_encoder(self.version, self.model.encoder_id)
+            self.index = faiss.read_index(os.path.join(store_dir, self.version["index_file"]))
+            log_path = os.path.join(store_dir, self.version["log_file"])
+            self.log_bytes = truncate_log(log_path, self.version["log_records"])
+            self.metadata, self.keys = replay_log(log_path, self.version["log_records"])
+
+    @property
+    def live_count(self):
+        return len(self.keys)
+
+    @property
+    def dead_count(self):
+        return len(self.metadata) - len(self.keys)
+
+    def upsert(self, chunks, batch_size=64):
+        """Add chunks, replacing any existing chunk with the same key; returns the keys"""
+        chunks = [dict({field: c[field] for field in METADATA_FIELDS}, key=chunk_key(c)) for c in chunks]
+        if not chunks:
+            return []
+
+        # Last occurrence wins within one call
+        chunks = list({c["key"]: c for c in chunks}.values())
+        self.remove([c["key"] for c in chunks if c["key"] in self.keys], log=False)
+
+        embeddings = np.asarray(self.model.encode([c["text"] for c in chunks], batch_size=batch_size), dtype=np.float32)
+        faiss.normalize_L2(embeddings)
+        ids = np.arange(len(self.metadata), len(self.metadata) + len(chunks), dtype=np.int64)
+        self.index.add_with_ids(embeddings, ids)
+
+        keys = []
+        for chunk_id, chunk in zip(ids.tolist(), chunks):
+            key = chunk.pop("key")
+            self.metadata.append(chunk)
+            self.keys[key] = chunk_id
+            self.pending.append({"op": "add", "id": chunk_id, "key": key, "chunk": chunk})
+            keys.append(key)
+        return keys
+
+    add = upsert
+
+    def remove(self, keys, log=True):
+        """Remove chunks by key; unknown keys are ignored"""
+        ids = []
+        for key in keys:
+            chunk_id = self.keys.pop(key, None)
+            if chunk_id is None:
+                continue
+            self.metadata[chunk_id] = None
+            ids.append(chunk_id)
+            if log:
+                self.pending.append({"op": "remove", "key": key})
+        if ids:
+            self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+        return len(ids)
+
+    def commit(self, compact=None):
+        """Persist buffered operations as a new version; compacts when dead ids pile up"""
+        if compact is None:
+            compact = self.dead_count > COMPACT_RATIO * max(self.live_count, 1)
+        if compact:
+            return self.compact()
+        if not self.pending and self.version["index_file"]:
+            return self.version["version"]
+
+        # Append at the committed end, dropping anything a failed commit left behind
+        log_path = os.path.join(self.store_dir, self.version["log_file"])
+        with open(log_path, "r+b") as f:
+            f.seek(self.log_bytes)
+            f.truncate()
+            for entry in self.pending:
+                f.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            log_bytes = f.tell()
+
+        self._publish(self.version["log_file"], self.version["log_records"] + len(self.pending))
+        self.log_bytes = log_bytes
+        self.pending = []
+        return self.version["version"]
+
+    def compact(self):
+        """Renumber live chunks densely into a fresh index and log generation"""
+        flat = faiss.downcast_index(self.index.index)
+        vectors = flat.reconstruct_n(0, flat.ntotal)
+        old_ids = faiss.vector_to_array(self.index.id_map)
+        rows = {chunk_id: row for row, chunk_id in enumerate(old_ids)}
+
+        live = sorted(self.keys.items(), key=lambda item: item[1])
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.version["dimension"]))
+        if live:
+            index.add_with_ids(
+                vectors[[rows[chunk_id] for _, chunk_id in live]],
+                np.arange(len(live), dtype=np.int64)
+            )
+
+        generation = self.version["generation"] + 1
+        log_file = f"log-{generation}.jsonl"
+        metadata, keys = [], {}
+        with open(os.path.join(self.store_dir, log_file), "w", encoding="utf-8") as f:
+            for new_id, (key, chunk_id) in enumerate(live):
+                chunk = self.metadata[chunk_id]
+                f.write(json.dumps({"op": "add", "id": new_id, "key": key, "chunk": chunk}, ensure_ascii=False) + "\n")
+                metadata.append(chunk)
+                keys[key] = new_id
+            f.flush()
+            os.fsync(f.fileno())
+            log_bytes = f.tell()
+
+        self.index, self.metadata, self.keys = index, metadata, keys
+        self.log_bytes = log_bytes
+        self.version["generation"] = generation
+        self._publish(log_file, len(live))
+        self.pending = []
+        print(f"Compacted store to {len(live)} live chunks (generation {generation})")
+        return self.version["version"]
+
+    def _publish(self, log_file, log_records):
+        """Write the index file, then atomically point version.json at it"""
+        previous = dict(self.version)
+        version = previous["version"] + 1
+        index_file = f"index-{version}.faiss"
+        faiss.write_index(self.index, os.path.join(self.store_dir, index_file))
+
+        self.version.update({
+            "version": version,
+            "index_file": index_file,
+            "log_file": log_file,
+            "log_records": log_records,
+            "vectors": int(self.index.ntotal)
+        })
+        path = os.path.join(self.store_dir, VERSION_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.version, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+        # Keep the previous version's files for readers still loading them
+        self._remove_stale({index_file, log_file, previous["index_file"], previous["log_file"]})
+
+    def _remove_stale(self, keep):
+        for name in os.listdir(self.store_dir):
+            if (name.startswith("index-") or name.startswith("log-")) and name not in keep:
+                os.remove(os.path.join(self.store_dir, name))
+
+
+class IncrementalRetriever(TextbookRetriever):
+    """TextbookRetriever that hot-swaps to newer committed store versions"""
+
+    def __init__(self, store_dir, model_name="all-mpnet-base-v2", backend=None, **kwargs):
+        self.store_dir = store_dir
+        self.model_name = model_name
+        self.loaded_version = None
+        self.watcher = None
+        super().__init__(index_path=store_dir, metadata_path=None, model_name=model_name, backend=backend, **kwargs)
+
+    def load_index(self):
+        if not self.refresh():
+            print(f"No committed index in {self.store_dir}. Add chunks with index_store.py first.")
+
+    def refresh(self):
+        """Swap in the latest committed version if it is newer; True if one is loaded"""
+        start = time.perf_counter()
+        version = read_version(self.store_dir)
+        if version is None or version["index_file"] is None:
+            return self.loaded_version is not None
+        if version["version"] == self.loaded_version:
+            return True
+        check_encoder(version, self.model.encoder_id)
+
+        index, metadata = load_version(self.store_dir, version)
+        self.swap(index, metadata)
+        self.loaded_version = version["version"]
+
+        print(f"Loaded index version {version['version']} with {index.ntotal} chunks")
+        metrics.observe("index_load_seconds", time.perf_counter() - start)
+        return True
+
+    def watch(self, interval=5.0):
+        """Poll the store on a daemon thread and hot-swap new versions"""
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except (OSError, ValueError) as e:
+                    print(f"Index refresh failed: {e}")
+
+        self.watcher = threading.Thread(target=poll, daemon=True)
+        self.watcher.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental index updates")
+    parser.add_argument("store_dir")
+    parser.add_argument("command", choices=["add", "remove", "compact", "stats"])
+    parser.add_argument("items", nargs="*", help="Chunk JSON files for add, keys for remove")
+    parser.add_argument("--model", default="all-mpnet-base-v2")
+    args = parser.parse_args()
+
+    store = IndexStore(args.store_dir, args.model)
+
+    if args.command == "add":
+        for path in args.items:
+            with open(path, "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+            store.upsert(chunks)
+            print(f"Upserted {len(chunks)} chunks from {path}")
+        store.commit()
+    elif args.command == "remove":
+        print(f"Removed {store.remove(args.items)} chunks")
+        store.commit()
+    elif args.command == "compact":
+        store.compact()
+
+    print(f"Version {store.version['version']}: {store.live_count} live chunks, {store.dead_count} dead ids")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+PCA DIMENSIONALITY REDUCTION FOR THE FAISS INDEX
+================================================
+
+Optionally projects the 768-d chunk embeddings onto their top principal
+components before indexing, so the index stores and scans pca_dim floats
+per chunk instead of 768.
+
+The transform is trained at build time on the chunk embeddings and stored
+inside the index file: the index is a faiss.IndexPreTransform chaining
+
+    PCAMatrix (768 -> pca_dim, optionally whitened) -> L2 normalization -> index
+
+so it still takes full-width query embeddings, and TextbookRetriever.search
+projects each query with the same transform inside index.search. Scores are
+cosine similarities in the reduced space; check min_score thresholds (and
+recall) with benchmark_pca.py before switching.
+
+WHITENING:
+whiten=True scales each component to unit variance (eigen_power -0.5), so
+retrieval is not dominated by the few highest-variance directions.
+
+SHARED PCA:
+Indexes searched together (the per-source shards) must project with the
+same PCA, or their scores live in different spaces and cannot be merged.
+train_pca() trains one transform to pass to every such index.
+"""
+
+import numpy as np
+import faiss
+
+PCA_DIMS = (128, 256, 384)
+PCA_MAX_TRAIN = 100000  # embeddings sampled to train a shared PCA
+
+
+def check_pca_dim(dimension, pca_dim, n_train):
+    if not 0 < pca_dim < dimension:
+        raise ValueError(f"PCA dimension must be between 1 and {dimension - 1}, got {pca_dim}")
+    if n_train < pca_dim:
+        raise ValueError(f"PCA to {pca_dim} dimensions needs at least {pca_dim} training vectors, got {n_train}")
+
+
+def train_pca(embeddings, pca_dim, whiten=False, max_train=PCA_MAX_TRAIN):
+    """PCAMatrix trained on (a sample of) the embeddings, with its training state dropped"""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    check_pca_dim(embeddings.shape[1], pca_dim, len(embeddings))
+    if len(embeddings) > max_train:
+        sample = np.random.default_rng(0).choice(len(embeddings), max_train, replace=False)
+        embeddings = np.ascontiguousarray(embeddings[np.sort(sample)])
+
+    pca = faiss.PCAMatrix(embeddings.shape[1], pca_dim, -0.5 if whiten else 0.0)
+    pca.train(embeddings)
+    pca.PCAMat.clear()
+    return pca
+
+
+def pca_index(index, dimension, whiten=False, pca=None):
+    """Wrap an (untrained) index over pca_dim = index.d vectors so it takes dimension-wide ones
+
+    pca is an already trained PCAMatrix to use instead of training a new one.
+    """
+    wrapped = faiss.IndexPreTransform(faiss.NormalizationTransform(index.d, 2.0), index)
+    wrapped.prepend_transform(pca if pca is not None else faiss.PCAMatrix(dimension, index.d, -0.5 if whiten else 0.0))
+    return wrapped
+
+
+def drop_training_state(index):
+    """Free the PCA's full eigenvector matrix (d_in x d_in); search only needs the d_out x d_in projection"""
+    for i in range(index.chain.size()):
+        transform = faiss.downcast_VectorTransform(index.chain.at(i))
+        if isinstance(transform, faiss.PCAMatrix):
+            transform.PCAMat.clear()
+
+
+def pca_info(index):
+    """{"input_dim", "output_dim", "whiten"} of an index's PCA transform, or None"""
+    if not isinstance(index, faiss.IndexPreTransform):
+        return None
+    for i in range(index.chain.size()):
+        transform = faiss.downcast_VectorTransform(index.chain.at(i))
+        if isinstance(transform, faiss.PCAMatrix):
+            return {"input_dim": transform.d_in, "output_dim": transform.d_out, "whiten": transform.eigen_power != 0}
+    return None
@@ -0,0 +1,111 @@
+"""
+REDUCED-PRECISION EMBEDDING STORAGE
+===================================
+
+Storage options for the saved embeddings matrix and the FAISS index:
+
+- float32: full precision (IndexFlatIP), 4 bytes per dimension
+- float16: half precision (.npy / IndexScalarQuantizer QT_fp16), 2 bytes
+- int8:    scalar-quantized, 1 byte per dimension. The saved matrix uses a
+           symmetric per-dimension scale (codes * scale ~ embedding); the
+           FAISS index uses QT_8bit, which learns a per-dimension range.
+
+Matrices are loaded back as float32 for analysis. Measure the recall cost
+of each option with benchmark_quantization.py before switching.
+
+build_index can also reduce the index to pca_dim dimensions (pca.py), with
+a PCA trained on the embeddings or a shared one passed in; the precision
+then applies to the reduced vectors.
+"""
+
+import numpy as np
+import faiss
+from pca import check_pca_dim, drop_training_state, pca_index
+
+PRECISIONS = ("float32", "float16", "int8")
+
+
+def check_precision(precision):
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Choose from: {', '.join(PRECISIONS)}")
+
+
+def quantize_int8(embeddings):
+    """(int8 codes, float32 per-dimension scale) with codes * scale ~ embeddings"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    scale = np.abs(embeddings).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(embeddings / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+def dequantize_int8(codes, scale):
+    return codes.astype(np.float32) * scale
+
+
+def embeddings_file(path, precision):
+    """File name for a saved matrix: .npz for int8 (codes + scale), .npy otherwise"""
+    base = path[:-4] if path.endswith((".npy", ".npz")) else path
+    return base + (".npz" if precision == "int8" else ".npy")
+
+
+def save_embeddings(path, embeddings, precision="float32"):
+    """Save the embeddings matrix at the given precision; returns the file written"""
+    check_precision(precision)
+    path = embeddings_file(path, precision)
+
+    if precision == "int8":
+        codes, scale = quantize_int8(embeddings)
+        np.savez(path, codes=codes, scale=scale)
+    else:
+        np.save(path, np.asarray(embeddings, dtype=precision))
+    return path
+
+
+def load_embeddings(path):
+    """Load a matrix saved by save_embeddings as float32"""
+    if path.endswith(".npz"):
+        with np.load(path) as data:
+            return dequantize_int8(data["codes"], data["scale"])
+    return np.load(path).astype(np.float32)
+
+
+def empty_index(dimension, precision="float32"):
+    """Untrained inner-product index storing vectors at the given precision"""
+    check_precision(precision)
+    if precision == "float32":
+        return faiss.IndexFlatIP(dimension)
+    qtype = faiss.ScalarQuantizer.QT_fp16 if precision == "float16" else faiss.ScalarQuantizer.QT_8bit
+    return faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_INNER_PRODUCT)
+
+
+def build_index(embeddings, precision="float32", pca_dim=None, whiten=False, pca=None):
+    """Inner-product FAISS index over L2-normalized embeddings at the given precision
+
+    With pca_dim, a PCA transform (optionally whitened) is trained on the
+    embeddings and stored in the index; see pca.py. A trained pca
+    (PCAMatrix to pca_dim) is stored instead of training one.
+    """
+    check_precision(precision)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    dimension = embeddings.shape[1]
+
+    if pca is not None:
+        index = pca_index(empty_index(pca.d_out, precision), dimension, pca=pca)
+    elif pca_dim:
+        check_pca_dim(dimension, pca_dim, len(embeddings))
+        index = pca_index(empty_index(pca_dim, precision), dimension, whiten)
+    else:
+        index = empty_index(dimension, precision)
+
+    if not index.is_trained:
+        index.train(embeddings)
+    if pca_dim and pca is None:
+        drop_training_state(index)
+    index.add(embeddings)
+    return index
+
+
+def index_bytes(index):
+    """Serialized size of a FAISS index"""
+    return int(faiss.serialize_index(index).nbytes)
@@ -1,29 +1,117 @@
 import json
+import os
+import sys
+import threading
+import time
 import numpy as np
 import faiss
-from sentence_transformers import SentenceTransformer
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "monitoring"))
+from encoder_registry import get_cross_encoder, get_encoder
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from chunk_table import ChunkTable
+from pca import pca_info
+import metrics
+
+DEFAULT_RERANKER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Pairs scored to seed the per-pair rerank cost before the first budgeted request.
+# A small batch amortizes less overhead than a real one, so the seed errs slow.
+RERANK_PROBE_PAIRS = 4
+RERANK_PROBE_TEXT = "A router forwards packets between networks using its routing table. " * 8
+
+# Source hierarchy: Stallings (primary) > Kurose (secondary) > Notes > PPTs.
+# Boosts are added to cosine similarity when ranking by source priority.
+SOURCE_PRIORITY = ("stallings", "kurose", "notes", "ppt")
+SOURCE_BOOSTS = (0.06, 0.04, 0.02, 0.0)
+SOURCE_IDS = {source: i for i, source in enumerate(SOURCE_PRIORITY)}
 
 class TextbookRetriever:
-    def __init__(self):
-        """Initialize retriever with pre-built index"""
-        self.model = SentenceTransformer("all-mpnet-base-v2")
+    def __init__(self, index_path="embeddings/data/textbook_index.faiss",
+                 metadata_path="embeddings/data/textbook_metadata.json",
+                 model_name="all-mpnet-base-v2", backend=None,
+                 rerank=False, reranker_model=DEFAULT_RERANKER, rerank_top_n=20, rerank_budget_ms=None,
+                 question_cache=None):
+        """Initialize retriever with pre-built index
+        
+        With rerank=True, search() re-scores the top rerank_top_n FAISS
+        candidates with a cross-encoder, within rerank_budget_ms per request.
+        The cross-encoder is then loaded and timed here, not on the first request.
+        """
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.backend = backend
+        self.model = get_encoder(model_name, backend)
+        
+        # Cross-encoder is loaded on first use (or below, when reranking by default)
+        self.rerank_enabled = rerank
+        self.reranker_model = reranker_model
+        self.rerank_top_n = rerank_top_n
+        self.rerank_budget_ms = rerank_budget_ms
+        self.reranker = None
+        self.rerank_ms_per_pair = None  # running estimate used to fit the budget
+        
         self.index = None
         self.metadata = None
+        self.source_ids = None     # per FAISS id: position in SOURCE_PRIORITY
+        self.source_boosts = None  # per FAISS id: SOURCE_BOOSTS of its source
+        self.swap_lock = threading.Lock()
+        self.index_version = 0  # bumped on every swap; invalidates question_cache
+        self.question_cache = question_cache  # optional semantic_cache.SemanticCache
         self.load_index()
+        if rerank:
+            self.warm_reranker()
         
     def load_index(self):
         """Load FAISS index and metadata"""
+        start = time.perf_counter()
         try:
-            self.index = faiss.read_index("embeddings/data/textbook_index.faiss")
+            self.index = faiss.read_index(self.index_path)
             
-            with open("embeddings/data/textbook_metadata.json", "r", encoding="utf-8") as f:
-                self.metadata = json.load(f)
+            with open(self.metadata_path, "r", encoding="utf-8") as f:
+                self.metadata = ChunkTable.from_records(json.load(f))
+            self.build_source_arrays()
                 
             print(f"Loaded index with {len(self.metadata)} textbook chunks")
+            pca = pca_info(self.index)
+            if pca:
+                whitened = " whitened" if pca["whiten"] else ""
+                print(f"Queries are projected with{whitened} PCA {pca['input_dim']} -> {pca['output_dim']}")
+            metrics.observe("index_load_seconds", time.perf_counter() - start)
             
         except FileNotFoundError:
             print("Index not found. Run build_index.py first.")
             
+    def build_source_arrays(self):
+        """Per-FAISS-id source arrays (metadata row i is FAISS id i)"""
+        self.source_ids, self.source_boosts = self.source_arrays(self.metadata)
+    
+    @staticmethod
+    def source_arrays(metadata):
+        # Unknown sources (and empty rows) rank after PPTs
+        source_ids = metadata.lookup("source", SOURCE_IDS, len(SOURCE_PRIORITY)).astype(np.int8)
+        return source_ids, np.array(SOURCE_BOOSTS + (0.0,), dtype=np.float32)[source_ids]
+    
+    def snapshot(self):
+        """Consistent (index, metadata, source_ids, source_boosts) for one query"""
+        with self.swap_lock:
+            return self.index, self.metadata, self.source_ids, self.source_boosts
+    
+    def swap(self, index, metadata):
+        """Atomically replace the index and metadata (a ChunkTable); in-flight queries finish on the old ones"""
+        source_ids, source_boosts = self.source_arrays(metadata)
+        with self.swap_lock:
+            old_index = self.index
+            self.index, self.metadata = index, metadata
+            self.source_ids, self.source_boosts = source_ids, source_boosts
+            self.index_version += 1
+        if old_index is not None and old_index is not index and hasattr(old_index, "close"):
+            old_index.close()
+
+    def close(self):
+        """Release resources held by the index (a sharded index's worker threads)"""
+        if hasattr(self.index, "close"):
+            self.index.close()
+            
     def preprocess_query(self, query):
         """Enhance query for better matching"""
         # Add context keywords for technical terms
@@ -41,51 +129,198 @@ class TextbookRetriever:
                 
         return query
     
-    def search(self, query, top_k=5, min_score=0.3):
-        """Search for relevant textbook chunks"""
-        if not self.index or not self.metadata:
+    def encode_query(self, query):
+        """Normalized float32 embedding (1 x dim) of the preprocessed query"""
+        query_embedding = np.asarray(self.model.encode([self.preprocess_query(query)]), dtype=np.float32)
+        faiss.normalize_L2(query_embedding)
+        return query_embedding
+    
+    def warm_reranker(self, pairs=None):
+        """Load the cross-encoder and seed rerank_ms_per_pair from a probe batch
+        
+        Model loading and the first (warm-up) forward pass are not counted
+        in the estimate. Returns the milliseconds spent.
+        """
+        start = time.perf_counter()
+        if self.reranker is None:
+            self.reranker = get_cross_encoder(self.reranker_model, self.backend)
+        pairs = pairs or [("What does a router do?", RERANK_PROBE_TEXT)] * RERANK_PROBE_PAIRS
+        self.reranker.predict(pairs, batch_size=len(pairs))
+        
+        probe_start = time.perf_counter()
+        self.reranker.predict(pairs, batch_size=len(pairs))
+        per_pair_ms = (time.perf_counter() - probe_start) * 1000 / len(pairs)
+        if self.rerank_ms_per_pair is None or per_pair_ms > self.rerank_ms_per_pair:
+            self.rerank_ms_per_pair = per_pair_ms
+        return (time.perf_counter() - start) * 1000
+    
+    def rerank(self, query, results, budget_ms=None):
+        """Re-score results with the cross-encoder in one batched forward pass
+        
+        With a budget, only as many leading candidates as the running
+        per-pair cost estimate allows are re-scored (truncated); if fewer
+        than two fit, reranking is skipped and the results are unchanged.
+        Without an estimate yet, a probe batch of this request's own pairs
+        seeds one first, and the time it took comes out of the budget.
+        """
+        n = len(results)
+        if budget_ms is not None and self.rerank_ms_per_pair is None:
+            probe = [(query, r["text"]) for r in results[:RERANK_PROBE_PAIRS]]
+            budget_ms -= self.warm_reranker(probe)
+        if budget_ms is not None:
+            n = min(n, int(budget_ms / max(self.rerank_ms_per_pair, 1e-6)))
+        
+        if n < 2:
+            metrics.inc("rerank_total", outcome="skipped")
+            return results
+        
+        if self.reranker is None:
+            self.reranker = get_cross_encoder(self.reranker_model, self.backend)
+        
+        start = time.perf_counter()
+        scores = self.reranker.predict([(query, r["text"]) for r in results[:n]], batch_size=n)
+        per_pair_ms = (time.perf_counter() - start) * 1000 / n
+        
+        # Smooth the estimate so one slow batch does not disable reranking
+        if self.rerank_ms_per_pair is None:
+            self.rerank_ms_per_pair = per_pair_ms
+        else:
+            self.rerank_ms_per_pair = 0.8 * self.rerank_ms_per_pair + 0.2 * per_pair_ms
+        
+        for result, score in zip(results[:n], scores):
+            result["rerank_score"] = float(score)
+        head = sorted(results[:n], key=lambda r: r["rerank_score"], reverse=True)
+        
+        metrics.inc("rerank_total", outcome="full" if n == len(results) else "truncated")
+        return head + results[n:]
+    
+    def search(self, query, top_k=5, min_score=0.3, rerank=None, latency_budget_ms=None, filters=None):
+        """Search for relevant textbook chunks
+        
+        rerank / latency_budget_ms override the constructor settings for
+        this request. The budget covers the whole search; whatever is left
+        after encoding and FAISS search is available for reranking.
+        filters (e.g. {"unit": "Unit 2"}) drop candidates via ChunkTable.mask.
+        For PCA-reduced indexes (pca.py) the full-width query embedding is
+        projected by the index's own transform inside index.search.
+        With a question_cache, results for the same or a paraphrased query
+        (and the same parameters) are returned without searching again.
+        """
+        with self.swap_lock:
+            index, metadata, version = self.index, self.metadata, self.index_version
+        if not index or not metadata:
             return []
+        
+        start = time.perf_counter()
+        rerank = self.rerank_enabled if rerank is None else rerank
+        budget_ms = self.rerank_budget_ms if latency_budget_ms is None else latency_budget_ms
+        candidate_k = max(top_k, self.rerank_top_n) if rerank else top_k
             
-        # Preprocess query
-        enhanced_query = self.preprocess_query(query)
+        clock = metrics.stage_clock("retrieval_stage_seconds")
         
-        # Generate query embedding
-        query_embedding = self.model.encode([enhanced_query])
-        faiss.normalize_L2(query_embedding)
+        # Preprocess and embed query (a cache hit on the exact text skips encoding)
+        if self.question_cache is not None:
+            cache_key = (top_k, min_score, rerank, repr(sorted((filters or {}).items())))
+            cached, query_embedding = self.question_cache.get(
+                query, encode=lambda: self.encode_query(query), key=cache_key, version=version
+            )
+            clock.mark("cache_lookup")
+            if cached is not None:
+                return [result.copy() for result in cached]
+        else:
+            query_embedding = self.encode_query(query)
+            clock.mark("encode")
         
         # Search FAISS index
-        scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        scores, indices = index.search(query_embedding, candidate_k)
+        clock.mark("faiss_search")
+        
+        # Filter by minimum similarity (and metadata filters) over the candidate arrays
+        scores, indices = scores[0], indices[0]
+        keep = (indices >= 0) & (scores >= min_score)
+        if filters:
+            keep &= metadata.mask(**filters)[indices]
         
         results = []
-        for score, idx in zip(scores[0], indices[0]):
-            if score >= min_score:  # Filter by minimum similarity
-                chunk = self.metadata[idx].copy()
-                chunk["similarity_score"] = float(score)
-                results.append(chunk)
-                
+        for score, idx in zip(scores[keep], indices[keep]):
+            chunk = metadata[idx]
+            chunk["similarity_score"] = float(score)
+            results.append(chunk)
+        clock.mark("assemble")
+        
+        if rerank and len(results) > 1:
+            remaining_ms = None if budget_ms is None else budget_ms - (time.perf_counter() - start) * 1000
+            results = self.rerank(query, results, remaining_ms)
+            clock.mark("rerank")
+        
+        results = results[:top_k]
+        if self.question_cache is not None:
+            self.question_cache.put(query, query_embedding, [result.copy() for result in results],
+                                    key=cache_key, version=version)
         return results
     
     def search_by_unit(self, query, unit, top_k=3):
         """Search within specific syllabus unit"""
-        all_results = self.search(query, top_k=20)  # Get more results first
-        
-        # Filter by unit
-        unit_results = [r for r in all_results if r["unit"] == unit]
+        # Filter by unit among the top 20 candidates
+        unit_results = self.search(query, top_k=20, filters={"unit": unit})
         
         return unit_results[:top_k]
     
-    def get_source_priority_results(self, query, top_k=5):
-        """Get results with Stallings prioritized over Kurose"""
-        results = self.search(query, top_k=top_k*2)
+    def get_source_priority_results(self, query, top_k=5, min_score=0.3, quotas=None, candidate_factor=4):
+        """Get results ranked by the Stallings > Kurose > Notes > PPTs hierarchy
+        
+        By default each candidate's similarity gets its source's boost from
+        SOURCE_BOOSTS, so a textbook chunk outranks a slightly closer slide
+        but not a much closer one. With quotas, e.g. {"stallings": 2,
+        "kurose": 2}, sources fill their quota in priority order and the
+        remaining slots go to the best leftover candidates.
+        
+        Either way a single FAISS search of top_k * candidate_factor
+        candidates runs; priorities come from the per-id source arrays.
+        """
+        index, metadata, source_ids, source_boosts = self.snapshot()
+        if not index or not metadata:
+            return []
+        
+        clock = metrics.stage_clock("retrieval_stage_seconds")
+        query_embedding = self.encode_query(query)
+        clock.mark("encode")
         
-        # Separate by source
-        stallings_results = [r for r in results if r["source"] == "stallings"]
-        kurose_results = [r for r in results if r["source"] == "kurose"]
+        scores, indices = index.search(query_embedding, top_k * candidate_factor)
+        scores, indices = scores[0], indices[0]
+        keep = (indices >= 0) & (scores >= min_score)
+        scores, indices = scores[keep], indices[keep]
+        clock.mark("faiss_search")
         
-        # Prioritize Stallings, then Kurose
-        prioritized = stallings_results[:top_k//2] + kurose_results[:top_k//2]
+        priority_scores = scores + source_boosts[indices]
+        if quotas is None:
+            order = np.argsort(-priority_scores, kind="stable")[:top_k]
+        else:
+            order = self._fill_quotas(source_ids[indices], quotas, top_k)
+        
+        results = []
+        for i in order:
+            chunk = metadata[indices[i]]
+            chunk["similarity_score"] = float(scores[i])
+            chunk["priority_score"] = float(priority_scores[i])
+            results.append(chunk)
+        clock.mark("assemble")
+        
+        return results
+    
+    def _fill_quotas(self, candidate_sources, quotas, top_k):
+        """Candidate positions (sorted by similarity) picked tier by tier"""
+        selected = np.zeros(len(candidate_sources), dtype=bool)
+        picked = []
+        for source_id, source in enumerate(SOURCE_PRIORITY):
+            quota = min(quotas.get(source, 0), top_k - len(picked))
+            if quota > 0:
+                members = np.flatnonzero(candidate_sources == source_id)[:quota]
+                selected[members] = True
+                picked.extend(members)
         
-        return prioritized[:top_k]
+        leftovers = np.flatnonzero(~selected)[:top_k - len(picked)]
+        return np.concatenate([np.asarray(picked, dtype=np.int64), leftovers])
 
 def test_retrieval():
     """Test the retrieval system"""
@@ -0,0 +1,216 @@
+"""
+PER-SOURCE INDEX SHARDS
+=======================
+
+One FAISS index + metadata file per chunk source (stallings, kurose,
+notes, ppt), listed in a manifest so each shard can be rebuilt on its own:
+re-chunking the notes only re-embeds the notes.
+
+LAYOUT (embeddings/data/shards/ by default):
+    manifest.json      model name, encoder id, dimension, PCA settings and one entry per shard
+    <source>.faiss     FAISS index for that source
+    <source>.json      metadata rows, row i = shard id i
+    pca.faiss          shared PCA transform, when built with --pca-dim
+
+PCA:
+Shards built with a PCA all embed the same trained transform (also kept in
+pca.faiss), so their reduced-space scores can be merged. Rebuilding some
+shards reuses it; changing the PCA settings means rebuilding every shard.
+
+QUERYING:
+ShardedIndex presents the shards as one FAISS-like index over a global id
+space (shard ids offset by the sizes of the shards before it). search()
+fans out to every shard on a thread pool - FAISS releases the GIL - and
+merges the per-shard top-k. ShardedRetriever is a TextbookRetriever backed
+by it, so search / rerank / source priority work unchanged.
+
+Build every shard with: python embeddings/build_index.py
+Rebuild only some with: python embeddings/build_index.py --sources notes ppt
+"""
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+import faiss
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "monitoring"))
+from retriever import TextbookRetriever
+from chunk_table import ChunkTable
+import metrics
+
+FORMAT_VERSION = 1
+DEFAULT_SHARD_DIR = "embeddings/data/shards"
+MANIFEST_FILE = "manifest.json"
+PCA_FILE = "pca.faiss"
+
+
+def load_manifest(shard_dir):
+    """Manifest dict, or an empty one when no shard has been built yet"""
+    path = os.path.join(shard_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"format_version": FORMAT_VERSION, "shards": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_shared_pca(shard_dir, pca):
+    """Write the PCA every shard projects with (write-then-rename)"""
+    os.makedirs(shard_dir, exist_ok=True)
+    path = os.path.join(shard_dir, PCA_FILE)
+    faiss.write_VectorTransform(pca, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+def load_shared_pca(shard_dir):
+    """A fresh copy of the shared PCA transform, to embed in one shard's index"""
+    return faiss.read_VectorTransform(os.path.join(shard_dir, PCA_FILE))
+
+
+def save_shard(shard_dir, source, index, metadata, model_name, encoder=None, pca=None):
+    """Write one shard and replace its manifest entry, leaving other shards untouched
+
+    encoder is the producing encoder's encoder_id (default: model_name);
+    pca is the shared PCA's settings ({"output_dim", "whiten"}) or None.
+    """
+    encoder = encoder or model_name
+    os.makedirs(shard_dir, exist_ok=True)
+    index_file = f"{source}.faiss"
+    metadata_file = f"{source}.json"
+
+    # Check before writing anything, so a mismatched build leaves the shards intact
+    manifest = load_manifest(shard_dir)
+    built_with = manifest.get("encoder", manifest.get("model_name"))
+    if manifest["shards"] and built_with != encoder:
+        raise ValueError(
+            f"Shards in {shard_dir} were built with '{built_with}', not '{encoder}'. "
+            "Rebuild every shard with one model and backend."
+        )
+
+    # Write both files in full, then rename: a reader never sees a half-written file
+    index_path = os.path.join(shard_dir, index_file)
+    metadata_path = os.path.join(shard_dir, metadata_file)
+    faiss.write_index(index, index_path + ".tmp")
+    with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+    os.replace(index_path + ".tmp", index_path)
+    os.replace(metadata_path + ".tmp", metadata_path)
+
+    manifest.update({"format_version": FORMAT_VERSION, "model_name": model_name, "encoder": encoder,
+                     "dimension": index.d, "pca": pca})
+    manifest["shards"] = [s for s in manifest["shards"] if s["source"] != source] + [{
+        "source": source,
+        "index_file": index_file,
+        "metadata_file": metadata_file,
+        "vectors": int(index.ntotal),
+        "built_at": datetime.now().isoformat(timespec="seconds")
+    }]
+
+    path = os.path.join(shard_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+class ShardedIndex:
+    """Several FAISS indexes searched in parallel as one global id space"""
+
+    def __init__(self, shards, max_workers=None):
+        self.shards = shards
+        self.offsets = np.cumsum([0] + [shard.ntotal for shard in shards])[:-1]
+        self.ntotal = int(sum(shard.ntotal for shard in shards))
+        self.d = shards[0].d if shards else 0
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or max(len(shards), 1))
+
+    def close(self):
+        """Stop the worker threads; searches already running on this index finish serially"""
+        self.pool.shutdown(wait=False)
+
+    def _search_shard(self, shard, offset, queries, k):
+        scores, ids = shard.search(queries, min(k, shard.ntotal))
+        return scores, np.where(ids >= 0, ids + offset, -1)
+
+    def search(self, queries, k):
+        """FAISS-style (scores, ids), each (n_queries x k), padded with -inf / -1"""
+        work = [(shard, offset) for shard, offset in zip(self.shards, self.offsets) if shard.ntotal]
+        try:
+            parts = list(self.pool.map(lambda args: self._search_shard(args[0], args[1], queries, k), work))
+        except RuntimeError:
+            # Closed by a swap while this query still held the old index
+            parts = [self._search_shard(shard, offset, queries, k) for shard, offset in work]
+        if not parts:
+            return np.full((len(queries), k), -np.inf, dtype=np.float32), np.full((len(queries), k), -1, dtype=np.int64)
+
+        scores = np.concatenate([p[0] for p in parts], axis=1)
+        ids = np.concatenate([p[1] for p in parts], axis=1)
+        scores = np.where(ids >= 0, scores, -np.inf)
+
+        if scores.shape[1] < k:
+            pad = k - scores.shape[1]
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+
+        # Merge: each shard's list is already sorted, so only the global top-k is ordered
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1), axis=1)
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(ids, top, axis=1)
+
+
+class ShardedRetriever(TextbookRetriever):
+    """TextbookRetriever over every shard listed in a manifest"""
+
+    def __init__(self, shard_dir=DEFAULT_SHARD_DIR, model_name="all-mpnet-base-v2", backend=None,
+                 sources=None, max_workers=None, **kwargs):
+        self.shard_dir = shard_dir
+        self.sources = sources  # None = every shard in the manifest
+        self.max_workers = max_workers
+        self.model_name = model_name
+        super().__init__(
+            index_path=os.path.join(shard_dir, MANIFEST_FILE),
+            metadata_path=None,
+            model_name=model_name,
+            backend=backend,
+            **kwargs
+        )
+
+    def load_index(self):
+        """Load every shard in the manifest into one ShardedIndex"""
+        start = time.perf_counter()
+        manifest = load_manifest(self.shard_dir)
+        if not manifest["shards"]:
+            print(f"No shards found in {self.shard_dir}. Run build_index.py first.")
+            return
+
+        built_with = manifest.get("encoder", manifest["model_name"])
+        if built_with != self.model.encoder_id:
+            raise ValueError(
+                f"Shards were built with '{built_with}' but the retriever uses '{self.model.encoder_id}'"
+            )
+
+        shards, metadata = [], []
+        for entry in manifest["shards"]:
+            if self.sources and entry["source"] not in self.sources:
+                continue
+            shards.append(faiss.read_index(os.path.join(self.shard_dir, entry["index_file"])))
+            with open(os.path.join(self.shard_dir, entry["metadata_file"]), "r", encoding="utf-8") as f:
+                # Ids are global (row in the loaded shards), so they depend on which shards are loaded
+                metadata.extend(dict(record, id=i) for i, record in enumerate(json.load(f), start=len(metadata)))
+
+        # Through swap so a reload closes the previous index's worker threads
+        self.swap(ShardedIndex(shards, self.max_workers), ChunkTable.from_records(metadata))
+
+        print(f"Loaded {len(shards)} shards with {len(self.metadata)} chunks")
+        metrics.observe("index_load_seconds", time.perf_counter() - start)
+
+    def shard_bytes(self):
+        """Total size on disk of the loaded shards (index + metadata)"""
+        total = 0
+        for entry in load_manifest(self.shard_dir)["shards"]:
+            if self.sources and entry["source"] not in self.sources:
+                continue
+            for name in (entry["index_file"], entry["metadata_file"]):
+                total += os.path.getsize(os.path.join(self.shard_dir, name))
+        return total
@@ -45,8 +45,9 @@ def test_source_coverage():
     """Test textbook source coverage"""
     retriever = TextbookRetriever()
     
-    stallings_count = sum(1 for chunk in retriever.metadata if chunk['source'] == 'stallings')
-    kurose_count = sum(1 for chunk in retriever.metadata if chunk['source'] == 'kurose')
+    source_counts = retriever.metadata.counts('source')
+    stallings_count = source_counts.get('stallings', 0)
+    kurose_count = source_counts.get('kurose', 0)
     
     print(f"\n=== SOURCE COVERAGE ===")
     print(f"Stallings chunks: {stallings_count}")
@@ -63,7 +64,7 @@ def test_unit_coverage():
     """Test syllabus unit coverage"""
     retriever = TextbookRetriever()
     
-    units = set(chunk['unit'] for chunk in retriever.metadata)
+    units = set(retriever.metadata.counts('unit'))
     expected_units = {'Unit 1', 'Unit 2', 'Unit 3', 'Unit 4', 'Unit 5'}
     
     print(f"\n=== UNIT COVERAGE ===")
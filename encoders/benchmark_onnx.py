@@ -0,0 +1,131 @@
+"""
+ONNX BACKEND PARITY AND LATENCY BENCHMARK
+=========================================
+
+Compares the quantized ONNX encoders against the PyTorch models on the
+synthetic QA set (questions and answers).
+
+PARITY:
+- Cosine agreement between torch and ONNX embeddings of the same text
+- Passes when the minimum cosine is at least --min-cosine
+
+LATENCY:
+- Single-query encode latency (p50 / p95) over the questions
+- Batched throughput (texts / second) over questions + answers
+
+Usage:
+    python encoders/benchmark_onnx.py --output onnx_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from encoder_backend import load_encoder
+from export_onnx import DEFAULT_MODELS
+
+DATASET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dataset", "synthetic_qa_seed.json")
+
+
+def load_texts(dataset_path):
+    """Questions and answers from the synthetic QA set"""
+    with open(dataset_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    questions = [item["question"] for item in data]
+    answers = [item["answer"] for item in data if item.get("answer")]
+    return questions, answers
+
+
+def cosine_agreement(a, b):
+    """Row-wise cosine similarity between two embedding matrices"""
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return (a * b).sum(axis=1)
+
+
+def measure_latency(encoder, questions, texts, batch_size=32):
+    """Single-query percentiles and batched throughput"""
+    encoder.encode(questions[:2])  # warm-up
+
+    timings = []
+    for question in questions:
+        start = time.perf_counter()
+        encoder.encode([question])
+        timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    encoder.encode(texts, batch_size=batch_size)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "single_p50_ms": float(np.percentile(timings, 50)),
+        "single_p95_ms": float(np.percentile(timings, 95)),
+        "batch_texts_per_second": len(texts) / batch_seconds
+    }
+
+
+def benchmark_model(model_name, questions, answers):
+    torch_encoder = load_encoder(model_name, backend="torch")
+    onnx_encoder = load_encoder(model_name, backend="onnx")
+    texts = questions + answers
+
+    cosines = cosine_agreement(
+        np.asarray(torch_encoder.encode(texts), dtype=np.float32),
+        np.asarray(onnx_encoder.encode(texts), dtype=np.float32)
+    )
+
+    return {
+        "model": model_name,
+        "texts": len(texts),
+        "parity": {
+            "mean_cosine": float(cosines.mean()),
+            "min_cosine": float(cosines.min()),
+            "p5_cosine": float(np.percentile(cosines, 5))
+        },
+        "torch": measure_latency(torch_encoder, questions, texts),
+        "onnx": measure_latency(onnx_encoder, questions, texts)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX vs PyTorch encoder parity and latency")
+    parser.add_argument("models", nargs="*", default=DEFAULT_MODELS)
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--min-cosine", type=float, default=0.98)
+    parser.add_argument("--output", default=None, help="Write results as JSON")
+    args = parser.parse_args()
+
+    questions, answers = load_texts(args.dataset)
+    results = []
+    all_passed = True
+
+    print("ONNX BACKEND BENCHMARK")
+    print("=" * 60)
+
+    for model_name in args.models:
+        result = benchmark_model(model_name, questions, answers)
+        result["parity"]["passed"] = result["parity"]["min_cosine"] >= args.min_cosine
+        all_passed = all_passed and result["parity"]["passed"]
+        results.append(result)
+
+        parity = result["parity"]
+        status = "PASS" if parity["passed"] else "FAIL"
+        print(f"\n{model_name} ({result['texts']} texts)")
+        print(f"  {status} Cosine agreement: mean {parity['mean_cosine']:.4f}, min {parity['min_cosine']:.4f}")
+        for backend in ("torch", "onnx"):
+            timing = result[backend]
+            print(f"  {backend:<5} single p50 {timing['single_p50_ms']:.1f} ms, "
+                  f"p95 {timing['single_p95_ms']:.1f} ms, batch {timing['batch_texts_per_second']:.1f} texts/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    print("\nSUCCESS: ONNX parity check passed" if all_passed else "\nWARNING: ONNX parity below threshold")
+    return 0 if all_passed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
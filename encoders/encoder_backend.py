@@ -0,0 +1,221 @@
+"""
+SENTENCE ENCODER BACKENDS
+=========================
+
+Selects how sentence embeddings are computed, so callers only ask for a
+model name and never construct SentenceTransformer directly.
+
+BACKENDS:
+- torch (default): full-precision sentence-transformers model
+- onnx: int8 dynamically quantized ONNX export (see export_onnx.py),
+  run on CPU with onnxruntime
+- hashing: deterministic bag-of-words stand-in with no model weights,
+  for offline performance tests and load testing (not for real answers)
+
+CONFIGURATION (environment variables):
+- ENCODER_BACKEND: "torch", "onnx" or "hashing"
+- ENCODER_ONNX_DIR: directory holding exported models
+  (default: encoders/onnx/<model_name>/)
+- ENCODER_THREADS: intra-op threads for onnxruntime (default: runtime choice)
+
+The ONNX encoder exposes the subset of the SentenceTransformer API the
+project uses: encode() and get_sentence_embedding_dimension().
+
+ENCODER IDS:
+Artifacts (syllabus header, shard manifest, index store version) record
+the encoder_id of the encoder that produced their vectors next to the
+model name, and loaders reject a different encoder_id. torch and onnx
+share the model name as their id (the ONNX export reproduces the torch
+vectors); the hashing stand-in is "hashing:<model>", so its vectors are
+never mixed with real model vectors.
+
+Cross-encoders for reranking (load_cross_encoder) use the torch backend,
+or a token-overlap stand-in under the hashing backend.
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+import numpy as np
+
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx")
+BACKENDS = ("torch", "onnx", "hashing")
+
+
+def encoder_id(model, model_name):
+    """Identity of the vector space a loaded encoder produces"""
+    return getattr(model, "encoder_id", None) or model_name
+
+
+def get_backend_name():
+    """Backend selected by ENCODER_BACKEND (default: torch)"""
+    return os.environ.get("ENCODER_BACKEND", "torch").strip().lower()
+
+
+def get_onnx_dir():
+    """Directory holding exported ONNX models"""
+    return os.environ.get("ENCODER_ONNX_DIR", DEFAULT_ONNX_DIR)
+
+
+class OnnxSentenceEncoder:
+    """Mean-pooled sentence encoder running an exported ONNX transformer"""
+
+    def __init__(self, model_name, onnx_dir=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.model_dir = os.path.join(onnx_dir or get_onnx_dir(), model_name)
+
+        config_path = os.path.join(self.model_dir, "export_config.json")
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(
+                f"No ONNX export for '{model_name}' in {self.model_dir}. "
+                f"Run: python encoders/export_onnx.py {model_name}"
+            )
+
+        with open(config_path, "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_dir)
+        # Fast tokenizers reconfigure padding/truncation on every call, which is
+        # not safe across threads; session.run is, so only tokenizing is locked
+        self.tokenizer_lock = threading.Lock()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = os.environ.get("ENCODER_THREADS")
+        if threads:
+            options.intra_op_num_threads = int(threads)
+
+        self.session = ort.InferenceSession(
+            os.path.join(self.model_dir, self.config["model_file"]),
+            options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return self.config["dimension"]
+
+    def _encode_batch(self, texts):
+        with self.tokenizer_lock:
+            tokens = self.tokenizer(
+                texts,
+                padding=True,
+                truncation=True,
+                max_length=self.config["max_seq_length"],
+                return_tensors="np"
+            )
+        feed = {name: value.astype(np.int64) for name, value in tokens.items() if name in self.input_names}
+        token_embeddings = self.session.run(None, feed)[0]
+
+        # Mean pooling over non-padding tokens, as in the sentence-transformers config
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, normalize_embeddings=False, **kwargs):
+        """Encode a string or list of strings into float32 embeddings"""
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+        sentences = list(sentences)
+
+        embeddings = np.zeros((len(sentences), self.config["dimension"]), dtype=np.float32)
+        if not sentences:
+            return embeddings
+
+        # Encode in length order to minimize padding, then restore input order
+        order = np.argsort([-len(s) for s in sentences], kind="stable")
+        starts = range(0, len(sentences), batch_size)
+        if show_progress_bar:
+            from tqdm import tqdm
+            starts = tqdm(starts, desc="Batches")
+
+        for start in starts:
+            idx = order[start:start + batch_size]
+            embeddings[idx] = self._encode_batch([sentences[i] for i in idx])
+
+        if self.config.get("normalize") or normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+
+class HashingEncoder:
+    """Deterministic hashed bag-of-words encoder with the real models' dimensions"""
+
+    DIMENSIONS = {"all-MiniLM-L6-v2": 384, "all-mpnet-base-v2": 768}
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, model_name, dimension=None):
+        self.model_name = model_name
+        self.encoder_id = f"hashing:{model_name}"
+        self.dimension = dimension or self.DIMENSIONS.get(model_name, 384)
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=False, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        embeddings = np.zeros((len(sentences), self.dimension), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for token in self.TOKEN_PATTERN.findall(sentence.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                embeddings[row, h % self.dimension] += 1.0 if (h >> 16) & 1 else -1.0
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+
+        return embeddings[0] if single else embeddings
+
+
+class HashingCrossEncoder:
+    """Token-overlap stand-in for a cross-encoder reranker"""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def predict(self, sentence_pairs, batch_size=32, show_progress_bar=False, **kwargs):
+        scores = np.zeros(len(sentence_pairs), dtype=np.float32)
+        for i, (query, passage) in enumerate(sentence_pairs):
+            query_tokens = set(HashingEncoder.TOKEN_PATTERN.findall(query.lower()))
+            passage_tokens = set(HashingEncoder.TOKEN_PATTERN.findall(passage.lower()))
+            scores[i] = len(query_tokens & passage_tokens) / max(len(query_tokens), 1)
+        return scores
+
+
+def load_cross_encoder(model_name, backend=None):
+    """Construct a cross-encoder (query, passage) scorer on the configured backend"""
+    backend = (backend or get_backend_name()).lower()
+
+    if backend == "hashing":
+        return HashingCrossEncoder(model_name)
+    if backend in ("torch", "onnx"):
+        # No ONNX export for cross-encoders; they always run on torch
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(model_name, device="cpu")
+
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
+
+
+def load_encoder(model_name, backend=None):
+    """Construct an encoder for model_name on the configured backend"""
+    backend = (backend or get_backend_name()).lower()
+
+    if backend == "onnx":
+        return OnnxSentenceEncoder(model_name)
+    if backend == "hashing":
+        return HashingEncoder(model_name)
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name)
+
+    raise ValueError(f"Unknown encoder backend '{backend}'. Choose from: {', '.join(BACKENDS)}")
@@ -0,0 +1,159 @@
+"""
+PROCESS-WIDE ENCODER REGISTRY
+=============================
+
+Hands out one shared encoder per (backend, model name) so components that
+use the same model (retriever, relevance checker, syllabus processor,
+corrector, analyzers, web app) hold exactly one copy of its weights.
+
+BEHAVIOUR:
+- Lazy: a model is loaded on the first get_encoder() call for it
+- Thread-safe: loading happens once under a per-model lock. encode() and
+  predict() run concurrently on the shared instance (torch and onnxruntime
+  inference are thread-safe); only the call counters are locked, so
+  admitted requests and bulk workers encode in parallel
+- Accounting: load time, approximate weight memory, encode call counts
+  and registry hit/miss counts are available from encoder_stats()
+"""
+
+import os
+import threading
+import time
+from encoder_backend import encoder_id, get_backend_name, load_cross_encoder, load_encoder
+
+LOADERS = {"bi": load_encoder, "cross": load_cross_encoder}
+
+
+def estimate_model_bytes(model):
+    """Approximate memory held by a model's weights"""
+    if hasattr(model, "parameters"):
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+
+    session_dir = getattr(model, "model_dir", None)
+    config = getattr(model, "config", None)
+    if session_dir and isinstance(config, dict) and "model_file" in config:
+        return os.path.getsize(os.path.join(session_dir, config["model_file"]))
+
+    return 0
+
+
+class SharedEncoder:
+    """Thread-safe wrapper around one loaded encoder"""
+
+    def __init__(self, model, model_name, backend, load_seconds):
+        self.model = model
+        self.model_name = model_name
+        self.encoder_id = encoder_id(model, model_name)  # recorded in artifact headers
+        self.backend = backend
+        self.load_seconds = load_seconds
+        self.memory_bytes = estimate_model_bytes(model)
+        self.encode_calls = 0
+        self._lock = threading.Lock()
+
+    def encode(self, *args, **kwargs):
+        with self._lock:
+            self.encode_calls += 1
+        return self.model.encode(*args, **kwargs)
+
+    def predict(self, *args, **kwargs):
+        """Cross-encoder scoring, concurrent like encode()"""
+        with self._lock:
+            self.encode_calls += 1
+        return self.model.predict(*args, **kwargs)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def __getattr__(self, name):
+        # Anything else (tokenizer, max_seq_length, ...) comes from the model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+class EncoderRegistry:
+    """Lazily loaded, shared encoders keyed by backend and model name"""
+
+    def __init__(self):
+        self._encoders = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_name, backend=None, kind="bi"):
+        key = ((backend or get_backend_name()).lower(), model_name, kind)
+
+        encoder = self._encoders.get(key)
+        if encoder is not None:
+            with self._lock:
+                self.hits += 1
+            return encoder
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; others wait and reuse it
+        with key_lock:
+            encoder = self._encoders.get(key)
+            if encoder is None:
+                start = time.perf_counter()
+                model = LOADERS[kind](model_name, backend=key[0])
+                encoder = SharedEncoder(model, model_name, key[0], time.perf_counter() - start)
+                with self._lock:
+                    self._encoders[key] = encoder
+                    self.misses += 1
+                print(f"Loaded encoder {model_name} [{key[0]}] in {encoder.load_seconds:.2f}s")
+
+        return encoder
+
+    def stats(self):
+        """Per-model load time, memory and usage, plus the process total"""
+        models = [
+            {
+                "model_name": encoder.model_name,
+                "encoder_id": encoder.encoder_id,
+                "backend": encoder.backend,
+                "load_seconds": encoder.load_seconds,
+                "memory_bytes": encoder.memory_bytes,
+                "encode_calls": encoder.encode_calls
+            }
+            for encoder in list(self._encoders.values())
+        ]
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "models": models,
+            "total_memory_bytes": sum(m["memory_bytes"] for m in models),
+            "hits": hits,
+            "misses": misses
+        }
+
+    def clear(self):
+        """Drop all shared encoders (mainly for tests)"""
+        with self._lock:
+            self._encoders.clear()
+            self._key_locks.clear()
+
+
+_registry = EncoderRegistry()
+
+
+def get_encoder(model_name, backend=None):
+    """Shared encoder for model_name on the configured backend"""
+    return _registry.get(model_name, backend)
+
+
+def get_cross_encoder(model_name, backend=None):
+    """Shared cross-encoder (reranker) for model_name"""
+    return _registry.get(model_name, backend, kind="cross")
+
+
+def encoder_stats():
+    """Load time and memory accounting for every loaded encoder"""
+    return _registry.stats()
+
+
+def clear_encoders():
+    """Forget all shared encoders so the next get_encoder() reloads"""
+    _registry.clear()
@@ -0,0 +1,111 @@
+"""
+EXPORT SENTENCE ENCODERS TO QUANTIZED ONNX
+==========================================
+
+Exports the transformer of a sentence-transformers model to ONNX, then
+applies dynamic int8 quantization to the weights for CPU inference.
+
+OUTPUT (encoders/onnx/<model_name>/):
+- model.onnx: full-precision export (token embeddings output)
+- model_int8.onnx: dynamically quantized export used at runtime
+- tokenizer files
+- export_config.json: dimension, max sequence length, pooling, normalization
+
+Usage:
+    python encoders/export_onnx.py all-MiniLM-L6-v2 all-mpnet-base-v2
+"""
+
+import argparse
+import json
+import os
+from encoder_backend import get_onnx_dir
+
+DEFAULT_MODELS = ["all-MiniLM-L6-v2", "all-mpnet-base-v2"]
+
+
+def export_model(model_name, output_dir=None, quantize=True, opset=14):
+    """Export one sentence-transformers model to (quantized) ONNX"""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    pooling = next(m for m in model if isinstance(m, Pooling))
+    if not pooling.pooling_mode_mean_tokens:
+        raise ValueError(f"{model_name} does not use mean pooling; export is not supported")
+
+    model_dir = os.path.join(output_dir or get_onnx_dir(), model_name)
+    os.makedirs(model_dir, exist_ok=True)
+
+    sample = tokenizer(["export sample sentence"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        """Positional-input wrapper returning the last hidden state"""
+
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *inputs):
+            return self.inner(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["token_embeddings"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(model_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(transformer),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    print(f"Exported {model_name} -> {fp32_path}")
+
+    model_file = "model.onnx"
+    if quantize:
+        int8_path = os.path.join(model_dir, "model_int8.onnx")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        model_file = "model_int8.onnx"
+        print(f"Quantized {model_name} -> {int8_path}")
+
+    tokenizer.save_pretrained(model_dir)
+
+    config = {
+        "model_name": model_name,
+        "model_file": model_file,
+        "dimension": model.get_sentence_embedding_dimension(),
+        "max_seq_length": model.max_seq_length,
+        "pooling": "mean",
+        "normalize": any(isinstance(m, Normalize) for m in model),
+        "quantization": "dynamic-int8" if quantize else "none"
+    }
+    with open(os.path.join(model_dir, "export_config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export sentence encoders to quantized ONNX")
+    parser.add_argument("models", nargs="*", default=DEFAULT_MODELS)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--no-quantize", action="store_true", help="Keep full-precision weights")
+    args = parser.parse_args()
+
+    for model_name in args.models:
+        export_model(model_name, args.output_dir, quantize=not args.no_quantize)
+
+    print("[OK] ONNX export complete. Set ENCODER_BACKEND=onnx to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+SENTENCE SEGMENTATION BENCHMARK
+===============================
+
+Compares the sentence_segmenter backends on the texts of the existing chunk
+outputs (data/processed/chunks/*.json), or on the pages of a PDF (--pdf).
+
+AGREEMENT (against the reference backend, NLTK by default):
+- boundary precision / recall / F1 over sentence end offsets
+- exact match: share of texts split into the same sentences
+- chunk match: share of texts for which chunk_text produces the same chunks
+
+SPEED:
+- pages/second and sentences/second of split_many over all texts
+
+Usage (from the repository root):
+    python ingestion/benchmark_segmentation.py
+    python ingestion/benchmark_segmentation.py --backends regex spacy --n-process 4 --pdf book.pdf
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from sentence_segmenter import SEGMENTERS, get_segmenter
+from chunk_text import chunk_sentences
+
+DEFAULT_CHUNK_FILES = ["data/processed/chunks/notes.json", "data/processed/chunks/ppts.json"]
+
+
+def load_texts(chunk_files=DEFAULT_CHUNK_FILES, pdf=None):
+    if pdf:
+        from extract_pdf import extract_pdf_text
+        from clean_text import clean_text
+        return [text for text in (clean_text(p["text"]) for p in extract_pdf_text(pdf)) if text]
+
+    texts = []
+    for path in chunk_files:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                texts.extend(chunk["text"] for chunk in json.load(f))
+    return texts
+
+
+def sentence_ends(text, sentences):
+    """Character offsets in text where each sentence ends"""
+    ends = set()
+    position = 0
+    for sentence in sentences:
+        found = text.find(sentence, position)
+        if found < 0:
+            continue
+        position = found + len(sentence)
+        ends.add(position)
+    return ends
+
+
+def agreement(texts, reference, candidate):
+    """Boundary P/R/F1, exact sentence match and chunk match vs the reference"""
+    true_positive = predicted = expected = exact = chunk_match = 0
+    for text, ref_sents, cand_sents in zip(texts, reference, candidate):
+        ref_ends, cand_ends = sentence_ends(text, ref_sents), sentence_ends(text, cand_sents)
+        true_positive += len(ref_ends & cand_ends)
+        predicted += len(cand_ends)
+        expected += len(ref_ends)
+        exact += ref_sents == cand_sents
+        chunk_match += chunk_sentences(ref_sents) == chunk_sentences(cand_sents)
+
+    precision = true_positive / max(predicted, 1)
+    recall = true_positive / max(expected, 1)
+    return {
+        "boundary_precision": precision,
+        "boundary_recall": recall,
+        "boundary_f1": 2 * precision * recall / max(precision + recall, 1e-12),
+        "exact_match": exact / max(len(texts), 1),
+        "chunk_match": chunk_match / max(len(texts), 1)
+    }
+
+
+def time_backend(segmenter, texts, batch_size, n_process, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sentences = segmenter.split_many(texts, batch_size=batch_size, n_process=n_process)
+        best = min(best, time.perf_counter() - start)
+    total_sentences = sum(len(s) for s in sentences)
+    return sentences, {
+        "seconds": best,
+        "pages_per_second": len(texts) / best,
+        "sentences_per_second": total_sentences / best,
+        "sentences": total_sentences
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentence segmentation agreement and speed")
+    parser.add_argument("--backends", nargs="+", choices=SEGMENTERS, default=list(SEGMENTERS))
+    parser.add_argument("--reference", choices=SEGMENTERS, default="nltk")
+    parser.add_argument("--chunks", nargs="+", default=DEFAULT_CHUNK_FILES)
+    parser.add_argument("--pdf", default=None, help="Benchmark on the pages of this PDF instead")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--n-process", type=int, default=1, help="spaCy worker processes")
+    parser.add_argument("--output", default="segmentation_benchmark.json")
+    args = parser.parse_args()
+
+    texts = load_texts(args.chunks, args.pdf)
+    print("SENTENCE SEGMENTATION BENCHMARK")
+    print("=" * 60)
+    print(f"Pages/texts: {len(texts)} | Reference: {args.reference}")
+
+    backends = [args.reference] + [b for b in args.backends if b != args.reference]
+    results = {}
+    sentences_by_backend = {}
+    for name in backends:
+        try:
+            segmenter = get_segmenter(name)
+            segmenter.split("Warm up. Second sentence.")
+        except (ImportError, LookupError, OSError) as e:
+            print(f"\n[{name}] unavailable: {e}")
+            continue
+        sentences_by_backend[name], results[name] = time_backend(segmenter, texts, args.batch_size, args.n_process)
+
+    reference = sentences_by_backend.get(args.reference)
+    if reference is None:
+        print(f"\nReference backend '{args.reference}' unavailable; reporting speed only")
+
+    for name, result in results.items():
+        if reference is not None and name != args.reference:
+            result["agreement"] = agreement(texts, reference, sentences_by_backend[name])
+        print(f"\n[{name}] {result['pages_per_second']:.0f} pages/s, "
+              f"{result['sentences_per_second']:.0f} sentences/s ({result['sentences']} sentences)")
+        if "agreement" in result:
+            a = result["agreement"]
+            print(f"  Boundaries P {a['boundary_precision']:.3f} R {a['boundary_recall']:.3f} F1 {a['boundary_f1']:.3f}"
+                  f" | exact {a['exact_match']*100:.1f}% | same chunks {a['chunk_match']*100:.1f}%")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"texts": len(texts), "reference": args.reference, "results": results}, f, indent=2)
+    print(f"\nResults saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
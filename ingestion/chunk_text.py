@@ -1,12 +1,15 @@
-from nltk.tokenize import sent_tokenize
-import nltk
-nltk.download('punkt')
+from sentence_segmenter import get_segmenter
 
 MAX_TOKENS = 250
 OVERLAP = 25
 
-def chunk_text(text):
-    sentences = sent_tokenize(text)
+def chunk_sentences(sentences, max_tokens=MAX_TOKENS, overlap=OVERLAP, overlap_unit="sentences"):
+    """Pack sentences into chunks of about max_tokens words
+    
+    overlap_unit="sentences" carries the last `overlap` sentences into the
+    next chunk (the original behaviour); "tokens" carries as many trailing
+    sentences as fit in `overlap` words.
+    """
     chunks = []
     current_chunk = []
     token_count = 0
@@ -16,12 +19,34 @@ def chunk_text(text):
         token_count += len(words)
         current_chunk.append(sent)
 
-        if token_count >= MAX_TOKENS:
+        if token_count >= max_tokens:
             chunks.append(" ".join(current_chunk))
-            current_chunk = current_chunk[-OVERLAP:]
+            if overlap_unit == "tokens":
+                current_chunk = _token_overlap(current_chunk, overlap)
+            else:
+                current_chunk = current_chunk[-overlap:] if overlap else []
             token_count = sum(len(s.split()) for s in current_chunk)
 
     if current_chunk:
         chunks.append(" ".join(current_chunk))
 
     return chunks
+
+def _token_overlap(sentences, overlap_tokens):
+    """Trailing sentences totalling at most overlap_tokens words"""
+    kept = []
+    total = 0
+    for sent in reversed(sentences):
+        total += len(sent.split())
+        if total > overlap_tokens:
+            break
+        kept.append(sent)
+    return kept[::-1]
+
+def chunk_text(text, segmenter=None):
+    return chunk_sentences(get_segmenter(segmenter).split(text))
+
+def chunk_texts(texts, segmenter=None, batch_size=64, n_process=1):
+    """chunk_text for many pages, segmented in one batched call"""
+    sentence_lists = get_segmenter(segmenter).split_many(texts, batch_size=batch_size, n_process=n_process)
+    return [chunk_sentences(sentences) for sentences in sentence_lists]
@@ -1,14 +1,87 @@
+import re
+from collections import Counter
 import fitz  # PyMuPDF
 
-def extract_pdf_text(pdf_path):
+# Block-mode margin learning (fractions of page height)
+MARGIN_BAND = 0.15        # headers/footers must sit in the top or bottom 15%
+MIN_REPEAT_RATIO = 0.3    # a block repeated on >= 30% of pages is running text
+MIN_REPEAT_PAGES = 3
+DIGITS = re.compile(r"\d+")
+SPACES = re.compile(r"\s+")
+
+
+def block_signature(text):
+    """Block text with numbers masked, so "Page 12" and "Page 13" match"""
+    return SPACES.sub(" ", DIGITS.sub("#", text)).strip().lower()
+
+
+def learn_margin_zones(page_blocks):
+    """(header_bottom, footer_top) as fractions of page height from repeated blocks
+
+    page_blocks: per page, a list of (y0, y1, text) with y already divided by
+    the page height. Returns (0.0, 1.0) when nothing repeats in the margins.
+    """
+    counts = Counter()
+    for blocks in page_blocks:
+        counts.update({(block_signature(text), round(y0, 2)) for y0, y1, text in blocks})
+
+    min_pages = max(MIN_REPEAT_PAGES, int(MIN_REPEAT_RATIO * len(page_blocks)))
+    repeated = {key for key, count in counts.items() if count >= min_pages}
+
+    header_bottom, footer_top = 0.0, 1.0
+    for blocks in page_blocks:
+        for y0, y1, text in blocks:
+            if (block_signature(text), round(y0, 2)) not in repeated:
+                continue
+            if y1 <= MARGIN_BAND:
+                header_bottom = max(header_bottom, y1)
+            elif y0 >= 1 - MARGIN_BAND:
+                footer_top = min(footer_top, y0)
+
+    return header_bottom, footer_top
+
+
+def extract_pdf_text(pdf_path, mode="text"):
+    """Per-page text of a PDF
+
+    mode="text": PyMuPDF plain text of the whole page.
+    mode="blocks": text blocks, dropping those inside the header/footer
+    zones learned from blocks repeated across the document (running
+    heads, page numbers, footers), so they never reach clean_text or
+    the chunks.
+    """
     doc = fitz.open(pdf_path)
     pages = []
 
-    for page_num, page in enumerate(doc):
-        text = page.get_text("text")
+    if mode == "text":
+        for page_num, page in enumerate(doc):
+            text = page.get_text("text")
+            pages.append({
+                "page": page_num + 1,
+                "text": text
+            })
+        return pages
+
+    if mode != "blocks":
+        raise ValueError(f"Unknown extraction mode '{mode}'. Use 'text' or 'blocks'.")
+
+    page_blocks = []
+    for page in doc:
+        height = page.rect.height or 1.0
+        page_blocks.append([
+            (y0 / height, y1 / height, text)
+            for x0, y0, x1, y1, text, block_no, block_type in page.get_text("blocks", sort=True)
+            if block_type == 0 and text.strip()
+        ])
+
+    header_bottom, footer_top = learn_margin_zones(page_blocks)
+
+    for page_num, blocks in enumerate(page_blocks):
+        # Drop blocks lying entirely inside a margin zone
+        body = [text for y0, y1, text in blocks if y1 > header_bottom and y0 < footer_top]
         pages.append({
             "page": page_num + 1,
-            "text": text
+            "text": "\n".join(body)
         })
 
     return pages
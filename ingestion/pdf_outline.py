@@ -0,0 +1,87 @@
+"""
+PDF OUTLINE CHAPTER MAP
+=======================
+
+Resolves chapter and section boundaries once per document from the PDF's
+embedded outline (bookmarks), instead of regex-scanning every page.
+
+- Chapters: outline entries titled "Chapter 3 ...", "3 ..." or "3. ..."
+  at the shallowest level where such titles appear (so "Part One"
+  wrappers are skipped). Other entries at that level (appendices,
+  index) end the previous chapter.
+- Sections: entries titled "3.2 ..." at any level.
+
+Boundaries are stored as sorted start pages; chapter_at(page) and
+section_at(page) are binary searches. Pages before the first chapter
+(front matter) map to None.
+
+from_pdf() returns None when the PDF has no usable outline, so callers
+can fall back to regex detection.
+"""
+
+import re
+from bisect import bisect_right
+import fitz  # PyMuPDF
+
+CHAPTER_TITLE = re.compile(r"^\s*(?:chapter\s+)?(\d{1,2})(?:[.:\-]?\s+|[.:]?$)", re.IGNORECASE)
+SECTION_TITLE = re.compile(r"^\s*(\d+)\.(\d+)\b")
+
+
+class ChapterOutline:
+    def __init__(self, chapter_starts, chapters, section_starts, sections):
+        self.chapter_starts = chapter_starts  # sorted 1-based start pages
+        self.chapters = chapters              # chapter number (or None) per start
+        self.section_starts = section_starts
+        self.sections = sections              # section title per start
+
+    @classmethod
+    def from_toc(cls, toc):
+        """Build from PyMuPDF get_toc() entries [level, title, page]"""
+        entries = [(level, title.strip(), page) for level, title, page in toc if page >= 1]
+        chapter_levels = [
+            level for level, title, _ in entries
+            if not SECTION_TITLE.match(title) and CHAPTER_TITLE.match(title)
+        ]
+        if not chapter_levels:
+            return None
+        chapter_level = min(chapter_levels)
+
+        # Every entry at or above the chapter level opens a range; non-chapter
+        # entries there (appendices, index) map to None
+        boundaries = []
+        sections = []
+        for level, title, page in entries:
+            if SECTION_TITLE.match(title):
+                sections.append((page, title))
+            elif level <= chapter_level:
+                match = CHAPTER_TITLE.match(title)
+                boundaries.append((page, int(match.group(1)) if match else None))
+
+        boundaries.sort(key=lambda entry: entry[0])
+        sections.sort(key=lambda entry: entry[0])
+        return cls(
+            [page for page, _ in boundaries], [number for _, number in boundaries],
+            [page for page, _ in sections], [title for _, title in sections]
+        )
+
+    @classmethod
+    def from_pdf(cls, pdf_path):
+        """Outline of a PDF file, or None if it has no chapter bookmarks"""
+        with fitz.open(pdf_path) as doc:
+            return cls.from_toc(doc.get_toc(simple=True))
+
+    @staticmethod
+    def _lookup(starts, values, page):
+        i = bisect_right(starts, page) - 1
+        return values[i] if i >= 0 else None
+
+    def chapter_at(self, page):
+        """Chapter number containing a 1-based page, None before the first chapter"""
+        return self._lookup(self.chapter_starts, self.chapters, page)
+
+    def section_at(self, page):
+        """Title of the section containing a 1-based page, if it belongs to that page's chapter"""
+        title = self._lookup(self.section_starts, self.sections, page)
+        if title is None or int(SECTION_TITLE.match(title).group(1)) != self.chapter_at(page):
+            return None
+        return title
@@ -1,13 +1,13 @@
+import argparse
 import os
 import json
 import re
 from extract_pdf import extract_pdf_text
 from clean_text import clean_text
-from chunk_text import chunk_text
+from chunk_text import chunk_texts
+from sentence_segmenter import SEGMENTERS
+from pdf_outline import ChapterOutline
 from pptx import Presentation
-import nltk
-
-nltk.download("punkt", quiet=True)
 
 # ==============================
 # UNIT MAPS
@@ -37,6 +37,18 @@ RAW_DIR = "data/raw"
 OUTPUT_DIR = "data/processed/chunks"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Unit for outline pages outside every chapter (front matter, appendices,
+# index); they are kept searchable but not attributed to a syllabus unit
+NO_CHAPTER_UNIT = "Unknown"
+
+# extract_pdf_text mode: "text" (whole page) or "blocks" (running
+# headers/footers dropped, see extract_pdf.py); --extract-mode
+EXTRACT_MODES = ("text", "blocks")
+
+# Sentence segmentation for chunk_texts (--segmenter, --batch-size,
+# --n-process); segmenter None means SENTENCE_SEGMENTER
+SEGMENT_OPTIONS = {"segmenter": None, "batch_size": 64, "n_process": 1}
+
 SKIP_KEYWORDS = [
     "edition", "copyright", "pearson",
     "table of contents", "preface",
@@ -72,6 +84,18 @@ def extract_chapter_number(text):
     return None
 
 
+def chunk_pages(pages):
+    """(page, chunks) for every page with text left after cleaning, segmented in one batch"""
+    cleaned_pages = []
+    for page in pages:
+        cleaned = clean_text(page["text"])
+        if cleaned.strip():  # Skip empty pages
+            cleaned_pages.append((page, cleaned))
+    
+    chunk_lists = chunk_texts([cleaned for _, cleaned in cleaned_pages], **SEGMENT_OPTIONS)
+    return [(page, chunks) for (page, _), chunks in zip(cleaned_pages, chunk_lists)]
+
+
 def get_unit_from_chapter(chapter, book_type):
     if book_type == "stallings":
         return STALLINGS_UNIT_MAP.get(chapter, "Unknown")
@@ -121,23 +145,47 @@ def get_unit_from_filename_or_content(filename, content=""):
 # PDF PROCESSOR (TEXTBOOKS)
 # ==============================
 
-def process_pdf_file(file_path, book_type):
-    pages = extract_pdf_text(file_path)
+def process_pdf_file(file_path, book_type, extract_mode="text"):
+    pages = extract_pdf_text(file_path, mode=extract_mode)
     all_chunks = []
     
+    # Chapter boundaries from the PDF outline; regex detection only without one
+    outline = ChapterOutline.from_pdf(file_path)
+    if outline is None:
+        print(f"[WARN] No outline in {os.path.basename(file_path)}; detecting chapters by regex")
+    
+    # Chapter markers often live in the running header that block mode drops,
+    # so the regex fallback always reads the full page text
+    detect_pages = pages
+    if outline is None and extract_mode != "text":
+        detect_pages = extract_pdf_text(file_path, mode="text")
+    detect_text = {page["page"]: page["text"] for page in detect_pages}
+    
     current_unit = "Unit 1"  # Start with Unit 1 instead of Unknown
     current_chapter = None
+    page_info = []  # (page, unit, chapter) for pages that are not skipped
     
     for page in pages:
         raw = page["text"].lower()
         if any(k in raw for k in SKIP_KEYWORDS):
             continue
             
-        # Try to detect new chapter
-        chapter = extract_chapter_number(page["text"])
+        # The outline is authoritative: pages outside every chapter get no chapter
+        if outline is not None:
+            current_chapter = outline.chapter_at(page["page"])
+            if current_chapter is None:
+                current_unit = NO_CHAPTER_UNIT
+            else:
+                current_unit = get_unit_from_chapter(current_chapter, book_type)
+            page_info.append((page, current_unit, current_chapter))
+            continue
+        
+        # Regex fallback: a page without a chapter marker continues the previous chapter
+        full_text = detect_text.get(page["page"], page["text"])
+        chapter = extract_chapter_number(full_text)
         
         if not chapter:
-            chapter = infer_chapter_from_section(page["text"])
+            chapter = infer_chapter_from_section(full_text)
             
         # Update unit if new chapter found
         if chapter and chapter != current_chapter:
@@ -146,20 +194,24 @@ def process_pdf_file(file_path, book_type):
             if new_unit != "Unknown":
                 current_unit = new_unit
         
-        cleaned = clean_text(page["text"])
-        if not cleaned.strip():  # Skip empty pages
-            continue
-            
-        chunks = chunk_text(cleaned)
+        page_info.append((page, current_unit, current_chapter))
+    
+    pages_by_number = {page["page"]: (unit, chapter) for page, unit, chapter in page_info}
+    for page, chunks in chunk_pages([page for page, _, _ in page_info]):
+        unit, chapter = pages_by_number[page["page"]]
+        section = outline.section_at(page["page"]) if outline is not None else None
         
         for chunk in chunks:
-            all_chunks.append({
-                "unit": current_unit,
-                "topic": f"Chapter {current_chapter}" if current_chapter else "General",
+            record = {
+                "unit": unit,
+                "topic": f"Chapter {chapter}" if chapter else "General",
                 "source": book_type,
                 "page": page["page"],
                 "text": chunk
-            })
+            }
+            if section:
+                record["section"] = section
+            all_chunks.append(record)
     
     return all_chunks
 
@@ -168,7 +220,7 @@ def process_pdf_file(file_path, book_type):
 # NOTES
 # ==============================
 
-def process_notes_folder(notes_folder):
+def process_notes_folder(notes_folder, extract_mode="text"):
     all_chunks = []
 
     for pdf in os.listdir(notes_folder):
@@ -176,19 +228,13 @@ def process_notes_folder(notes_folder):
             continue
 
         path = os.path.join(notes_folder, pdf)
-        pages = extract_pdf_text(path)
+        pages = extract_pdf_text(path, mode=extract_mode)
         
         # Get sample content for unit detection
         sample_content = " ".join([p["text"][:500] for p in pages[:3]])
         unit = get_unit_from_filename_or_content(pdf, sample_content)
 
-        for page in pages:
-            cleaned = clean_text(page["text"])
-            if not cleaned.strip():
-                continue
-                
-            chunks = chunk_text(cleaned)
-
+        for page, chunks in chunk_pages(pages):
             for chunk in chunks:
                 all_chunks.append({
                     "unit": unit,
@@ -217,13 +263,7 @@ def process_ppts_folder(ppt_folder):
             sample_content = " ".join([p["text"][:500] for p in pages[:3]])
             unit = get_unit_from_filename_or_content(file, sample_content)
             
-            for page in pages:
-                cleaned = clean_text(page["text"])
-                if not cleaned.strip():
-                    continue
-                    
-                chunks = chunk_text(cleaned)
-
+            for page, chunks in chunk_pages(pages):
                 for chunk in chunks:
                     all_chunks.append({
                         "unit": unit,
@@ -299,61 +339,78 @@ def process_syllabus_file(file_path, units):
 # MAIN
 # ==============================
 
-# Create textbooks subdirectory
-os.makedirs(os.path.join(OUTPUT_DIR, "textbooks"), exist_ok=True)
+def main():
+    # spaCy --n-process starts worker processes that re-import this module,
+    # so the pipeline only runs when executed as a script
+    parser = argparse.ArgumentParser(description="Chunk textbooks, notes, PPTs and the syllabus")
+    parser.add_argument("--extract-mode", choices=EXTRACT_MODES, default="text",
+                        help="PDF text extraction; 'blocks' drops running headers and footers")
+    parser.add_argument("--segmenter", choices=SEGMENTERS, default=None,
+                        help="Sentence segmenter (default: SENTENCE_SEGMENTER, else nltk)")
+    parser.add_argument("--batch-size", type=int, default=64, help="Pages per segmentation batch")
+    parser.add_argument("--n-process", type=int, default=1, help="spaCy worker processes for nlp.pipe")
+    args = parser.parse_args()
+    SEGMENT_OPTIONS.update(segmenter=args.segmenter, batch_size=args.batch_size, n_process=args.n_process)
+
+    # Create textbooks subdirectory
+    os.makedirs(os.path.join(OUTPUT_DIR, "textbooks"), exist_ok=True)
 
-all_chunks = []
-kurose_chunks = []
-stallings_chunks = []
+    all_chunks = []
+    kurose_chunks = []
+    stallings_chunks = []
 
-# 📘 TEXTBOOKS
-textbooks_dir = os.path.join(RAW_DIR, "textbooks")
-for book in os.listdir(textbooks_dir):
-    book_type = "stallings" if "stallings" in book.lower() else "kurose"
-    book_path = os.path.join(textbooks_dir, book)
+    # 📘 TEXTBOOKS
+    textbooks_dir = os.path.join(RAW_DIR, "textbooks")
+    for book in os.listdir(textbooks_dir):
+        book_type = "stallings" if "stallings" in book.lower() else "kurose"
+        book_path = os.path.join(textbooks_dir, book)
 
-    for pdf in os.listdir(book_path):
-        if pdf.lower().endswith(".pdf"):
-            chunks = process_pdf_file(os.path.join(book_path, pdf), book_type)
-            if book_type == "kurose":
-                kurose_chunks.extend(chunks)
-            else:
-                stallings_chunks.extend(chunks)
-            all_chunks.extend(chunks)
+        for pdf in os.listdir(book_path):
+            if pdf.lower().endswith(".pdf"):
+                chunks = process_pdf_file(os.path.join(book_path, pdf), book_type, args.extract_mode)
+                if book_type == "kurose":
+                    kurose_chunks.extend(chunks)
+                else:
+                    stallings_chunks.extend(chunks)
+                all_chunks.extend(chunks)
 
-# Save textbooks separately
-with open(os.path.join(OUTPUT_DIR, "textbooks", "kurose.json"), "w", encoding="utf-8") as f:
-    json.dump(kurose_chunks, f, indent=2, ensure_ascii=False)
+    # Save textbooks separately
+    with open(os.path.join(OUTPUT_DIR, "textbooks", "kurose.json"), "w", encoding="utf-8") as f:
+        json.dump(kurose_chunks, f, indent=2, ensure_ascii=False)
 
-with open(os.path.join(OUTPUT_DIR, "textbooks", "stallings.json"), "w", encoding="utf-8") as f:
-    json.dump(stallings_chunks, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(OUTPUT_DIR, "textbooks", "stallings.json"), "w", encoding="utf-8") as f:
+        json.dump(stallings_chunks, f, indent=2, ensure_ascii=False)
 
-print(f"[OK] Textbooks processed: Kurose({len(kurose_chunks)}), Stallings({len(stallings_chunks)})")
+    print(f"[OK] Textbooks processed: Kurose({len(kurose_chunks)}), Stallings({len(stallings_chunks)})")
 
-# NOTES
-notes_chunks = process_notes_folder(os.path.join(RAW_DIR, "notes"))
-all_chunks.extend(notes_chunks)
+    # NOTES
+    notes_chunks = process_notes_folder(os.path.join(RAW_DIR, "notes"), args.extract_mode)
+    all_chunks.extend(notes_chunks)
 
-with open(os.path.join(OUTPUT_DIR, "notes.json"), "w", encoding="utf-8") as f:
-    json.dump(notes_chunks, f, indent=2, ensure_ascii=False)
+    with open(os.path.join(OUTPUT_DIR, "notes.json"), "w", encoding="utf-8") as f:
+        json.dump(notes_chunks, f, indent=2, ensure_ascii=False)
 
-print(f"[OK] Notes processed: {len(notes_chunks)} chunks")
+    print(f"[OK] Notes processed: {len(notes_chunks)} chunks")
 
-# PPTs
-ppts_chunks = process_ppts_folder(os.path.join(RAW_DIR, "ppts"))
-all_chunks.extend(ppts_chunks)
+    # PPTs
+    ppts_chunks = process_ppts_folder(os.path.join(RAW_DIR, "ppts"))
+    all_chunks.extend(ppts_chunks)
+
+    with open(os.path.join(OUTPUT_DIR, "ppts.json"), "w", encoding="utf-8") as f:
+        json.dump(ppts_chunks, f, indent=2, ensure_ascii=False)
+
+    print(f"[OK] PPTs processed: {len(ppts_chunks)} chunks")
 
-with open(os.path.join(OUTPUT_DIR, "ppts.json"), "w", encoding="utf-8") as f:
-    json.dump(ppts_chunks, f, indent=2, ensure_ascii=False)
+    # SAVE ALL
+    with open(os.path.join(OUTPUT_DIR, "all_chunks.json"), "w", encoding="utf-8") as f:
+        json.dump(all_chunks, f, indent=2, ensure_ascii=False)
 
-print(f"[OK] PPTs processed: {len(ppts_chunks)} chunks")
+    print(f"[OK] All chunks saved: {len(all_chunks)} total chunks")
 
-# SAVE ALL
-with open(os.path.join(OUTPUT_DIR, "all_chunks.json"), "w", encoding="utf-8") as f:
-    json.dump(all_chunks, f, indent=2, ensure_ascii=False)
+    # 📑 SYLLABUS
+    syllabus_file = os.path.join(RAW_DIR, "syllabus", "syllabus.pdf")
+    process_syllabus_file(syllabus_file, ["Unit 1", "Unit 2", "Unit 3", "Unit 4", "Unit 5"])
 
-print(f"[OK] All chunks saved: {len(all_chunks)} total chunks")
 
-# 📑 SYLLABUS
-syllabus_file = os.path.join(RAW_DIR, "syllabus", "syllabus.pdf")
-process_syllabus_file(syllabus_file, ["Unit 1", "Unit 2", "Unit 3", "Unit 4", "Unit 5"])
+if __name__ == "__main__":
+    main()
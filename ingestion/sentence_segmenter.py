@@ -0,0 +1,113 @@
+"""
+SENTENCE SEGMENTATION BACKENDS
+==============================
+
+Pluggable sentence splitters for chunk_text, all with the same interface:
+
+    segmenter.split(text)             -> [sentence, ...]
+    segmenter.split_many(texts, ...)  -> [[sentence, ...], ...]  (batched)
+
+BACKENDS:
+- nltk (default): punkt sent_tokenize, one page at a time
+- spacy: blank English pipeline with the rule-based sentencizer, pages
+  streamed through nlp.pipe (optionally across processes)
+- regex: one compiled boundary pattern with an abbreviation guard; the
+  fastest, no model data needed
+
+Select with SENTENCE_SEGMENTER=nltk|spacy|regex or pass a name to
+get_segmenter(). Compare backends with benchmark_segmentation.py.
+"""
+
+import os
+import re
+
+SEGMENTERS = ("nltk", "spacy", "regex")
+
+
+def get_segmenter_name():
+    return os.environ.get("SENTENCE_SEGMENTER", "nltk").strip().lower()
+
+
+class NltkSegmenter:
+    name = "nltk"
+
+    def __init__(self):
+        import nltk
+        from nltk.tokenize import sent_tokenize
+        nltk.download("punkt", quiet=True)
+        self.sent_tokenize = sent_tokenize
+
+    def split(self, text):
+        return self.sent_tokenize(text)
+
+    def split_many(self, texts, batch_size=64, n_process=1):
+        return [self.sent_tokenize(text) for text in texts]
+
+
+class SpacySegmenter:
+    name = "spacy"
+
+    def __init__(self):
+        import spacy
+        self.nlp = spacy.blank("en")
+        self.nlp.add_pipe("sentencizer")
+        self.nlp.max_length = 10_000_000
+
+    def split(self, text):
+        return [s.text.strip() for s in self.nlp(text).sents if s.text.strip()]
+
+    def split_many(self, texts, batch_size=64, n_process=1):
+        return [
+            [s.text.strip() for s in doc.sents if s.text.strip()]
+            for doc in self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        ]
+
+
+class RegexSegmenter:
+    name = "regex"
+
+    # Candidate boundary: terminal punctuation (plus closing quotes/brackets),
+    # whitespace, then something that can start a sentence
+    BOUNDARY = re.compile(r"([.!?][\"')\]]*)\s+(?=[\"'(\[]?[A-Z0-9])")
+    LAST_WORD = re.compile(r"(\S+)$")
+    ABBREVIATIONS = {
+        "e.g.", "i.e.", "etc.", "vs.", "fig.", "figs.", "eq.", "sec.", "ch.", "no.",
+        "vol.", "pp.", "p.", "dr.", "mr.", "mrs.", "ms.", "prof.", "al.", "approx.", "cf."
+    }
+
+    def split(self, text):
+        sentences = []
+        start = 0
+        for match in self.BOUNDARY.finditer(text):
+            end = match.end(1)
+            last_word = self.LAST_WORD.search(text, start, end)
+            word = last_word.group(1) if last_word else ""
+            # Skip abbreviations and single-letter initials ("A. Tanenbaum")
+            if word.lower() in self.ABBREVIATIONS or (len(word) == 2 and word[0].isupper()):
+                continue
+            sentence = text[start:end].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+
+        tail = text[start:].strip()
+        if tail:
+            sentences.append(tail)
+        return sentences
+
+    def split_many(self, texts, batch_size=64, n_process=1):
+        return [self.split(text) for text in texts]
+
+
+_SEGMENTER_CLASSES = {"nltk": NltkSegmenter, "spacy": SpacySegmenter, "regex": RegexSegmenter}
+_segmenters = {}
+
+
+def get_segmenter(name=None):
+    """Shared segmenter instance for a backend (default: SENTENCE_SEGMENTER)"""
+    name = (name or get_segmenter_name()).lower()
+    if name not in _SEGMENTER_CLASSES:
+        raise ValueError(f"Unknown sentence segmenter '{name}'. Choose from: {', '.join(SEGMENTERS)}")
+    if name not in _segmenters:
+        _segmenters[name] = _SEGMENTER_CLASSES[name]()
+    return _segmenters[name]
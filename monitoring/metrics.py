@@ -0,0 +1,237 @@
+"""
+LIGHTWEIGHT METRICS AND TIMING SPANS
+====================================
+
+In-process histograms, counters and gauges rendered in the Prometheus
+text exposition format (served by relevance/app.py at /metrics).
+
+USAGE IN HOT PATHS:
+    clock = metrics.stage_clock("relevance_stage_seconds")
+    ... keyword filters ...
+    clock.mark("keyword_filter")   # observes time since the previous mark
+    ... encode ...
+    clock.mark("encode")
+
+    metrics.inc("cache_requests_total", cache="question", result="hit")
+
+OVERHEAD:
+Metrics are off unless METRICS_ENABLED=1 (or set_enabled(True)). When off,
+stage_clock() returns a shared no-op clock and inc()/observe() return
+immediately, so instrumented code pays one function call per stage.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "relevance_stage_seconds": "Time spent in each stage of QuestionRelevanceChecker.check_relevance",
+    "retrieval_stage_seconds": "Time spent in each stage of TextbookRetriever.search",
+    "http_stage_seconds": "Time spent in each stage of a web request",
+    "http_request_seconds": "End-to-end web request latency",
+    "http_requests_total": "Web requests by endpoint and status",
+    "admission_in_flight": "Requests currently holding an admission slot",
+    "admission_queue_depth": "Requests waiting for an admission slot",
+    "admission_admitted_total": "Requests admitted since start",
+    "admission_shed_total": "Requests shed since start, by reason (queue_full, deadline)",
+    "course_lookups_total": "Course component lookups (checker, retriever) served loaded (hit) or loaded on demand (miss)",
+    "courses_loaded": "Courses currently held by the course manager",
+    "courses_memory_bytes": "Artifact bytes charged to loaded courses",
+    "courses_memory_budget_bytes": "Course manager memory budget",
+    "courses_evicted": "Courses evicted from the course manager since start",
+    "cache_requests_total": "Cache lookups by cache and result",
+    "cache_invalidations_total": "Question caches cleared because the index version changed",
+    "question_cache_entries": "Questions held by each semantic question cache",
+    "question_cache_hit_rate": "Fraction of lookups served by each semantic question cache",
+    "rerank_total": "Cross-encoder rerank passes by outcome (full, truncated, skipped)",
+    "index_load_seconds": "Time taken to load a FAISS index and its metadata",
+    "model_load_seconds": "Time taken to load each encoder model",
+    "model_memory_bytes": "Approximate weight memory of each loaded encoder",
+    "model_encode_calls": "encode() calls on each shared encoder",
+    "encoder_registry_lookups": "Shared encoder lookups served from the registry (hit) or loaded (miss)"
+}
+
+_enabled = os.environ.get("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(flag):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, key=()):
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter, one series per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name):
+        self.name = name
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, key=(), amount=1):
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def set(self, key, value):
+        with self._lock:
+            self._series[key] = value
+
+    def value(self, key=()):
+        return self._series.get(key, 0)
+
+    def render(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in sorted(self._series.items())]
+
+
+class Gauge(Counter):
+    """Point-in-time value, one series per label set"""
+
+    kind = "gauge"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, cls):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, cls(name))
+        return metric
+
+    def histogram(self, name):
+        return self._get(name, Histogram)
+
+    def counter(self, name):
+        return self._get(name, Counter)
+
+    def gauge(self, name):
+        return self._get(name, Gauge)
+
+    def render(self):
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+class StageClock:
+    """Records the time between successive mark() calls as stage observations"""
+
+    __slots__ = ("histogram", "last")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, (("stage", stage),))
+        self.last = now
+
+
+class _NoopClock:
+    __slots__ = ()
+
+    def mark(self, stage):
+        pass
+
+
+_NOOP_CLOCK = _NoopClock()
+
+
+def stage_clock(metric_name):
+    """Per-call stage timer; a shared no-op when metrics are disabled"""
+    if not _enabled:
+        return _NOOP_CLOCK
+    return StageClock(REGISTRY.histogram(metric_name))
+
+
+def observe(metric_name, value, **labels):
+    if _enabled:
+        REGISTRY.histogram(metric_name).observe(value, _label_key(labels))
+
+
+def inc(metric_name, amount=1, **labels):
+    if _enabled:
+        REGISTRY.counter(metric_name).inc(_label_key(labels), amount)
+
+
+def set_gauge(metric_name, value, **labels):
+    REGISTRY.gauge(metric_name).set(_label_key(labels), value)
+
+
+def set_counter(metric_name, value, **labels):
+    """Export a count kept elsewhere (e.g. by the admission controller); it must only grow"""
+    REGISTRY.counter(metric_name).set(_label_key(labels), value)
+
+
+def render_prometheus():
+    """All metrics in Prometheus text exposition format"""
+    return REGISTRY.render()
@@ -0,0 +1,197 @@
+"""
+PERFORMANCE REGRESSION SUITE - SHARED FIXTURES
+==============================================
+
+Benchmarks hot paths with the deterministic "hashing" stand-in encoder
+and the dependency-free regex sentence segmenter, so runs are offline and
+do not depend on model weights or NLTK data.
+
+MACHINE NORMALIZATION:
+Each timing is divided by a fixed calibration workload measured at the
+start of the session. Baselines store these relative costs, so a baseline
+recorded on one machine stays meaningful on another.
+
+OPTIONS:
+- --perf-tolerance (or PERF_TOLERANCE): allowed slowdown vs baseline,
+  e.g. 0.5 fails a benchmark more than 50% slower (default 0.5)
+- --perf-update-baseline: record current timings as the new baseline.
+  A benchmark without a baseline fails until one is recorded.
+
+Usage (from the repository root):
+    python -m pytest performance -q
+    python -m pytest performance -q --perf-update-baseline
+"""
+
+import json
+import os
+import sys
+import time
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for module_dir in ("encoders", "embeddings", "relevance", "ingestion"):
+    sys.path.append(os.path.join(ROOT, module_dir))
+
+os.environ["ENCODER_BACKEND"] = "hashing"
+os.environ["SENTENCE_SEGMENTER"] = "regex"
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+CHUNK_FILES = ["data/processed/chunks/notes.json", "data/processed/chunks/ppts.json"]
+
+
+def pytest_addoption(parser):
+    parser.addoption("--perf-tolerance", type=float,
+                     default=float(os.environ.get("PERF_TOLERANCE", "0.5")),
+                     help="Allowed relative slowdown vs baseline before failing")
+    parser.addoption("--perf-update-baseline", action="store_true",
+                     help="Write current timings to performance/baseline.json")
+
+
+def median_ms(fn, repeat, warmup, min_sample_ms=10.0):
+    """Median per-call time, looping fast calls so each sample is >= min_sample_ms"""
+    start = time.perf_counter()
+    for _ in range(max(warmup, 1)):
+        fn()
+    per_call_ms = (time.perf_counter() - start) * 1000 / max(warmup, 1)
+    inner = max(1, int(np.ceil(min_sample_ms / max(per_call_ms, 1e-6))))
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        timings.append((time.perf_counter() - start) * 1000 / inner)
+    return float(np.median(timings))
+
+
+def calibration_workload():
+    """Fixed mix of numpy and interpreter work used as the unit of cost"""
+    rng = np.random.default_rng(0)
+    a = rng.standard_normal((256, 256)).astype(np.float32)
+    for _ in range(10):
+        a = np.tanh(a @ a.T / 256)
+    total = 0
+    for i in range(50000):
+        total += i % 7
+    return total
+
+
+class PerfRecorder:
+    """Measures benchmarks and compares them to the stored baseline"""
+
+    def __init__(self, baseline, tolerance, update):
+        self.baseline = baseline.get("benchmarks", {})
+        self.tolerance = tolerance
+        self.update = update
+        self.calibration_ms = median_ms(calibration_workload, repeat=7, warmup=2)
+        self.results = {}
+
+    def measure(self, name, fn, repeat=15, warmup=3):
+        elapsed_ms = median_ms(fn, repeat, warmup)
+        relative = elapsed_ms / self.calibration_ms
+        self.results[name] = {"median_ms": elapsed_ms, "relative": relative}
+
+        if self.update:
+            return relative
+
+        expected = self.baseline.get(name)
+        if expected is None:
+            pytest.fail(f"No baseline for '{name}'; run with --perf-update-baseline to record one")
+
+        limit = expected["relative"] * (1 + self.tolerance)
+        assert relative <= limit, (
+            f"{name} regressed: {relative:.3f} units ({elapsed_ms:.2f} ms) vs baseline "
+            f"{expected['relative']:.3f} (limit {limit:.3f} at tolerance {self.tolerance:.0%})"
+        )
+        return relative
+
+    def save(self, path):
+        baseline = {"benchmarks": dict(self.baseline)}
+        baseline["benchmarks"].update(self.results)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+@pytest.fixture(scope="session")
+def perf(request):
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    recorder = PerfRecorder(
+        baseline,
+        tolerance=request.config.getoption("--perf-tolerance"),
+        update=request.config.getoption("--perf-update-baseline")
+    )
+    yield recorder
+
+    if recorder.update:
+        recorder.save(BASELINE_PATH)
+
+
+@pytest.fixture(scope="session")
+def checker(tmp_path_factory):
+    """Checker over the committed syllabus units, re-embedded with the stand-in encoder"""
+    from process_syllabus import SyllabusProcessor
+    from relevance_checker import QuestionRelevanceChecker
+
+    header_file = str(tmp_path_factory.mktemp("syllabus") / "syllabus_embeddings.meta.json")
+    SyllabusProcessor().reembed(os.path.join(ROOT, "relevance", "syllabus_embeddings.meta.json"), header_file)
+    return QuestionRelevanceChecker(header_file)
+
+
+@pytest.fixture(scope="session")
+def index_files(tmp_path_factory):
+    """FAISS index + metadata built from the notes/PPT chunks with the stand-in encoder"""
+    import faiss
+    from build_index import TextbookEmbedder
+
+    chunks = []
+    for path in CHUNK_FILES:
+        with open(os.path.join(ROOT, path), "r", encoding="utf-8") as f:
+            chunks.extend(json.load(f))
+
+    embedder = TextbookEmbedder()
+    embeddings = np.asarray(embedder.model.encode([c["text"] for c in chunks]), dtype=np.float32)
+    index = embedder.build_faiss_index(embeddings)
+
+    out_dir = tmp_path_factory.mktemp("index")
+    index_path = str(out_dir / "textbook_index.faiss")
+    metadata_path = str(out_dir / "textbook_metadata.json")
+    faiss.write_index(index, index_path)
+
+    metadata = [
+        {"id": i, "unit": c["unit"], "topic": c["topic"], "source": c["source"], "page": c["page"], "text": c["text"]}
+        for i, c in enumerate(chunks)
+    ]
+    with open(metadata_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False)
+
+    return index_path, metadata_path
+
+
+@pytest.fixture(scope="session")
+def retriever(index_files):
+    from retriever import TextbookRetriever
+    return TextbookRetriever(*index_files)
+
+
+@pytest.fixture(scope="session")
+def fixture_pdf(tmp_path_factory):
+    """Small multi-page textbook-like PDF generated with PyMuPDF"""
+    fitz = pytest.importorskip("fitz")
+
+    with open(os.path.join(ROOT, CHUNK_FILES[0]), "r", encoding="utf-8") as f:
+        texts = [chunk["text"] for chunk in json.load(f)[:20]]
+
+    doc = fitz.open()
+    for page_num, text in enumerate(texts, 1):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 780), f"Chapter {page_num // 5 + 1}\n{text}", fontsize=9)
+
+    path = str(tmp_path_factory.mktemp("pdf") / "fixture.pdf")
+    doc.save(path)
+    return path
@@ -0,0 +1,303 @@
+"""
+LOAD TEST FOR THE RELEVANCE WEB SERVICE
+=======================================
+
+Replays a question mix from the synthetic QA set against /check_relevance
+and reports, per concurrency level:
+
+- throughput (completed and successful requests / second)
+- latency p50 / p90 / p95 / p99 / max of successful requests
+- error rate, with shed (503) responses counted separately
+
+SERVER:
+Unless --url is given, the service (relevance/app.py) is started in a
+separate process on a free local port with Flask's threaded server and
+stopped afterwards. --encoder stub starts it with ENCODER_BACKEND=hashing
+(no model weights needed) and a temporary course config whose syllabus
+artifacts are re-embedded with that encoder, since the committed ones are
+rejected as built by another encoder; --encoder real uses the environment
+as is.
+The semantic question cache is disabled (QUESTION_CACHE_SIZE=0) so every
+request is scored; the question mix is small enough that a cache would
+answer almost every request. --question-cache turns it on (QUESTION_CACHE_SIZE
+from the environment, or 4096), to measure the cached path.
+
+LOAD MODEL:
+Without --rate, each of the concurrency workers sends its next request as
+soon as the previous one returns (closed loop, finds peak throughput).
+With --rate, requests are scheduled at a fixed arrival rate shared by the
+workers (open loop); latency is measured from the scheduled send time, so
+time spent waiting for a free worker is included when the service falls
+behind.
+
+Usage (from the repository root):
+    python performance/load_test.py --encoder stub --concurrency 1 4 16 --duration 10
+    python performance/load_test.py --encoder real --rate 50 --concurrency 32 --duration 30
+    python performance/load_test.py --url http://localhost:5000 --concurrency 8
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_PATH = os.path.join(ROOT, "dataset", "synthetic_qa_seed.json")
+COURSE_CONFIG = os.path.join(ROOT, "courses", "courses.json")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def load_questions(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [item["question"] for item in json.load(f)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def stub_course_config(out_dir):
+    """Copy of the course config with every syllabus re-embedded by the hashing encoder"""
+    for module_dir in ("encoders", "relevance"):
+        sys.path.append(os.path.join(ROOT, module_dir))
+    from process_syllabus import SyllabusProcessor
+
+    with open(os.environ.get("COURSE_CONFIG", COURSE_CONFIG), "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    for course_id, course in config["courses"].items():
+        model_name = course.get("syllabus_model", "all-MiniLM-L6-v2")
+        source = course["syllabus"] if os.path.isabs(course["syllabus"]) else os.path.join(ROOT, course["syllabus"])
+        course["syllabus"] = os.path.join(out_dir, f"{course_id}.meta.json")
+        SyllabusProcessor(model_name, backend="hashing").reembed(source, course["syllabus"])
+
+    path = os.path.join(out_dir, "courses.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return path
+
+
+def serve(port):
+    """Run relevance/app.py on the threaded WSGI server (child process entry point)"""
+    import logging
+    from werkzeug.serving import make_server
+
+    # Per-request access log lines would be part of the measured cost
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    sys.path.append(os.path.join(ROOT, "relevance"))
+    from app import app
+
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+
+def start_server(encoder, question_cache, log_path, artifact_dir=None, timeout=60.0):
+    """Start the service in a child process; returns (process, base_url)
+
+    With the stub encoder, stand-in syllabus artifacts are written to artifact_dir.
+    """
+    port = free_port()
+    env = dict(os.environ)
+    if encoder == "stub":
+        env["ENCODER_BACKEND"] = "hashing"
+        env["COURSE_CONFIG"] = stub_course_config(artifact_dir)
+    if not question_cache:
+        env["QUESTION_CACHE_SIZE"] = "0"
+    elif int(env.get("QUESTION_CACHE_SIZE") or 0) <= 0:
+        env["QUESTION_CACHE_SIZE"] = "4096"
+
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port)],
+                               env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited with code {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/metrics")
+            connection.getresponse().read()
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Service did not start within {timeout:.0f}s")
+
+
+class LoadRun:
+    """One load level: concurrency workers for a fixed duration"""
+
+    def __init__(self, base_url, questions, concurrency, duration, rate=None, course=None, timeout=30.0, seed=0):
+        url = urlparse(base_url)
+        self.host, self.port = url.hostname, url.port or 80
+        self.questions = questions
+        self.concurrency = concurrency
+        self.duration = duration
+        self.rate = rate
+        self.course = course
+        self.timeout = timeout
+        self.seed = seed
+
+        self.lock = threading.Lock()
+        self.next_request = 0
+        self.latencies = []   # seconds, successful requests only
+        self.statuses = {}    # "200", "503", ... or "error"
+
+    def _next_slot(self, start, end):
+        """(request number, scheduled send time) or None once the run is over"""
+        with self.lock:
+            i = self.next_request
+            self.next_request += 1
+        scheduled = start + i / self.rate if self.rate else time.perf_counter()
+        return (i, scheduled) if scheduled < end else None
+
+    def _record(self, status, latency):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == "200":
+                self.latencies.append(latency)
+
+    def _worker(self, worker_id, start, end):
+        rng = random.Random(self.seed + worker_id)
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {"Content-Type": "application/json"}
+
+        while True:
+            slot = self._next_slot(start, end)
+            if slot is None:
+                break
+            _, scheduled = slot
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            payload = {"question": rng.choice(self.questions)}
+            if self.course:
+                payload["course"] = self.course
+            try:
+                connection.request("POST", "/check_relevance", body=json.dumps(payload), headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = str(response.status)
+            except (OSError, http.client.HTTPException):
+                status = "error"
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._record(status, time.perf_counter() - scheduled)
+
+        connection.close()
+
+    def run(self):
+        start = time.perf_counter()
+        end = start + self.duration
+        workers = [threading.Thread(target=self._worker, args=(w, start, end)) for w in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed):
+        completed = sum(self.statuses.values())
+        ok = self.statuses.get("200", 0)
+        shed = self.statuses.get("503", 0)
+        latencies_ms = np.array(self.latencies) * 1000
+
+        latency = {f"p{p}": float(np.percentile(latencies_ms, p)) if ok else None for p in PERCENTILES}
+        latency["max"] = float(latencies_ms.max()) if ok else None
+        return {
+            "concurrency": self.concurrency,
+            "rate": self.rate,
+            "seconds": elapsed,
+            "requests": completed,
+            "throughput": completed / elapsed,
+            "ok_throughput": ok / elapsed,
+            "latency_ms": latency,
+            "error_rate": (completed - ok) / completed if completed else 0.0,
+            "shed_rate": shed / completed if completed else 0.0,
+            "statuses": dict(self.statuses)
+        }
+
+
+def format_ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the relevance web service")
+    parser.add_argument("--url", default=None, help="Test a running service instead of starting one")
+    parser.add_argument("--encoder", choices=["stub", "real"], default="stub",
+                        help="stub: hashing stand-in encoder; real: ENCODER_BACKEND from the environment")
+    parser.add_argument("--question-cache", action="store_true",
+                        help="Keep the service's semantic question cache on (default: QUESTION_CACHE_SIZE=0)")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--rate", type=float, default=None, help="Requests/s per level (default: as fast as possible)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unrecorded load before the first level")
+    parser.add_argument("--course", default=None)
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--server-log", default=None, help="Write the started service's output here")
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--serve", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve)
+        return
+
+    questions = load_questions(args.dataset)
+    process = None
+    artifact_dir = tempfile.mkdtemp(prefix="load_test_")
+    if args.url:
+        base_url = args.url
+    else:
+        process, base_url = start_server(args.encoder, args.question_cache, args.server_log, artifact_dir)
+
+    print("RELEVANCE SERVICE LOAD TEST")
+    print("=" * 60)
+    print(f"Target: {base_url} | Encoder: {'external' if args.url else args.encoder} | "
+          f"Question cache: {'external' if args.url else ('on' if args.question_cache else 'off')} | "
+          f"Questions: {len(questions)} | Rate: {args.rate or 'unbounded'}")
+
+    try:
+        if args.warmup > 0:
+            LoadRun(base_url, questions, max(args.concurrency), args.warmup, course=args.course).run()
+
+        results = []
+        print(f"\n{'conc':>5}{'req/s':>9}{'ok/s':>9}{'p50':>8}{'p90':>8}{'p95':>8}{'p99':>8}{'max':>8}{'err %':>7}{'shed %':>8}")
+        for concurrency in args.concurrency:
+            result = LoadRun(base_url, questions, concurrency, args.duration, rate=args.rate, course=args.course).run()
+            results.append(result)
+            latency = result["latency_ms"]
+            print(f"{concurrency:>5}{result['throughput']:>9.1f}{result['ok_throughput']:>9.1f}"
+                  f"{format_ms(latency['p50'])}{format_ms(latency['p90'])}{format_ms(latency['p95'])}"
+                  f"{format_ms(latency['p99'])}{format_ms(latency['max'])}"
+                  f"{result['error_rate'] * 100:>7.1f}{result['shed_rate'] * 100:>8.1f}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        shutil.rmtree(artifact_dir, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"target": base_url, "encoder": None if args.url else args.encoder,
+                   "question_cache": None if args.url else args.question_cache, "results": results}, f, indent=2)
+    print(f"\nLatencies in ms. Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
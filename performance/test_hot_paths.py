@@ -0,0 +1,50 @@
+"""
+Performance regression tests for relevance, retrieval and ingestion hot paths.
+"""
+
+import json
+import os
+from conftest import ROOT
+
+with open(os.path.join(ROOT, "dataset", "synthetic_qa_seed.json"), "r", encoding="utf-8") as f:
+    QUESTIONS = [item["question"] for item in json.load(f)]
+
+
+def test_check_relevance(perf, checker):
+    result = checker.check_relevance("How does TCP congestion control work?")
+    assert result["relevance"] in ("RELEVANT", "PARTIALLY_RELEVANT", "IRRELEVANT")
+
+    perf.measure("check_relevance", lambda: checker.check_relevance("How does TCP congestion control work?"))
+
+
+def test_batch_check(perf, checker):
+    assert len(checker.batch_check(QUESTIONS)) == len(QUESTIONS)
+
+    perf.measure("batch_check_dataset", lambda: checker.batch_check(QUESTIONS), repeat=5)
+
+
+def test_retriever_search(perf, retriever):
+    assert retriever.search("What is a VLAN?", top_k=5, min_score=0.0)
+
+    perf.measure("retriever_search", lambda: retriever.search("What is a VLAN?", top_k=5, min_score=0.0))
+
+
+def test_index_load(perf, index_files):
+    from retriever import TextbookRetriever
+
+    perf.measure("index_load", lambda: TextbookRetriever(*index_files), repeat=5, warmup=1)
+
+
+def test_pdf_ingestion(perf, fixture_pdf):
+    from extract_pdf import extract_pdf_text
+    from clean_text import clean_text
+    from chunk_text import chunk_text
+
+    def ingest():
+        chunks = []
+        for page in extract_pdf_text(fixture_pdf):
+            chunks.extend(chunk_text(clean_text(page["text"])))
+        return chunks
+
+    assert ingest()
+    perf.measure("pdf_ingestion", ingest, repeat=5, warmup=1)
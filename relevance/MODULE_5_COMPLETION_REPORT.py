@@ -30,7 +30,8 @@ KEY FILES CREATED:
 - relevance/relevance_checker.py: Main relevance classification
 - relevance/demo_relevance.py: Interactive demonstration
 - relevance/test_module5_simple.py: Validation test suite
-- relevance/syllabus_embeddings.json: Precomputed syllabus embeddings
+- relevance/syllabus_embeddings.meta.json + .npy: Precomputed syllabus embeddings (binary, model-checked)
+- relevance/syllabus_store.py: Binary syllabus embedding save/load
 
 ACADEMIC COMPLIANCE:
 ✅ No model training or fine-tuning
@@ -0,0 +1,133 @@
+"""
+ADMISSION CONTROL AND LOAD SHEDDING
+===================================
+
+Bounds how much work the web service accepts, so a burst of requests gets
+fast 503 + Retry-After responses instead of everyone waiting seconds
+behind CPU-bound encodes.
+
+- At most max_in_flight requests run at once; the rest wait in a queue
+- At most max_queue requests wait; beyond that new ones are shed at once
+- Each request has a deadline; a request still queued (or only admitted)
+  past its deadline is shed before any encoding happens
+- Retry-After is estimated from the queue length and recent service times
+
+CONFIG (environment variables):
+- ADMISSION_MAX_IN_FLIGHT: concurrent requests (default: CPU count)
+- ADMISSION_MAX_QUEUE: waiting requests (default: 2 x in-flight limit)
+- REQUEST_DEADLINE_MS: per-request deadline (default: 2000)
+
+USAGE:
+    with admission.admit(deadline):
+        result = checker.check_relevance(question)
+    # raises Overloaded(reason, retry_after) when shed
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SHED_REASONS = ("queue_full", "deadline")
+
+
+class Overloaded(Exception):
+    """Request shed by admission control"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Request shed ({reason}); retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=None, max_queue=None, deadline_ms=2000):
+        self.max_in_flight = max_in_flight or os.cpu_count() or 1
+        self.max_queue = self.max_in_flight * 2 if max_queue is None else max_queue
+        self.deadline_ms = deadline_ms
+
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = {reason: 0 for reason in SHED_REASONS}
+        self.service_seconds = None  # running average of admitted request time
+
+    @classmethod
+    def from_env(cls):
+        def env_int(name):
+            value = os.environ.get(name)
+            return int(value) if value else None
+
+        return cls(
+            max_in_flight=env_int("ADMISSION_MAX_IN_FLIGHT"),
+            max_queue=env_int("ADMISSION_MAX_QUEUE"),
+            deadline_ms=env_int("REQUEST_DEADLINE_MS") or 2000
+        )
+
+    def deadline_from(self, start):
+        """Absolute perf_counter deadline for a request that arrived at start"""
+        return start + self.deadline_ms / 1000
+
+    def retry_after(self):
+        """Whole seconds until the current queue should have drained"""
+        per_request = self.service_seconds or 0.1
+        return max(1, math.ceil((self.queued + 1) * per_request / self.max_in_flight))
+
+    def _reject(self, reason):
+        self.shed[reason] += 1
+        raise Overloaded(reason, self.retry_after())
+
+    @contextmanager
+    def admit(self, deadline):
+        """Hold an in-flight slot for the block, or raise Overloaded"""
+        with self.condition:
+            if self.in_flight >= self.max_in_flight:
+                if self.queued >= self.max_queue:
+                    self._reject("queue_full")
+
+                self.queued += 1
+                try:
+                    while self.in_flight >= self.max_in_flight:
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(remaining)
+                finally:
+                    self.queued -= 1
+
+            # Stale work is rejected before it is encoded. A free slot this
+            # request will not take is passed on, or the next waiter would
+            # sleep until its own deadline (a wakeup lost to the shed)
+            if time.perf_counter() >= deadline or self.in_flight >= self.max_in_flight:
+                if self.in_flight < self.max_in_flight:
+                    self.condition.notify()
+                self._reject("deadline")
+
+            self.in_flight += 1
+            self.admitted += 1
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.condition:
+                self.in_flight -= 1
+                if self.service_seconds is None:
+                    self.service_seconds = elapsed
+                else:
+                    self.service_seconds = 0.9 * self.service_seconds + 0.1 * elapsed
+                self.condition.notify()
+
+    def stats(self):
+        with self.condition:
+            return {
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "max_in_flight": self.max_in_flight,
+                "max_queue": self.max_queue
+            }
@@ -1,18 +1,33 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify
 import sys
 import os
+import threading
+import time
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from relevance_checker import QuestionRelevanceChecker
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "courses"))
+from course_manager import CourseManager
+from admission import AdmissionController, Overloaded
+from encoder_registry import encoder_stats
+import metrics
 
 app = Flask(__name__)
-# Initialize checker when app starts
-checker = None
+# Courses are loaded on first request and evicted under memory pressure
+courses = None
+courses_lock = threading.Lock()
+# Bounded concurrency for the CPU-bound relevance checks
+admission = AdmissionController.from_env()
 
-def get_checker():
-    global checker
-    if checker is None:
-        checker = QuestionRelevanceChecker()
-    return checker
+def get_courses():
+    global courses
+    if courses is None:
+        # Concurrent first requests must share one manager (and its loaded models)
+        with courses_lock:
+            if courses is None:
+                courses = CourseManager()
+    return courses
+
+def get_checker(course=None):
+    return get_courses().checker(course)
 
 @app.route('/')
 def home():
@@ -20,23 +35,83 @@ def home():
 
 @app.route('/check_relevance', methods=['POST'])
 def check_relevance():
+    start = time.perf_counter()
+    clock = metrics.stage_clock("http_stage_seconds")
+    
     data = request.get_json()
     question = data.get('question', '').strip()
+    course = data.get('course') or None
+    clock.mark("parse_json")
     
     if not question:
+        metrics.inc("http_requests_total", endpoint="check_relevance", status="invalid")
         return jsonify({'error': 'Please enter a question'})
     
-    # Get fresh checker instance
-    current_checker = get_checker()
-    result = current_checker.check_relevance(question)
+    if course is not None and course not in get_courses().course_configs:
+        metrics.inc("http_requests_total", endpoint="check_relevance", status="invalid")
+        return jsonify({'error': f"Unknown course '{course}'"}), 404
     
-    return jsonify({
+    try:
+        with admission.admit(admission.deadline_from(start)):
+            clock.mark("admission")
+            # Resolved after admission: a cold course loads its checker here, under the limit
+            current_checker = get_checker(course)
+            result = current_checker.check_relevance(question)
+    except Overloaded as e:
+        metrics.inc("http_requests_total", endpoint="check_relevance", status="shed")
+        response = jsonify({'error': 'The server is busy, please try again shortly', 'retry_after': e.retry_after})
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    clock.mark("check_relevance")
+    
+    response = jsonify({
         'question': question,
+        'course': course or get_courses().default_course,
         'relevance': result['relevance'],
         'unit': result['best_unit'],
+        'topic': result.get('best_topic'),
         'score': round(result['similarity_score'], 3),
         'message': result['message']
     })
+    clock.mark("serialize")
+    
+    metrics.inc("http_requests_total", endpoint="check_relevance", status="ok")
+    metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint="check_relevance")
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition of request, stage and model metrics"""
+    stats = encoder_stats()
+    for model in stats["models"]:
+        labels = {"model": model["model_name"], "backend": model["backend"]}
+        metrics.set_gauge("model_load_seconds", model["load_seconds"], **labels)
+        metrics.set_gauge("model_memory_bytes", model["memory_bytes"], **labels)
+        metrics.set_gauge("model_encode_calls", model["encode_calls"], **labels)
+    metrics.set_gauge("encoder_registry_lookups", stats["hits"], result="hit")
+    metrics.set_gauge("encoder_registry_lookups", stats["misses"], result="miss")
+    
+    admission_stats = admission.stats()
+    metrics.set_gauge("admission_in_flight", admission_stats["in_flight"])
+    metrics.set_gauge("admission_queue_depth", admission_stats["queued"])
+    # Read from the controller, so they match admission.stats() whether or not METRICS_ENABLED is set
+    metrics.set_counter("admission_admitted_total", admission_stats["admitted"])
+    for reason, count in admission_stats["shed"].items():
+        metrics.set_counter("admission_shed_total", count, reason=reason)
+    
+    if courses is not None:
+        course_stats = courses.stats()
+        metrics.set_gauge("courses_loaded", len(course_stats["courses"]))
+        metrics.set_gauge("courses_memory_bytes", course_stats["memory_bytes"])
+        metrics.set_gauge("courses_memory_budget_bytes", course_stats["memory_budget_bytes"])
+        metrics.set_gauge("courses_evicted", course_stats["evictions"])
+        for course in course_stats["courses"]:
+            for name, cache_stats in course["question_caches"].items():
+                metrics.set_gauge("question_cache_entries", cache_stats["entries"], cache=name)
+                metrics.set_gauge("question_cache_hit_rate", cache_stats["hit_rate"], cache=name)
+    
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+STREAMING BULK QUESTION CLASSIFICATION
+======================================
+
+Classifies large question files (e.g. a term of forum posts) with constant
+memory: questions are read lazily from JSONL, CSV or a JSON array (parsed
+incrementally), grouped into fixed-size batches, scored on a pool of
+worker threads (one batched encode and one score matrix per batch) and
+written out as JSONL, one line per question, in input order.
+
+PIPELINE:
+Reading and writing run on the main thread while --workers threads score
+batches; the shared encoder runs their encodes concurrently. At most
+2 x workers batches are in flight, so memory stays bounded.
+
+Each output line carries the predicted unit, confidence level and ambiguity
+(confidence_analysis.py) and, unless --no-corrections, the rule-based final
+unit and related units (unit_corrector.py). When the input has an expected
+unit column, running accuracy is reported too.
+
+Progress (questions done, questions/s) goes to stderr, so --output - can be
+piped.
+
+Usage (from the repository root):
+    python relevance/bulk_classify.py forum_posts.jsonl --output classified.jsonl
+    python relevance/bulk_classify.py posts.csv --question-field body --id-field post_id --workers 4
+    python relevance/bulk_classify.py dataset/synthetic_qa_seed.json --unit-field unit --output -
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+RELEVANCE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(RELEVANCE_DIR)
+from relevance_checker import QuestionRelevanceChecker
+from confidence_analysis import ConfidenceAnalyzer
+from unit_corrector import UnitCorrector
+
+DEFAULT_SYLLABUS = os.path.join(RELEVANCE_DIR, "syllabus_embeddings.meta.json")
+PROGRESS_INTERVAL = 5.0  # seconds between progress lines
+READ_CHUNK = 1 << 16     # characters read at a time from a JSON array
+
+
+def iter_json_array(stream, chunk_size=READ_CHUNK):
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    def next_char():
+        """Skip whitespace, reading more as needed; the next character or "" at EOF"""
+        nonlocal buffer, pos, eof
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+
+    if next_char() != "[":
+        raise ValueError("JSON input must be an array of objects")
+    pos += 1
+
+    first = True
+    while True:
+        char = next_char()
+        if char == "]":
+            return
+        if not first:
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+            pos += 1
+            next_char()
+        first = False
+
+        # Decode one element; an element ending at the buffer end may be cut off, so read on
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+        pos = end
+        yield value
+
+
+def read_records(path, input_format=None):
+    """Yield input rows as dicts, one at a time; every format is streamed"""
+    input_format = input_format or os.path.splitext(path)[1].lstrip(".").lower()
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", newline="")
+    try:
+        if input_format == "csv":
+            yield from csv.DictReader(stream)
+        elif input_format == "json":
+            yield from iter_json_array(stream)
+        else:
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class BulkClassifier:
+    def __init__(self, checker, corrections=True, question_field="question", id_field="id", unit_field=None):
+        self.analyzer = ConfidenceAnalyzer(checker)
+        self.corrector = UnitCorrector(checker) if corrections else None
+        self.question_field = question_field
+        self.id_field = id_field
+        self.unit_field = unit_field
+
+    def classify_batch(self, records):
+        """Output rows for one batch (one encode, one score matrix)"""
+        checker = self.analyzer.checker
+        records = [r for r in records if (r.get(self.question_field) or "").strip()]
+        if not records:
+            return []
+
+        texts = [r[self.question_field].strip() for r in records]
+        scores, off_topic = checker.score_questions(texts, batch_size=len(texts))
+        analysis = self.analyzer.analyze_scores(scores, off_topic)
+
+        rows = []
+        for i, (record, text) in enumerate(zip(records, texts)):
+            predicted_unit = analysis['predicted_unit'][i]
+            confidence = float(analysis['confidence_score'][i])
+            row = {
+                'id': record.get(self.id_field),
+                'question': text,
+                'predicted_unit': predicted_unit,
+                'confidence': confidence,
+                'confidence_level': str(analysis['confidence_level'][i]),
+                'is_ambiguous': bool(analysis['is_ambiguous'][i])
+            }
+
+            if self.corrector is not None and not off_topic[i]:
+                unit_scores = {unit: {'similarity': float(s)} for unit, s in zip(checker.unit_names, scores[i])}
+                correction = self.corrector.apply_correction_rules(text, predicted_unit, confidence, unit_scores)
+                row['final_unit'] = correction['final_unit']
+                row['related_units'] = correction['related_units']
+                row['correction_applied'] = correction['correction_applied']
+            else:
+                row['final_unit'] = predicted_unit
+
+            if self.unit_field and record.get(self.unit_field):
+                row['expected_unit'] = record[self.unit_field]
+                row['unit_match'] = row['final_unit'] == row['expected_unit']
+            rows.append(row)
+        return rows
+
+    def run(self, records, output, batch_size=512, workers=2):
+        """Classify a record stream, writing JSONL rows to output in input order"""
+        stats = {'questions': 0, 'skipped': 0, 'labelled': 0, 'correct': 0}
+        start = last_report = time.perf_counter()
+
+        def write(batch, rows):
+            stats['questions'] += len(rows)
+            stats['skipped'] += len(batch) - len(rows)
+            for row in rows:
+                if 'unit_match' in row:
+                    stats['labelled'] += 1
+                    stats['correct'] += row['unit_match']
+                output.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        # At most 2 x workers batches are read ahead, so memory stays bounded;
+        # results are written in submission order, which is input order
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for batch in batched(records, batch_size):
+                pending.append((batch, pool.submit(self.classify_batch, batch)))
+                while len(pending) >= 2 * workers:
+                    done_batch, future = pending.popleft()
+                    write(done_batch, future.result())
+
+                now = time.perf_counter()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    last_report = now
+                    self.report(stats, now - start)
+
+            while pending:
+                done_batch, future = pending.popleft()
+                write(done_batch, future.result())
+
+        stats['seconds'] = time.perf_counter() - start
+        self.report(stats, stats['seconds'])
+        return stats
+
+    @staticmethod
+    def report(stats, elapsed):
+        rate = stats['questions'] / elapsed if elapsed > 0 else 0.0
+        line = f"{stats['questions']} questions | {rate:.1f} questions/s"
+        if stats['skipped']:
+            line += f" | {stats['skipped']} skipped"
+        if stats['labelled']:
+            line += f" | accuracy {stats['correct']}/{stats['labelled']} ({stats['correct'] / stats['labelled'] * 100:.1f}%)"
+        print(line, file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming bulk question classification")
+    parser.add_argument("input", help="JSONL, CSV or JSON file of questions ('-' for JSONL on stdin)")
+    parser.add_argument("--format", choices=["jsonl", "csv", "json"], default=None, help="Default: from the file extension")
+    parser.add_argument("--output", default="-", help="JSONL output path ('-' for stdout)")
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--unit-field", default=None, help="Expected unit column, for accuracy")
+    parser.add_argument("--batch-size", type=int, default=512, help="Questions per encode batch")
+    parser.add_argument("--workers", type=int, default=2, help="Batches scored concurrently")
+    parser.add_argument("--no-corrections", action="store_true", help="Skip rule-based unit corrections")
+    parser.add_argument("--syllabus", default=DEFAULT_SYLLABUS)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--course", default=None, help="Use a course from courses/courses.json instead of --syllabus")
+    args = parser.parse_args()
+
+    if args.course:
+        sys.path.append(os.path.join(RELEVANCE_DIR, "..", "courses"))
+        from course_manager import CourseManager
+        checker = CourseManager().checker(args.course)
+    else:
+        checker = QuestionRelevanceChecker(args.syllabus, model_name=args.model)
+
+    classifier = BulkClassifier(checker, corrections=not args.no_corrections, question_field=args.question_field,
+                                id_field=args.id_field, unit_field=args.unit_field)
+    records = read_records(args.input, args.format)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        stats = classifier.run(records, output, batch_size=args.batch_size, workers=args.workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    if args.output != "-":
+        print(f"Classified {stats['questions']} questions in {stats['seconds']:.1f}s -> {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@
 CONFIDENCE SCORE ANALYSIS FOR SYNTHETIC QA DATASET
 ==================================================
 
-This script analyzes confidence scores for all 50 questions in the synthetic dataset
-to identify questions with high, medium, and low confidence mappings.
+This script analyzes confidence scores for all questions in the synthetic dataset
+to identify questions with high, medium, and low confidence mappings. All
+questions are encoded in one batch and scored as a single (questions x units)
+matrix; top-1, top-2, gap, level and ambiguity are numpy operations over it.
 
 CONFIDENCE SCORING LOGIC:
 1. Semantic Similarity: Cosine similarity between question embedding and syllabus unit embeddings
@@ -20,113 +22,170 @@ AMBIGUITY DETECTION:
 - Small difference between top-2 unit scores (< 0.08)
 """
 
+import argparse
 import json
+import os
 import numpy as np
 from relevance_checker import QuestionRelevanceChecker
-import pandas as pd
+
+RELEVANCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(RELEVANCE_DIR, "..", "dataset", "synthetic_qa_seed.json")
+
+HIGH_THRESHOLD = 0.6
+MEDIUM_THRESHOLD = 0.35
+AMBIGUITY_GAP = 0.08
 
 class ConfidenceAnalyzer:
-    def __init__(self):
-        self.checker = QuestionRelevanceChecker()
+    def __init__(self, checker=None):
+        # Reuse an existing checker when given; models are shared either way
+        self.checker = checker or QuestionRelevanceChecker()
+    
+    def analyze_scores(self, scores, off_topic):
+        """Top-1/top-2, gap, level and ambiguity for an (n x units) score matrix"""
+        n, num_units = scores.shape
+        rows = np.arange(n)
         
-    def analyze_question_confidence(self, question, expected_unit):
-        """Analyze confidence for a single question"""
-        result = self.checker.check_relevance(question)
+        # Top-2 per row without a full sort
+        if num_units > 1:
+            top2 = np.argpartition(-scores, 1, axis=1)[:, :2]
+            swap = scores[rows, top2[:, 1]] > scores[rows, top2[:, 0]]
+            top_idx = np.where(swap, top2[:, 1], top2[:, 0])
+            second_idx = np.where(swap, top2[:, 0], top2[:, 1])
+            second_score = scores[rows, second_idx]
+        else:
+            top_idx = np.zeros(n, dtype=int)
+            second_score = np.zeros(n)
         
-        # Get all unit scores
-        unit_scores = [(unit, data['similarity']) for unit, data in result['unit_scores'].items()]
-        unit_scores.sort(key=lambda x: x[1], reverse=True)
+        top_score = scores[rows, top_idx]
+        score_gap = top_score - second_score
         
-        top_unit, top_score = unit_scores[0]
-        second_score = unit_scores[1][1] if len(unit_scores) > 1 else 0.0
+        confidence_level = np.select(
+            [top_score >= HIGH_THRESHOLD, top_score >= MEDIUM_THRESHOLD],
+            ["HIGH", "MEDIUM"],
+            default="LOW"
+        )
+        low_confidence = top_score < MEDIUM_THRESHOLD
+        close_scores = score_gap < AMBIGUITY_GAP
         
-        # Determine confidence level
-        if top_score >= 0.6:
-            confidence_level = "HIGH"
-        elif top_score >= 0.35:
-            confidence_level = "MEDIUM"
-        else:
-            confidence_level = "LOW"
-            
-        # Check for ambiguity
-        score_gap = top_score - second_score
-        is_ambiguous = top_score < 0.35 or score_gap < 0.08
+        predicted_unit = np.array(self.checker.unit_names, dtype=object)[top_idx]
+        predicted_unit[off_topic] = "None"
+        
+        return {
+            'predicted_unit': predicted_unit,
+            'confidence_score': top_score,
+            'confidence_level': confidence_level,
+            'second_best_score': second_score,
+            'score_gap': score_gap,
+            'is_ambiguous': low_confidence | close_scores,
+            'low_confidence': low_confidence
+        }
+    
+    def analyze_question_confidence(self, question, expected_unit):
+        """Analyze confidence for a single question"""
+        scores, off_topic = self.checker.score_questions([question])
+        analysis = self.analyze_scores(scores, off_topic)
+        
+        is_ambiguous = bool(analysis['is_ambiguous'][0])
+        score_gap = float(analysis['score_gap'][0])
         
         # Determine ambiguity reason
         ambiguity_reason = ""
         if is_ambiguous:
-            if top_score < 0.35:
+            if analysis['low_confidence'][0]:
                 ambiguity_reason = "Low absolute confidence"
-            elif score_gap < 0.08:
+            else:
                 ambiguity_reason = f"Close scores (gap: {score_gap:.3f})"
-                
+        
         return {
-            'predicted_unit': top_unit,
-            'confidence_score': top_score,
-            'confidence_level': confidence_level,
-            'second_best_score': second_score,
+            'predicted_unit': analysis['predicted_unit'][0],
+            'confidence_score': float(analysis['confidence_score'][0]),
+            'confidence_level': str(analysis['confidence_level'][0]),
+            'second_best_score': float(analysis['second_best_score'][0]),
             'score_gap': score_gap,
             'is_ambiguous': is_ambiguous,
             'ambiguity_reason': ambiguity_reason,
-            'unit_match': top_unit == expected_unit,
-            'all_unit_scores': dict(unit_scores)
+            'unit_match': analysis['predicted_unit'][0] == expected_unit,
+            'all_unit_scores': dict(zip(self.checker.unit_names, scores[0].tolist()))
         }
     
     def analyze_dataset(self, dataset_path):
-        """Analyze confidence for entire dataset"""
+        """Analyze confidence for entire dataset from one batched score matrix"""
         with open(dataset_path, 'r', encoding='utf-8') as f:
             questions = json.load(f)
-            
-        results = []
         
         print("CONFIDENCE SCORE ANALYSIS")
         print("=" * 80)
         print(f"Analyzing {len(questions)} questions...")
         print()
         
-        for q in questions:
-            analysis = self.analyze_question_confidence(q['question'], q['unit'])
+        if not questions:
+            return []
+        
+        texts = [q['question'] for q in questions]
+        expected = np.array([q['unit'] for q in questions], dtype=object)
+        
+        scores, off_topic = self.checker.score_questions(texts)
+        analysis = self.analyze_scores(scores, off_topic)
+        unit_match = analysis['predicted_unit'] == expected
+        
+        # Row assembly only formats the numpy results
+        results = []
+        for i, q in enumerate(questions):
+            ambiguity_reason = ""
+            if analysis['is_ambiguous'][i]:
+                if analysis['low_confidence'][i]:
+                    ambiguity_reason = "Low absolute confidence"
+                else:
+                    ambiguity_reason = f"Close scores (gap: {analysis['score_gap'][i]:.3f})"
             
             results.append({
                 'id': q['id'],
-                'question': q['question'][:60] + "..." if len(q['question']) > 60 else q['question'],
+                'question': texts[i][:60] + "..." if len(texts[i]) > 60 else texts[i],
                 'expected_unit': q['unit'],
-                'predicted_unit': analysis['predicted_unit'],
-                'confidence_score': analysis['confidence_score'],
-                'confidence_level': analysis['confidence_level'],
-                'unit_match': analysis['unit_match'],
-                'is_ambiguous': analysis['is_ambiguous'],
-                'ambiguity_reason': analysis['ambiguity_reason'],
-                'score_gap': analysis['score_gap']
+                'predicted_unit': analysis['predicted_unit'][i],
+                'confidence_score': float(analysis['confidence_score'][i]),
+                'confidence_level': str(analysis['confidence_level'][i]),
+                'unit_match': bool(unit_match[i]),
+                'is_ambiguous': bool(analysis['is_ambiguous'][i]),
+                'ambiguity_reason': ambiguity_reason,
+                'score_gap': float(analysis['score_gap'][i])
             })
             
         return results
     
     def generate_summary_table(self, results):
         """Generate summary table and statistics"""
-        df = pd.DataFrame(results)
-        
         print("SUMMARY TABLE:")
         print("=" * 120)
         print(f"{'ID':<12} {'Question':<45} {'Expected':<8} {'Predicted':<8} {'Score':<6} {'Level':<8} {'Match':<5} {'Ambiguous'}")
         print("-" * 120)
         
-        for _, row in df.iterrows():
+        lines = []
+        for row in results:
             match_symbol = "Y" if row['unit_match'] else "N"
             ambig_symbol = "!" if row['is_ambiguous'] else ""
             
-            print(f"{row['id']:<12} {row['question']:<45} {row['expected_unit']:<8} {row['predicted_unit']:<8} "
-                  f"{row['confidence_score']:<6.3f} {row['confidence_level']:<8} {match_symbol:<5} {ambig_symbol}")
+            lines.append(f"{row['id']:<12} {row['question']:<45} {row['expected_unit']:<8} {row['predicted_unit']:<8} "
+                         f"{row['confidence_score']:<6.3f} {row['confidence_level']:<8} {match_symbol:<5} {ambig_symbol}")
+        print("\n".join(lines))
         
         print("\n" + "=" * 120)
         
         # Statistics
         total = len(results)
-        high_conf = len(df[df['confidence_level'] == 'HIGH'])
-        medium_conf = len(df[df['confidence_level'] == 'MEDIUM']) 
-        low_conf = len(df[df['confidence_level'] == 'LOW'])
-        ambiguous = len(df[df['is_ambiguous'] == True])
-        correct_predictions = len(df[df['unit_match'] == True])
+        if not total:
+            return
+        
+        levels = np.array([r['confidence_level'] for r in results])
+        scores = np.fromiter((r['confidence_score'] for r in results), dtype=float, count=total)
+        ambiguous_mask = np.fromiter((r['is_ambiguous'] for r in results), dtype=bool, count=total)
+        match_mask = np.fromiter((r['unit_match'] for r in results), dtype=bool, count=total)
+        
+        high_conf = int((levels == 'HIGH').sum())
+        medium_conf = int((levels == 'MEDIUM').sum())
+        low_conf = int((levels == 'LOW').sum())
+        ambiguous = int(ambiguous_mask.sum())
+        correct_predictions = int(match_mask.sum())
         
         print("STATISTICS:")
         print(f"Total Questions: {total}")
@@ -139,25 +198,34 @@ class ConfidenceAnalyzer:
         # Highlight problematic questions
         print("\nPROBLEMATIC QUESTIONS (Low confidence or ambiguous):")
         print("-" * 80)
-        problematic = df[(df['confidence_score'] < 0.35) | (df['is_ambiguous'] == True)]
+        problematic = np.flatnonzero((scores < MEDIUM_THRESHOLD) | ambiguous_mask)
         
-        for _, row in problematic.iterrows():
-            print(f"{row['id']}: {row['question']}")
-            print(f"  Score: {row['confidence_score']:.3f} | Reason: {row['ambiguity_reason']}")
-            print()
+        lines = []
+        for i in problematic:
+            row = results[i]
+            lines.append(f"{row['id']}: {row['question']}")
+            lines.append(f"  Score: {row['confidence_score']:.3f} | Reason: {row['ambiguity_reason']}")
+            lines.append("")
+        print("\n".join(lines))
 
 def main():
-    analyzer = ConfidenceAnalyzer()
-    dataset_path = "../dataset/synthetic_qa_seed.json"
+    # Large question files: use bulk_classify.py, which streams instead of loading everything
+    parser = argparse.ArgumentParser(description="Confidence score analysis")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--output", default=os.path.join(RELEVANCE_DIR, "confidence_analysis_results.json"))
+    parser.add_argument("--syllabus", default=os.path.join(RELEVANCE_DIR, "syllabus_embeddings.meta.json"))
+    args = parser.parse_args()
+    
+    analyzer = ConfidenceAnalyzer(QuestionRelevanceChecker(args.syllabus))
     
-    results = analyzer.analyze_dataset(dataset_path)
+    results = analyzer.analyze_dataset(args.dataset)
     analyzer.generate_summary_table(results)
     
     # Save detailed results
-    with open("confidence_analysis_results.json", 'w', encoding='utf-8') as f:
+    with open(args.output, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2, ensure_ascii=False)
     
-    print(f"\nDetailed results saved to: confidence_analysis_results.json")
+    print(f"\nDetailed results saved to: {args.output}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
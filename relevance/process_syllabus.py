@@ -1,12 +1,18 @@
 import json
+import os
 import re
-from sentence_transformers import SentenceTransformer
+import sys
+import numpy as np
+from syllabus_store import save_syllabus_matrix
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+from encoder_registry import get_encoder
 
 class SyllabusProcessor:
     """Process syllabus content for relevance checking"""
     
-    def __init__(self):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, model_name="all-MiniLM-L6-v2", backend=None):
+        self.model_name = model_name
+        self.model = get_encoder(model_name, backend)
         
     def extract_clean_topics(self, syllabus_file):
         """Extract clean topic keywords from syllabus"""
@@ -40,34 +46,99 @@ class SyllabusProcessor:
             
         return unit_embeddings
     
-    def save_syllabus_embeddings(self, output_file):
-        """Process and save syllabus embeddings"""
+    def create_topic_embeddings(self, unit_topics):
+        """Embed every topic separately into one (topics x dim) matrix
+        
+        Returns the matrix and a row map of {"unit", "topic"} dicts, so a
+        short topic is not diluted by the rest of its unit's topic list.
+        """
+        rows = [
+            {"unit": unit, "topic": topic}
+            for unit, topics in unit_topics.items()
+            for topic in topics
+        ]
+        matrix = self.model.encode([row["topic"] for row in rows])
+        
+        return matrix, rows
+    
+    def save_syllabus_embeddings(self, output_file, granularity="unit"):
+        """Process and save syllabus embeddings
+        
+        granularity="unit" stores one vector per unit; "topic" stores one
+        vector per syllabus topic with a topic -> unit map.
+        """
         # Extract topics
         unit_topics = self.extract_clean_topics("../data/processed/chunks/syllabus.json")
         
-        # Create embeddings
-        unit_embeddings = self.create_unit_embeddings(unit_topics)
+        units = [
+            {"unit": unit, "topics": topics, "text": " ".join(topics)}
+            for unit, topics in unit_topics.items()
+        ]
         
-        # Save for relevance checker
-        import numpy as np
+        # Create embeddings and save for relevance checker: JSON header + contiguous .npy matrix
+        if granularity == "topic":
+            matrix, rows = self.create_topic_embeddings(unit_topics)
+            header = save_syllabus_matrix(output_file, units, matrix, self.model_name, rows=rows,
+                                          encoder=self.model.encoder_id)
+        else:
+            unit_embeddings = self.create_unit_embeddings(unit_topics)
+            matrix = np.vstack([data["embedding"] for data in unit_embeddings.values()])
+            header = save_syllabus_matrix(output_file, units, matrix, self.model_name, encoder=self.model.encoder_id)
+            
+        print(f"Syllabus embeddings saved to {output_file} ({header['matrix_file']})")
+        return header
+    
+    def reembed(self, header_file, output_file):
+        """Re-encode an existing artifact's units (or topics) with this processor's encoder
         
-        syllabus_data = {}
-        for unit, data in unit_embeddings.items():
-            syllabus_data[unit] = {
-                "topics": data["topics"],
-                "text": data["text"],
-                "embedding": data["embedding"].tolist()  # Convert numpy to list for JSON
-            }
+        Gives e.g. the hashing backend a syllabus artifact of its own
+        without re-reading the syllabus source.
+        """
+        with open(header_file, 'r', encoding='utf-8') as f:
+            source = json.load(f)
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(syllabus_data, f, indent=2, ensure_ascii=False)
-            
-        print(f"Syllabus embeddings saved to {output_file}")
-        return syllabus_data
+        rows = source.get("rows") if source.get("granularity") == "topic" else None
+        texts = [row["topic"] for row in rows] if rows is not None else [unit["text"] for unit in source["units"]]
+        matrix = self.model.encode(texts)
+        return save_syllabus_matrix(output_file, source["units"], matrix, self.model_name, rows=rows,
+                                    encoder=self.model.encoder_id)
+
+def convert_legacy_embeddings(json_file, output_file, model_name="all-MiniLM-L6-v2"):
+    """Convert an old float-list syllabus_embeddings.json to the binary format"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    
+    units = [{"unit": unit, "topics": d["topics"], "text": d["text"]} for unit, d in data.items()]
+    matrix = np.array([d["embedding"] for d in data.values()], dtype=np.float32)
+    
+    header = save_syllabus_matrix(output_file, units, matrix, model_name)
+    print(f"Converted {json_file} -> {output_file} ({header['matrix_file']})")
+    return header
 
 def main():
-    processor = SyllabusProcessor()
-    processor.save_syllabus_embeddings("syllabus_embeddings.json")
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate syllabus embeddings for relevance checking")
+    parser.add_argument("--granularity", choices=["unit", "topic"], default="unit",
+                        help="One vector per unit (default) or one per syllabus topic")
+    parser.add_argument("--output", default=None,
+                        help="Header file to write (default depends on granularity)")
+    parser.add_argument("--backend", default=None,
+                        help="Encoder backend (default: ENCODER_BACKEND); recorded in the header")
+    parser.add_argument("--reembed", default=None, metavar="HEADER",
+                        help="Re-encode an existing artifact's units/topics instead of the syllabus")
+    args = parser.parse_args()
+    
+    output_file = args.output or (
+        "syllabus_topics.meta.json" if args.granularity == "topic" else "syllabus_embeddings.meta.json"
+    )
+    
+    processor = SyllabusProcessor(backend=args.backend)
+    if args.reembed:
+        processor.reembed(args.reembed, output_file)
+        print(f"Syllabus embeddings saved to {output_file}")
+    else:
+        processor.save_syllabus_embeddings(output_file, granularity=args.granularity)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,28 +1,90 @@
+import copy
 import json
+import os
+import sys
+import time
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from syllabus_store import load_syllabus_matrix
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "encoders"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "monitoring"))
+from encoder_registry import get_encoder
+import metrics
 
 class QuestionRelevanceChecker:
     """Check question relevance against Computer Networks syllabus"""
     
-    def __init__(self, syllabus_embeddings_file="syllabus_embeddings.json"):
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    NON_CN_KEYWORDS = [
+        "cryptocurrency", "bitcoin", "blockchain", "mining", "wallet",
+        "machine learning", "artificial intelligence", "AI", "ML",
+        "database", "SQL", "normalization", "DBMS",
+        "cooking", "food", "recipe", "pasta",
+        "weather", "temperature", "climate",
+        "finance", "banking", "stock", "investment"
+    ]
+    
+    # Boost confidence for known CN keywords
+    CN_KEYWORD_BOOSTS = {
+        "ip": 0.25, "tcp": 0.25, "udp": 0.25, "http": 0.25, "ftp": 0.25,
+        "dns": 0.25, "dhcp": 0.25, "snmp": 0.25, "osi": 0.25, "ethernet": 0.25,
+        "routing": 0.20, "switching": 0.20, "protocol": 0.15, "network": 0.10
+    }
+    
+    def __init__(self, syllabus_embeddings_file="syllabus_embeddings.meta.json", model_name="all-MiniLM-L6-v2",
+                 topic_aggregation="max", topic_top_k=3, question_cache=None):
+        self.model_name = model_name
+        self.model = get_encoder(model_name)
+        # Optional semantic_cache.SemanticCache of verdicts for paraphrased questions
+        self.question_cache = question_cache
+        
+        # Topic-level artifacts (process_syllabus.py --granularity topic) score
+        # each unit by the max or top-k mean of its topic similarities
+        self.topic_rows = None
+        self.topic_aggregation = topic_aggregation
+        self.topic_top_k = topic_top_k
         self.syllabus_data = self.load_syllabus_embeddings(syllabus_embeddings_file)
         
+        # Stack embeddings once so a question is scored with one product
+        self.unit_names = list(self.syllabus_data.keys())
+        self.score_matrix = self._build_score_matrix()
+        
         # Improved threshold values
         self.RELEVANT_THRESHOLD = 0.28
         self.PARTIAL_THRESHOLD = 0.12
         
     def load_syllabus_embeddings(self, file_path):
-        """Load precomputed syllabus embeddings"""
+        """Load precomputed syllabus embeddings
+        
+        Binary artifacts (*.meta.json + .npy) are memory-mapped and rejected
+        if they were built with a different model. Legacy float-list JSON
+        files are still accepted but cannot be checked for the model.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Convert embedding lists back to numpy arrays
-            for unit in data:
-                data[unit]["embedding"] = np.array(data[unit]["embedding"])
+            if file_path.endswith(".meta.json"):
+                header, matrix = load_syllabus_matrix(file_path, expected_model=self.model_name,
+                                                      expected_encoder=self.model.encoder_id)
+                
+                data = {}
+                for row, unit_info in enumerate(header["units"]):
+                    data[unit_info["unit"]] = {
+                        "topics": unit_info["topics"],
+                        "text": unit_info["text"]
+                    }
+                
+                if header.get("granularity") == "topic":
+                    self.topic_rows = header["rows"]
+                    self.topic_matrix = matrix
+                else:
+                    # Each unit embedding is a row view into the mapped matrix
+                    for row, unit_info in enumerate(header["units"]):
+                        data[unit_info["unit"]]["embedding"] = matrix[row]
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                
+                # Convert embedding lists back to numpy arrays
+                for unit in data:
+                    data[unit]["embedding"] = np.array(data[unit]["embedding"])
+                print(f"Warning: legacy syllabus embeddings {file_path} carry no model name")
                 
             print(f"Loaded syllabus embeddings for {len(data)} units")
             return data
@@ -31,67 +93,180 @@ class QuestionRelevanceChecker:
             print(f"Syllabus embeddings not found. Run process_syllabus.py first.")
             return {}
     
-    def check_relevance(self, question):
-        """Check question relevance against syllabus units"""
+    def _build_score_matrix(self):
+        """Stack L2-normalized embeddings into a (rows x dim) matrix
+        
+        Rows are units, or topics for topic-level artifacts. For topics a
+        padded (units x max_topics) row index is also built so per-unit
+        aggregation is a single gather over the similarity vector.
+        """
+        if not self.unit_names:
+            return np.zeros((0, 0), dtype=np.float32)
+        
+        if self.topic_rows is not None:
+            matrix = np.asarray(self.topic_matrix, dtype=np.float32)
+            
+            unit_pos = {unit: i for i, unit in enumerate(self.unit_names)}
+            row_units = np.array([unit_pos[row["unit"]] for row in self.topic_rows])
+            counts = np.bincount(row_units, minlength=len(self.unit_names))
+            
+            self.topic_index = np.zeros((len(self.unit_names), max(counts.max(), 1)), dtype=np.int64)
+            self.topic_mask = np.zeros(self.topic_index.shape, dtype=bool)
+            for u in range(len(self.unit_names)):
+                rows = np.flatnonzero(row_units == u)
+                self.topic_index[u, :len(rows)] = rows
+                self.topic_mask[u, :len(rows)] = True
+        else:
+            matrix = np.vstack([self.syllabus_data[unit]["embedding"] for unit in self.unit_names]).astype(np.float32)
+        
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+    
+    def encode_questions(self, questions, batch_size=64):
+        """Encode many questions in a single batched encode call"""
+        return self.model.encode(list(questions), batch_size=batch_size)
+    
+    def score_embeddings(self, embeddings):
+        """Cosine similarity of (n x dim) question embeddings against every unit
+        
+        Returns (unit_scores, best_topic_rows): an (n x units) score matrix and,
+        for topic-level artifacts, the (n x units) row of the closest topic
+        (None for unit-level artifacts). One matrix product for the batch.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        similarities = (embeddings / np.maximum(norms, 1e-12)) @ self.score_matrix.T
+        
+        if self.topic_rows is None:
+            return similarities, None
+        
+        # Gather topic similarities per unit; padding never wins a max
+        per_unit = np.where(self.topic_mask, similarities[:, self.topic_index], -np.inf)
+        best_cols = per_unit.argmax(axis=2)
+        best_topic_rows = self.topic_index[np.arange(len(self.unit_names)), best_cols]
+        
+        if self.topic_aggregation == "topk":
+            k = min(self.topic_top_k, per_unit.shape[2])
+            top = -np.sort(-per_unit, axis=2)[:, :, :k]
+            top_mask = np.isfinite(top)
+            unit_scores = np.where(top_mask, top, 0.0).sum(axis=2) / np.maximum(top_mask.sum(axis=2), 1)
+        else:
+            unit_scores = per_unit.max(axis=2)
+        
+        return unit_scores, best_topic_rows
+    
+    def score_units(self, question_embedding):
+        """Cosine similarity of one question embedding against every unit
+        
+        Returns (unit_scores, best_topics). best_topics names the closest
+        syllabus topic per unit for topic-level artifacts, else None.
+        """
+        unit_scores, best_topic_rows = self.score_embeddings(np.asarray(question_embedding)[None, :])
+        
+        if best_topic_rows is None:
+            return unit_scores[0], None
+        return unit_scores[0], [self.topic_rows[row]["topic"] for row in best_topic_rows[0]]
+    
+    def is_off_topic(self, question_lower):
+        """True if the (lowercased) question names a known non-CN subject"""
+        return any(keyword in question_lower for keyword in self.NON_CN_KEYWORDS)
+    
+    def keyword_boost(self, question_lower):
+        """Largest confidence boost among CN keywords in the (lowercased) question"""
+        keyword_boost = 0.0
+        for keyword, boost in self.CN_KEYWORD_BOOSTS.items():
+            if keyword in question_lower:
+                keyword_boost = max(keyword_boost, boost)
+        return keyword_boost
+    
+    def score_questions(self, questions, embeddings=None, batch_size=64):
+        """Boosted (n x units) score matrix for many questions at once
+        
+        Applies the same keyword filter and boost as check_relevance.
+        Off-topic questions get an all-zero row and True in the returned mask.
+        """
+        questions = list(questions)
+        if embeddings is None:
+            embeddings = self.encode_questions(questions, batch_size=batch_size)
+        
+        lowered = [q.lower() for q in questions]
+        off_topic = np.array([self.is_off_topic(q) for q in lowered], dtype=bool)
+        boosts = np.array([self.keyword_boost(q) for q in lowered], dtype=np.float32)
+        
+        unit_scores, _ = self.score_embeddings(embeddings)
+        scores = np.minimum(1.0, unit_scores + boosts[:, None])
+        scores[off_topic] = 0.0
+        
+        return scores, off_topic
+    
+    def check_relevance(self, question, question_embedding=None):
+        """Check question relevance against syllabus units
+        
+        Pass a precomputed question_embedding (e.g. from encode_questions)
+        to skip encoding the question again. With a question_cache, the
+        verdict for the same or a paraphrased question is reused.
+        """
         if not self.syllabus_data:
             return {"status": "error", "message": "Syllabus data not loaded"}
         
+        clock = metrics.stage_clock("relevance_stage_seconds")
+        
         # Check for non-CN topics first
         question_lower = question.lower()
-        non_cn_keywords = [
-            "cryptocurrency", "bitcoin", "blockchain", "mining", "wallet",
-            "machine learning", "artificial intelligence", "AI", "ML",
-            "database", "SQL", "normalization", "DBMS",
-            "cooking", "food", "recipe", "pasta",
-            "weather", "temperature", "climate",
-            "finance", "banking", "stock", "investment"
-        ]
-        
-        if any(keyword in question_lower for keyword in non_cn_keywords):
+        
+        if self.is_off_topic(question_lower):
+            clock.mark("keyword_filter")
             return {
                 "question": question,
                 "relevance": "IRRELEVANT",
                 "best_unit": "None",
                 "similarity_score": 0.0,
+                "best_topic": None,
                 "message": "Question is not related to Computer Networks syllabus",
                 "unit_scores": {}
             }
         
         # Boost confidence for known CN keywords
-        cn_keywords = {
-            "ip": 0.25, "tcp": 0.25, "udp": 0.25, "http": 0.25, "ftp": 0.25,
-            "dns": 0.25, "dhcp": 0.25, "snmp": 0.25, "osi": 0.25, "ethernet": 0.25,
-            "routing": 0.20, "switching": 0.20, "protocol": 0.15, "network": 0.10
-        }
+        keyword_boost = self.keyword_boost(question_lower)
+        clock.mark("keyword_filter")
         
-        keyword_boost = 0.0
-        for keyword, boost in cn_keywords.items():
-            if keyword in question_lower:
-                keyword_boost = max(keyword_boost, boost)
+        # Reuse a cached verdict (the exact text skips encoding too)
+        if self.question_cache is not None:
+            supplied = question_embedding
+            cached, question_embedding = self.question_cache.get(
+                question, encode=lambda: self.model.encode([question])[0] if supplied is None else supplied
+            )
+            clock.mark("cache_lookup")
+            if cached is not None:
+                # Deep copy: callers may mutate nested unit_scores without touching the cache
+                return dict(copy.deepcopy(cached), question=question)
         
-        # Generate question embedding
-        question_embedding = self.model.encode([question])[0]
+        # Generate question embedding unless one was supplied
+        if question_embedding is None:
+            question_embedding = self.model.encode([question])[0]
+            clock.mark("encode")
         
         # Calculate similarity with each unit
+        similarities, best_topics = self.score_units(question_embedding)
+        clock.mark("score")
         unit_similarities = {}
         
-        for unit, unit_data in self.syllabus_data.items():
-            similarity = cosine_similarity(
-                [question_embedding], 
-                [unit_data["embedding"]]
-            )[0][0]
+        for i, (unit, similarity) in enumerate(zip(self.unit_names, similarities)):
+            unit_data = self.syllabus_data[unit]
             
             # Apply keyword boost
             boosted_similarity = min(1.0, similarity + keyword_boost)
             
             unit_similarities[unit] = {
                 "similarity": float(boosted_similarity),
-                "topics": unit_data["topics"][:5]  # Top 5 topics for display
+                "topics": unit_data["topics"][:5],  # Top 5 topics for display
+                "best_topic": best_topics[i] if best_topics else None
             }
         
         # Find best matching unit
         best_unit = max(unit_similarities.keys(), key=lambda u: unit_similarities[u]["similarity"])
         best_score = unit_similarities[best_unit]["similarity"]
+        best_topic = unit_similarities[best_unit]["best_topic"]
         
         # Classify relevance
         if best_score >= self.RELEVANT_THRESHOLD:
@@ -103,21 +278,34 @@ class QuestionRelevanceChecker:
         else:
             relevance = "IRRELEVANT"
             message = "Question is not related to Computer Networks syllabus"
+        clock.mark("classify")
         
-        return {
+        result = {
             "question": question,
             "relevance": relevance,
             "best_unit": best_unit,
             "similarity_score": best_score,
+            "best_topic": best_topic,
             "message": message,
             "unit_scores": unit_similarities
         }
+        if self.question_cache is not None:
+            self.question_cache.put(question, question_embedding, copy.deepcopy(result))
+        return result
     
-    def batch_check(self, questions):
-        """Check relevance for multiple questions"""
+    def batch_check(self, questions, batch_size=64):
+        """Check relevance for multiple questions with one batched encode"""
+        questions = list(questions)
+        if not questions:
+            return []
+        
+        start = time.perf_counter()
+        embeddings = self.encode_questions(questions, batch_size=batch_size)
+        metrics.observe("relevance_stage_seconds", time.perf_counter() - start, stage="batch_encode")
+        
         results = []
-        for question in questions:
-            result = self.check_relevance(question)
+        for question, embedding in zip(questions, embeddings):
+            result = self.check_relevance(question, question_embedding=embedding)
             results.append(result)
         return results
 
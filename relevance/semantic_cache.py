@@ -0,0 +1,225 @@
+"""
+SEMANTIC QUESTION CACHE
+=======================
+
+Reuses answers for repeated and paraphrased questions ("what is tcp
+handshake" / "explain TCP three-way handshake"). Recent questions are kept
+with their embeddings in a small in-memory HNSW index; a new question whose
+embedding is within THRESHOLD cosine similarity of a cached one gets the
+cached value back without scoring, searching or reranking.
+
+LOOKUP ORDER:
+1. Exact match on the normalized question text (no encode at all)
+2. Nearest cached question embeddings above the threshold
+Values are stored per key (e.g. search parameters), so a hit must also have
+been computed with the same key.
+
+EVICTION AND INVALIDATION:
+- LRU beyond max_entries; evicted vectors are tombstoned and the HNSW
+  index is rebuilt once dead entries exceed a quarter of the live ones
+- Every call passes the version of the data behind the values (e.g.
+  TextbookRetriever.index_version); a lookup with a new version clears the
+  cache, and a value computed against any other version than the cache's
+  is dropped rather than stored (in-flight requests during a hot swap)
+
+TRADEOFF:
+A semantic hit returns the neighbour's verdict as is. The keyword boost
+and off-topic rules are not re-run for the new wording, so a paraphrase
+that they would decide differently gets the cached verdict. Lower
+thresholds hit more often and are wrong more often, which is why the
+cache is off unless QUESTION_CACHE_SIZE is set.
+
+CONFIG (environment variables, see from_env):
+- QUESTION_CACHE_SIZE: entries per cache (default: 0, disabled; e.g. 4096)
+- QUESTION_CACHE_THRESHOLD: cosine similarity for a hit (default: 0.92)
+
+USAGE:
+    value, embedding = cache.get(question, encode=lambda: model.encode([question])[0], key=params)
+    if value is None:
+        value = compute(question, embedding)
+        cache.put(question, embedding, value, key=params)
+"""
+
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+import faiss
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "monitoring"))
+import metrics
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_MAX_ENTRIES = 4096  # for caches built directly; from_env defaults to off
+HNSW_NEIGHBORS = 16
+CANDIDATES = 4  # nearest cached questions checked for a usable value
+REBUILD_DEAD_RATIO = 0.25
+
+
+def normalize_question(question):
+    return re.sub(r"\s+", " ", question.lower()).strip(" ?.!")
+
+
+class SemanticCache:
+    def __init__(self, name, threshold=DEFAULT_THRESHOLD, max_entries=DEFAULT_MAX_ENTRIES):
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self.version = None
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._reset()
+
+    @classmethod
+    def from_env(cls, name):
+        """Cache configured from the environment, or None if disabled"""
+        max_entries = int(os.environ.get("QUESTION_CACHE_SIZE", "0"))
+        if max_entries <= 0:
+            return None
+        threshold = float(os.environ.get("QUESTION_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+        return cls(name, threshold=threshold, max_entries=max_entries)
+
+    def _reset(self):
+        self.index = None
+        self.positions = []               # HNSW position -> entry id (None once evicted)
+        self.entries = OrderedDict()      # entry id -> entry, least recently used first
+        self.by_text = {}                 # normalized question -> entry id
+        self.next_id = 0
+        self.dead = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.entries:
+                self.invalidations += 1
+                metrics.inc("cache_invalidations_total", cache=self.name)
+            self._reset()
+            self.version = version
+
+    @staticmethod
+    def _normalized(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).reshape(1, -1).copy()
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _touch(self, entry_id, match):
+        self.entries.move_to_end(entry_id)
+        self.hits[match] += 1
+        metrics.inc("cache_requests_total", cache=self.name, result="hit", match=match)
+
+    def _nearest(self, vector, key):
+        if self.index is None or not self.entries:
+            return None
+        scores, positions = self.index.search(vector, CANDIDATES)
+        for score, position in zip(scores[0], positions[0]):
+            if position < 0 or score < self.threshold:
+                break
+            entry_id = self.positions[position]
+            if entry_id is not None and key in self.entries[entry_id]["values"]:
+                return entry_id
+        return None
+
+    def get(self, question, encode=None, key=None, version=None):
+        """(value, embedding) for a question; value is None on a miss
+
+        encode is called (at most once) only when there is no exact match;
+        its embedding is returned so a miss does not have to encode again.
+        """
+        text = normalize_question(question)
+        with self.lock:
+            self._check_version(version)
+            entry_id = self.by_text.get(text)
+            if entry_id is not None and key in self.entries[entry_id]["values"]:
+                self._touch(entry_id, "exact")
+                return self.entries[entry_id]["values"][key], self.entries[entry_id]["embedding"]
+
+        if encode is None:
+            embedding = None
+            entry_id = None
+        else:
+            embedding = encode()
+            vector = self._normalized(embedding)
+            with self.lock:
+                self._check_version(version)
+                entry_id = self._nearest(vector, key)
+                if entry_id is not None:
+                    self._touch(entry_id, "semantic")
+                    return self.entries[entry_id]["values"][key], embedding
+
+        with self.lock:
+            self.misses += 1
+        metrics.inc("cache_requests_total", cache=self.name, result="miss")
+        return None, embedding
+
+    def put(self, question, embedding, value, key=None, version=None):
+        """Cache value for a question (computed against the given version)"""
+        text = normalize_question(question)
+        with self.lock:
+            # Computed against data the cache no longer holds: drop just this value
+            if version != self.version:
+                metrics.inc("cache_stale_puts_total", cache=self.name)
+                return
+            entry_id = self.by_text.get(text)
+            if entry_id is not None:
+                self.entries[entry_id]["values"][key] = value
+                self.entries.move_to_end(entry_id)
+                return
+
+            vector = self._normalized(embedding)
+            if self.index is None:
+                self.index = faiss.IndexHNSWFlat(vector.shape[1], HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+            self.index.add(vector)
+
+            entry_id = self.next_id
+            self.next_id += 1
+            self.positions.append(entry_id)
+            self.entries[entry_id] = {"text": text, "embedding": embedding, "position": len(self.positions) - 1,
+                                      "values": {key: value}}
+            self.by_text[text] = entry_id
+
+            while len(self.entries) > self.max_entries:
+                self._evict_oldest()
+            if self.dead > REBUILD_DEAD_RATIO * len(self.entries):
+                self._rebuild()
+
+    def _evict_oldest(self):
+        _, entry = self.entries.popitem(last=False)
+        del self.by_text[entry["text"]]
+        self.positions[entry["position"]] = None
+        self.dead += 1
+        self.evictions += 1
+
+    def _rebuild(self):
+        """Re-index live entries; HNSW cannot delete, so evictions are tombstones until now"""
+        self.index = faiss.IndexHNSWFlat(self.index.d, HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+        self.positions = []
+        vectors = []
+        for entry_id, entry in self.entries.items():
+            entry["position"] = len(self.positions)
+            self.positions.append(entry_id)
+            vectors.append(self._normalized(entry["embedding"]))
+        if vectors:
+            self.index.add(np.vstack(vectors))
+        self.dead = 0
+
+    def clear(self):
+        with self.lock:
+            self._reset()
+
+    def stats(self):
+        with self.lock:
+            hits = sum(self.hits.values())
+            lookups = hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version": self.version
+            }
@@ -0,0 +1,122 @@
+"""
+BINARY SYLLABUS EMBEDDING STORE
+===============================
+
+Stores syllabus unit embeddings as a contiguous float32 .npy matrix plus a
+small JSON header, instead of pretty-printed float lists.
+
+ARTIFACT LAYOUT:
+- <name>.meta.json: format version, model name, dimension, units/topics,
+  matrix file name and a SHA-256 hash of the matrix contents
+- <name>.npy: float32 matrix, memory-mapped on load
+
+GRANULARITY:
+- "unit": one row per unit (all topics joined into one text)
+- "topic": one row per syllabus topic; header "rows" maps each row to
+  its unit and topic text
+
+The header records which model and encoder (encoder_id, see
+encoders/encoder_backend.py) produced the vectors so a checker never
+compares questions against embeddings from a different model or backend.
+Headers without an encoder field were written by the real model.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def matrix_file_for(header_file):
+    """Name of the .npy matrix that sits next to a header file"""
+    name = os.path.basename(header_file)
+    if name.endswith(".meta.json"):
+        name = name[:-len(".meta.json")]
+    else:
+        name = os.path.splitext(name)[0]
+    return name + ".npy"
+
+
+def compute_content_hash(matrix):
+    """SHA-256 of the matrix bytes (float32, C order)"""
+    data = np.ascontiguousarray(matrix, dtype=np.float32)
+    return "sha256:" + hashlib.sha256(data.tobytes()).hexdigest()
+
+
+def save_syllabus_matrix(header_file, units, matrix, model_name, rows=None, encoder=None):
+    """Save unit metadata and embedding matrix as header + .npy
+
+    units is a list of {"unit", "topics", "text"} dicts. Without rows the
+    matrix has one row per unit in the same order. With rows (a list of
+    {"unit", "topic"} dicts) the matrix has one row per topic.
+    encoder is the producing encoder's encoder_id (default: model_name).
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    expected_rows = len(rows) if rows is not None else len(units)
+    if matrix.ndim != 2 or matrix.shape[0] != expected_rows:
+        raise ValueError(f"Expected a ({expected_rows}, dim) matrix, got shape {matrix.shape}")
+
+    matrix_file = matrix_file_for(header_file)
+    matrix_path = os.path.join(os.path.dirname(header_file), matrix_file)
+    np.save(matrix_path, matrix)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model_name": model_name,
+        "encoder": encoder or model_name,
+        "granularity": "topic" if rows is not None else "unit",
+        "dimension": int(matrix.shape[1]),
+        "dtype": "float32",
+        "matrix_file": matrix_file,
+        "content_hash": compute_content_hash(matrix),
+        "units": units
+    }
+    if rows is not None:
+        header["rows"] = rows
+
+    with open(header_file, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2, ensure_ascii=False)
+
+    return header
+
+
+def load_syllabus_matrix(header_file, expected_model=None, verify_hash=True, expected_encoder=None):
+    """Load header and memory-mapped matrix, validating model and contents
+
+    Raises ValueError if the artifact was produced by a model other than
+    expected_model or an encoder other than expected_encoder, or if the
+    matrix does not match its header.
+    """
+    with open(header_file, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+
+    version = header.get("format_version")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported syllabus embedding format version: {version}")
+
+    if expected_model is not None and header["model_name"] != expected_model:
+        raise ValueError(
+            f"Syllabus embeddings were built with '{header['model_name']}' but the checker "
+            f"encodes with '{expected_model}'. Re-run process_syllabus.py."
+        )
+
+    encoder = header.get("encoder", header["model_name"])
+    if expected_encoder is not None and encoder != expected_encoder:
+        raise ValueError(
+            f"Syllabus embeddings were built with encoder '{encoder}' but the checker "
+            f"encodes with '{expected_encoder}'. Re-run process_syllabus.py with the same backend."
+        )
+
+    matrix_path = os.path.join(os.path.dirname(header_file), header["matrix_file"])
+    matrix = np.load(matrix_path, mmap_mode='r')
+
+    expected_rows = len(header["rows"]) if header.get("granularity") == "topic" else len(header["units"])
+    if matrix.shape != (expected_rows, header["dimension"]):
+        raise ValueError(f"Syllabus matrix shape {matrix.shape} does not match header")
+
+    if verify_hash and compute_content_hash(matrix) != header["content_hash"]:
+        raise ValueError(f"Syllabus matrix {matrix_path} does not match its content hash")
+
+    return header, matrix
@@ -0,0 +1,91 @@
+"""
+Threaded tests for admission control (admission.py)
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import ExitStack
+import pytest
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from admission import AdmissionController, Overloaded
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out waiting for the controller"
+        time.sleep(0.005)
+
+
+def hold_slot(controller, deadline_s=5.0):
+    """Admit in the calling thread; closing the returned stack releases the slot"""
+    stack = ExitStack()
+    stack.enter_context(controller.admit(time.perf_counter() + deadline_s))
+    return stack
+
+
+def queued_request(controller, deadline_s, outcomes, name):
+    """Thread that queues for a slot and records 'admitted' or the shed reason"""
+    def run():
+        try:
+            with controller.admit(time.perf_counter() + deadline_s):
+                outcomes[name] = "admitted"
+        except Overloaded as e:
+            outcomes[name] = e.reason
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_queue_full_is_shed_at_once():
+    controller = AdmissionController(max_in_flight=1, max_queue=0)
+    slot = hold_slot(controller)
+
+    start = time.perf_counter()
+    with pytest.raises(Overloaded) as shed:
+        with controller.admit(time.perf_counter() + 5.0):
+            pass
+    assert shed.value.reason == "queue_full"
+    assert shed.value.retry_after >= 1
+    assert time.perf_counter() - start < 0.5
+
+    slot.close()
+    assert controller.stats()["shed"] == {"queue_full": 1, "deadline": 0}
+
+
+def test_queued_request_is_shed_at_its_deadline():
+    controller = AdmissionController(max_in_flight=1, max_queue=1)
+    slot = hold_slot(controller)
+
+    outcomes = {}
+    queued_request(controller, 0.1, outcomes, "late").join(timeout=2.0)
+    assert outcomes == {"late": "deadline"}
+
+    slot.close()
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_released_slot_is_handed_to_the_next_waiter():
+    controller = AdmissionController(max_in_flight=1, max_queue=2)
+    slot = hold_slot(controller)
+
+    outcomes = {}
+    expiring = queued_request(controller, 0.1, outcomes, "expiring")
+    wait_for(lambda: controller.stats()["queued"] == 1)
+    patient = queued_request(controller, 2.0, outcomes, "patient")
+    wait_for(lambda: controller.stats()["queued"] == 2)
+
+    # Release only after the first waiter's deadline, so its wakeup arrives too late to use
+    with controller.condition:
+        time.sleep(0.2)
+        slot.close()
+
+    start = time.perf_counter()
+    expiring.join(timeout=3.0)
+    patient.join(timeout=3.0)
+    assert outcomes == {"expiring": "deadline", "patient": "admitted"}
+    assert time.perf_counter() - start < 1.0
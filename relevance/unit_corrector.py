@@ -12,13 +12,19 @@ CORRECTION LOGIC:
 4. Generate corrected dataset with final unit assignments
 """
 
+import argparse
 import json
+import os
 import re
 from relevance_checker import QuestionRelevanceChecker
 
+RELEVANCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(RELEVANCE_DIR, "..", "dataset", "synthetic_qa_seed.json")
+
 class UnitCorrector:
-    def __init__(self):
-        self.checker = QuestionRelevanceChecker()
+    def __init__(self, checker=None):
+        # Reuse an existing checker when given; models are shared either way
+        self.checker = checker or QuestionRelevanceChecker()
         
         # Define keyword-based override rules
         self.override_rules = {
@@ -100,8 +106,12 @@ class UnitCorrector:
         
         return matches
     
-    def apply_correction_rules(self, question, predicted_unit, confidence_score):
-        """Apply correction rules to determine final unit assignment"""
+    def apply_correction_rules(self, question, predicted_unit, confidence_score, unit_scores=None):
+        """Apply correction rules to determine final unit assignment
+        
+        unit_scores is the 'unit_scores' dict from check_relevance. When it
+        is supplied, dual-unit overrides reuse it instead of re-encoding.
+        """
         
         # Find keyword matches
         keyword_matches = self.find_keyword_matches(question)
@@ -144,17 +154,18 @@ class UnitCorrector:
             # If current final_unit not in dual units, consider override
             if result['final_unit'] not in dual_units and confidence_score < 0.5:
                 # Choose the dual unit with higher semantic similarity
-                best_dual_unit = max(dual_units, key=lambda u: self._get_unit_similarity(question, u))
+                if unit_scores is None:
+                    unit_scores = self.checker.check_relevance(question)['unit_scores']
+                best_dual_unit = max(dual_units, key=lambda u: self._get_unit_similarity(unit_scores, u))
                 result['final_unit'] = best_dual_unit
                 result['correction_applied'] = True
                 result['correction_reason'] = f"Dual-unit override: {[m[2] for m in dual_matches]}"
         
         return result
     
-    def _get_unit_similarity(self, question, unit):
-        """Get similarity score for a specific unit"""
-        relevance_result = self.checker.check_relevance(question)
-        return relevance_result['unit_scores'].get(unit, {}).get('similarity', 0.0)
+    def _get_unit_similarity(self, unit_scores, unit):
+        """Get similarity score for a specific unit from precomputed scores"""
+        return unit_scores.get(unit, {}).get('similarity', 0.0)
     
     def correct_dataset(self, dataset_path, output_path):
         """Apply corrections to entire dataset"""
@@ -169,14 +180,17 @@ class UnitCorrector:
         corrections_applied = 0
         dual_tags_added = 0
         
-        for q in questions:
-            # Get original prediction
-            relevance_result = self.checker.check_relevance(q['question'])
+        # Get original predictions with a single batched encode
+        relevance_results = self.checker.batch_check([q['question'] for q in questions])
+        
+        for q, relevance_result in zip(questions, relevance_results):
             predicted_unit = relevance_result['best_unit']
             confidence = relevance_result['similarity_score']
             
-            # Apply corrections
-            correction = self.apply_correction_rules(q['question'], predicted_unit, confidence)
+            # Apply corrections, reusing the unit scores computed above
+            correction = self.apply_correction_rules(
+                q['question'], predicted_unit, confidence, relevance_result['unit_scores']
+            )
             
             # Create corrected entry
             corrected_entry = {
@@ -222,21 +236,28 @@ class UnitCorrector:
         return corrected_data
 
 def main():
-    corrector = UnitCorrector()
+    # Large question files: use bulk_classify.py, which streams instead of loading everything
+    parser = argparse.ArgumentParser(description="Rule-based unit correction")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET)
+    parser.add_argument("--output", default=os.path.join(RELEVANCE_DIR, "corrected_synthetic_dataset.json"))
+    parser.add_argument("--syllabus", default=os.path.join(RELEVANCE_DIR, "syllabus_embeddings.meta.json"))
+    args = parser.parse_args()
     
-    # Apply corrections to synthetic dataset
-    dataset_path = "../dataset/synthetic_qa_seed.json"
-    output_path = "corrected_synthetic_dataset.json"
+    corrector = UnitCorrector(QuestionRelevanceChecker(args.syllabus))
     
-    corrected_data = corrector.correct_dataset(dataset_path, output_path)
+    # Apply corrections to the dataset
+    corrected_data = corrector.correct_dataset(args.dataset, args.output)
+    total = len(corrected_data)
+    if not total:
+        return
     
     # Generate accuracy report
     correct_final = sum(1 for item in corrected_data if item['final_unit'] == item['expected_unit'])
     correct_predicted = sum(1 for item in corrected_data if item['predicted_unit'] == item['expected_unit'])
     
     print(f"\nACCURACY COMPARISON:")
-    print(f"Original predictions: {correct_predicted}/50 ({correct_predicted/50*100:.1f}%)")
-    print(f"After corrections: {correct_final}/50 ({correct_final/50*100:.1f}%)")
+    print(f"Original predictions: {correct_predicted}/{total} ({correct_predicted/total*100:.1f}%)")
+    print(f"After corrections: {correct_final}/{total} ({correct_final/total*100:.1f}%)")
     print(f"Improvement: {correct_final - correct_predicted} questions")
 
 if __name__ == "__main__":